@@ -4,7 +4,6 @@ import sys
 import configargparse
 from dockermake.constants import Constants
 from dockermake.version import VERSION
-from dockermake.make import Make
 from dockermake.lint.linting_exception import LintingException
 from dockermake.utils import display
 
@@ -24,7 +23,13 @@ def main():
     logging.debug(args)
     logging.debug(parser.format_values())
 
-    make = Make(args)
+    # imported after parsing, so that --version and --help do not load the parsers, linters and docker clients
+    if args.monorepo:
+        from dockermake.monorepo import Monorepo  # pylint: disable=import-outside-toplevel
+        make = Monorepo(args)
+    else:
+        from dockermake.make import Make  # pylint: disable=import-outside-toplevel
+        make = Make(args)
 
     try:
         make.run()
@@ -52,6 +57,7 @@ def parse(args):
         prog=Constants.DOCKER_MAKE_BASE_NAME,
         description="Build containers with tags and different build-args with Docker."
     )
+    parser.register('action', 'extend', ExtendAction)
     parser.add_argument("-c", "--config-file", type=str, is_config_file=True,
                         help="path to a docker-make config file")
     parser.add_argument("--log-level", type=str, default=Constants.DEFAULT_LOG_LEVEL,
@@ -65,23 +71,55 @@ def parse(args):
                         env_var="DOCKER_MAKE_SHOW_VERSION")
     parser.add_argument("-B", "--show-builds", action='store_true', default=False,
                         help="show all builds and exit")
-    parser.add_argument("--show-linting-rules", action='store_true', default=False,
-                        help="show all linting rules and exit")
-    parser.add_argument("-x", "--exclude-linting-rules", action="append",
-                        help="excludes the given linting rules (comma-separated, multiple are appended)")
-    parser.add_argument("-b", "--build-only", nargs="+", dest="build_only_names",
-                        help="build only given builds")
     parser.add_argument("-f", "--file", type=str, default=None, help="specify an alternative docker-make file")
     parser.add_argument("--dockerfile", type=str, default=Constants.DEFAULT_DOCKERFILE,
                         help="specify an alternative name for Dockerfile in working directory")
     parser.add_argument("--registries-file", type=str, default=Constants.DEFAULT_REGISTRIES_FILE_PATH,
                         help="specify an alternative path for registries.yaml")
-    parser.add_argument("--push-only-to-defined-registries", action='store_true',
-                        default=Constants.DEFAULT_PUSH_ONLY_TO_DEFINED_REGISTRIES,
-                        help="pushes images only to registries defined in registries.yaml")
-    parser.add_argument("--push-only-to-specific-git-projects", action='store_true',
-                        default=Constants.DEFAULT_PUSH_ONLY_TO_SPECIFIC_GIT_PROJECTS,
-                        help="pushes images only to registry git projects defined in registries.yaml")
+    parser.add_argument("--parser-backend", choices=Constants.PARSER_BACKENDS,
+                        default=Constants.DEFAULT_PARSER_BACKEND,
+                        help="the parser that extracts the logical lines of the Dockerfile, the scanner is a faster "
+                             "hand-written alternative to pyparsing")
+    parser.add_argument("--output-log-file",
+                        help="append the output of the docker commands and the before and after commands to the "
+                             "given file")
+    parser.add_argument("--docker-backend", choices=Constants.DOCKER_BACKENDS, default=Constants.DEFAULT_DOCKER_BACKEND,
+                        help="talk to the docker daemon through the docker CLI or directly through its API on the unix "
+                             "socket, auto uses the API if the socket of DOCKER_HOST answers. Builds that need "
+                             "BuildKit always use the docker CLI")
+    parser.add_argument("--monorepo", action='store_true', default=False,
+                        help="build all projects with a docker-make.yaml below the working directory as one graph, "
+                             "a project using the image of another project as base image is built after it")
+    parser.add_argument("--changed-since", type=str, default=None, metavar="REF",
+                        help="with --monorepo, only build the projects with files that changed since the git ref and "
+                             "the projects depending on them")
+    parser.add_argument("--profile-out", type=str, default=None,
+                        help="write the durations of the phases of the run and of every build, e.g. loading the "
+                             "config, linting, git probes, docker build, push and inspect, to the given file")
+    parser.add_argument("--profile-format", choices=Constants.PROFILE_FORMATS, default="json",
+                        help="write the profile as JSON report or as Chrome trace for chrome://tracing and Perfetto")
+    parser.add_argument("-d", "--dry-run", action='store_true', default=False,
+                        help="only show what docker-make would do but do not execute commands with an impact")
+    parser.add_argument("-s", "--summary", action='store_true', default=False,
+                        help="print a markdown formatted summary of this build, which can be added to your "
+                             "documentation")
+    parser.add_argument("-w", "--work-dir", type=str, default=Constants.DEFAULT_WORK_DIR,
+                        help="change the working directory (defaults to %s)" % Constants.DEFAULT_WORK_DIR)
+    _add_lint_arguments(parser)
+    _add_build_arguments(parser)
+    _add_cache_arguments(parser)
+    _add_push_arguments(parser)
+    _add_scheduling_arguments(parser)
+
+    return parser, parser.parse_args(args)
+
+
+def _add_lint_arguments(parser):
+    """arguments for linting the Dockerfiles"""
+    parser.add_argument("--show-linting-rules", action='store_true', default=False,
+                        help="show all linting rules and exit")
+    parser.add_argument("-x", "--exclude-linting-rules", action="append",
+                        help="excludes the given linting rules (comma-separated, multiple are appended)")
     group = parser.add_mutually_exclusive_group()
     group.add_argument("-l", "--lint", action='store_const', dest='linting', const='exit_on_errors',
                        help="lint given Dockerfile, fail on errors.")
@@ -90,27 +128,41 @@ def parse(args):
     group.add_argument("--no-lint", action='store_const', dest='linting', const=None,
                        help="no linting of the Dockerfile.")
     parser.set_defaults(linting='exit_on_errors')
+    parser.add_argument("--no-lint-cache", action='store_true', default=False,
+                        help="always lint the Dockerfile instead of replaying a cached result of the same Dockerfile "
+                             "and linting configuration")
     parser.add_argument("--only-lint", action='store_true', default=False,
                         help="only lint and exit.")
-    parser.add_argument("-n", "--no-push", action='store_true', default=False,
-                        help="only build the images but do not push the images to the registry-host")
+    parser.add_argument("--lint-files", nargs="+", default=None, metavar="PATH",
+                        help="only lint the Dockerfiles matching the given paths or glob patterns (relative to the "
+                             "working directory, ** matches any directories) and exit, they are linted in parallel "
+                             "and reported at once, a directory stands for the Dockerfile in it")
+    parser.add_argument("--lint-jobs", type=int, default=Constants.DEFAULT_LINT_JOBS,
+                        help="the number of processes linting the Dockerfiles given to --lint-files")
+
+
+def _add_build_arguments(parser):
+    """arguments for the docker build and the labels of the images"""
+    parser.add_argument("-b", "--build-only", nargs="+", dest="build_only_names",
+                        help="build only given builds")
     parser.add_argument("-N", "--no-pull", action='store_true', default=False,
                         help="during build do not pull the parent image from the registry-host")
+    parser.add_argument("--prepull", action='store_true', default=False,
+                        help="pull the images of all stages of all builds once and concurrently before the first "
+                             "build, the builds then do not pull them again")
     parser.add_argument("--no-cache", action='store_true', default=False,
                         help="do not use cache when building the image")
     parser.add_argument("--target", type=str,
-                        help="set the target build stage to build")
-    parser.add_argument("--skip-registry-auth", action='store_true', default=False,
-                        help="skips registry authentication and just tries to push to the registry defined")
-    parser.add_argument("-d", "--dry-run", action='store_true', default=False,
-                        help="only show what docker-make would do but do not execute commands with an impact")
+                        help="set the target build stage to build of the builds without a target in the "
+                             "docker-make.yaml")
     parser.add_argument("-p", "--purge", action='store_true', default=False,
                         help="""purge all previous created images __before__ running the actual build.
                         Purge forcefully removes the docker images.
                         IMPORTANT: This is not recommended for containers which have children""")
-    parser.add_argument("-s", "--summary", action='store_true', default=False,
-                        help="print a markdown formatted summary of this build, which can be added to your "
-                             "documentation")
+    parser.add_argument("--label", nargs="*", action="extend", default=[], dest="labels",
+                        help="labels attached to the resulting container images")
+    parser.add_argument("--build-arg", nargs="*", action="extend", default=[], dest="docker_build_args",
+                        help="any valid Docker build parameter like \"--build-arg XYZ=abc\"")
     parser.add_argument("--create-parent-label", action='store_true', default=Constants.DEFAULT_CREATE_PARENT_LABEL,
                         help="creates a label with the image parents of the resulting docker image")
     parser.add_argument("--parent-label-name", type=str, default=Constants.DEFAULT_PARENT_LABEL_NAME,
@@ -131,12 +183,57 @@ def parse(args):
     parser.add_argument("--built-from-scratch-label-name", type=str,
                         default=Constants.DEFAULT_BUILT_FROM_SCRATCH_LABEL_NAME,
                         help="the built from scratch label name")
-    parser.add_argument("-w", "--work-dir", type=str, default=Constants.DEFAULT_WORK_DIR,
-                        help="change the working directory (defaults to %s)" % Constants.DEFAULT_WORK_DIR)
-    parser.register('action', 'extend', ExtendAction)
-    parser.add_argument("--label", nargs="*", action="extend", default=[], dest="labels",
-                        help="labels attached to the resulting container images")
-    parser.add_argument("--build-arg", nargs="*", action="extend", default=[], dest="docker_build_args",
-                        help="any valid Docker build parameter like \"--build-arg XYZ=abc\"")
 
-    return parser, parser.parse_args(args)
+
+def _add_cache_arguments(parser):
+    """arguments for reusing build caches and earlier builds"""
+    parser.add_argument("--cache-from", nargs="*", action="extend", default=[], metavar="SOURCE",
+                        help="use the given images or BuildKit cache sources (e.g. type=local,src=DIR) as build cache "
+                             "of all builds, in addition to the cache-from of the builds in the docker-make.yaml")
+    parser.add_argument("--cache-to", nargs="*", action="extend", default=[], metavar="DESTINATION",
+                        help="export the build cache of all builds to the given BuildKit cache destinations (e.g. "
+                             "type=registry,ref=IMAGE or type=local,dest=DIR), the builds run with docker buildx")
+    parser.add_argument("--registry-cache", action='store_true', default=False,
+                        help="use the previously pushed tags of every build as its build cache and embed the cache "
+                             "into the built images, so that the push exports it for the next run (needs BuildKit)")
+    parser.add_argument("--no-deduplicate-builds", action='store_true', default=False,
+                        help="run docker build for every build, also for builds that only differ in their tags from "
+                             "an earlier build instead of tagging the image of that build")
+    parser.add_argument("--skip-unchanged", action='store_true', default=False,
+                        help="skip the build and push of a build whose context, Dockerfile, build args, labels, tags "
+                             "and base images did not change since its last push, as long as its tags still point "
+                             "to the pushed image in the registry")
+    parser.add_argument("--build-state-file", default=Constants.DEFAULT_BUILD_STATE_FILE,
+                        help="the file that records the pushed image of every build fingerprint for "
+                             "--skip-unchanged")
+
+
+def _add_push_arguments(parser):
+    """arguments for pushing the images"""
+    parser.add_argument("-n", "--no-push", action='store_true', default=False,
+                        help="only build the images but do not push the images to the registry-host")
+    parser.add_argument("--push-only-to-defined-registries", action='store_true',
+                        default=Constants.DEFAULT_PUSH_ONLY_TO_DEFINED_REGISTRIES,
+                        help="pushes images only to registries defined in registries.yaml")
+    parser.add_argument("--push-only-to-specific-git-projects", action='store_true',
+                        default=Constants.DEFAULT_PUSH_ONLY_TO_SPECIFIC_GIT_PROJECTS,
+                        help="pushes images only to registry git projects defined in registries.yaml")
+    parser.add_argument("--skip-registry-auth", action='store_true', default=False,
+                        help="skips registry authentication and just tries to push to the registry defined")
+
+
+def _add_scheduling_arguments(parser):
+    """arguments for running builds and pushes concurrently"""
+    parser.add_argument("-j", "--jobs", type=int, default=Constants.DEFAULT_JOBS,
+                        help="run up to the given number of builds concurrently")
+    parser.add_argument("-k", "--keep-going", action='store_true', default=False,
+                        help="continue with the remaining builds when a build fails instead of stopping at the first "
+                             "failure")
+    parser.add_argument("--push-jobs", type=int, default=Constants.DEFAULT_PUSH_JOBS,
+                        help="push up to the given number of tags of a build concurrently, the first tag is always "
+                             "pushed alone (see max-concurrent-pushes in registries.yaml for a limit per registry)")
+    parser.add_argument("--no-prebuild-shared-stages", action='store_true', default=False,
+                        help="with --jobs, do not build the stages several builds need once before the builds")
+    parser.add_argument("--pipeline-push", action='store_true', default=False,
+                        help="push the images of a build in the background while the next build is running, "
+                             "the after build commands run on the main thread once all images are pushed")
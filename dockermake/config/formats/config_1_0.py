@@ -95,6 +95,15 @@ class Config10(ConfigBase):
         tags = build["tags"] if "tags" in build else []
         return [str(tag) for tag in tags]
 
+    def get_build_target(self, build):
+        return build["target"] if "target" in build else None
+
+    def get_build_cache_from(self, build):
+        return self.listify(build["cache-from"]) if "cache-from" in build else []
+
+    def get_build_cache_to(self, build):
+        return self.listify(build["cache-to"]) if "cache-to" in build else []
+
     def get_before_build_commands(self, build):
         return self.listify(build["before"]) if "before" in build else []
 
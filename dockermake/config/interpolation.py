@@ -1,62 +1,142 @@
+from collections import ChainMap, namedtuple
+from functools import lru_cache
 import logging
-import json
 import re
 
 
+Reference = namedtuple("Reference", ["name", "operator", "word"])
+
+
 class PosixStyleExpander:
+    """
+    Expands posix style variables in the strings (and keys) of a json convert-able data structure: $VAR, ${VAR} and
+    the parameter expansions ${VAR-default}, ${VAR:-default}, ${VAR=default}, ${VAR:=default}, ${VAR+alternative},
+    ${VAR:+alternative}, ${VAR?message} and ${VAR:?message}. With a colon, an empty variable is treated as unset.
+
+    Every string is tokenized once and the tokens of strings are cached, as the same strings are expanded once per
+    build. Assignments with = are only visible to the rest of the expansion, the replacement dictionary is not changed.
+    """
+
+    NAME = re.compile(r"\w+")
+    OPERATORS = (":-", ":=", ":+", ":?", "-", "=", "+", "?")
+
     @classmethod
     def expand(cls, config, replacement_dict):
-        """
-        Expands posix style variables in a json convert-able data structure with values in a replacement
-        dictionary.
-        """
-        context = json.dumps(config)
+        variables = ChainMap(dict(), replacement_dict)
+        expanded = cls._expand_value(config, variables)
+        logging.debug("Expanded config: %s", expanded)
+        return expanded
 
-        for string in re.findall(r'\${[^}]+}|\$\w+', context):
-            var, default, required = cls._extract_posix_variable_parts(string)
+    @classmethod
+    def _expand_value(cls, value, variables):
+        if isinstance(value, str):
+            return cls._evaluate(_tokenize(value), variables)
+        if isinstance(value, dict):
+            return {cls._expand_value(key, variables): cls._expand_value(item, variables)
+                    for key, item in value.items()}
+        if isinstance(value, list):
+            return [cls._expand_value(item, variables) for item in value]
+        return value
 
-            replacement = replacement_dict.get(var, default)
+    @classmethod
+    def _evaluate(cls, tokens, variables):
+        if len(tokens) == 1 and isinstance(tokens[0], str):
+            return tokens[0]
+        return "".join(token if isinstance(token, str) else cls._resolve(token, variables) for token in tokens)
 
-            if not replacement:
-                if required:
-                    raise Exception("Environment variable '%s' was required but had no value." % var)
-                logging.warning("A variable was not consumed and defaulted to an empty string: %s", var)
-                replacement = ""
+    @classmethod
+    def _resolve(cls, reference, variables):
+        value = variables.get(reference.name)
+        operator = reference.operator
+        is_set = value is not None
+        if operator and operator.startswith(":"):
+            is_set = bool(value)
+            operator = operator[1:]
 
-            context = context.replace(string, replacement)
+        if operator == "-":
+            return value if is_set else cls._evaluate(reference.word, variables)
+        if operator == "=":
+            if not is_set:
+                value = variables[reference.name] = cls._evaluate(reference.word, variables)
+            return value
+        if operator == "+":
+            return cls._evaluate(reference.word, variables) if is_set else ""
+        if operator == "?":
+            if not is_set:
+                message = "Environment variable '%s' was required but had no value." % reference.name
+                detail = cls._evaluate(reference.word, variables)
+                raise Exception(message + " " + detail if detail else message)
+            return value
 
-        logging.debug("Expanded config: %s", context)
+        if value is None:
+            logging.warning("A variable was not consumed and defaulted to an empty string: %s", reference.name)
+            return ""
+        return value
 
-        return json.loads(context, strict=False)
+    @classmethod
+    def _tokenize(cls, string):
+        """splits the string into literal strings and variable references in one pass"""
+        tokens = list()
+        literal_start = 0
+        index = string.find("$")
+        while index != -1:
+            reference, end = cls._parse_reference(string, index)
+            if reference is None:
+                index = string.find("$", index + 1)
+                continue
+            if literal_start < index:
+                tokens.append(string[literal_start:index])
+            tokens.append(reference)
+            literal_start = end
+            index = string.find("$", end)
+        if literal_start < len(string) or not tokens:
+            tokens.append(string[literal_start:])
+        return tuple(tokens)
 
     @classmethod
-    def _extract_posix_variable_parts(cls, string):
-        string = cls._enforce_braces(string)  # for simpler handling of the string
-        for splitter in [":-", ":=", "-", None]:
-            var, default, required = cls._split_var_from_default(string, splitter)
-            if var:
-                break
-        return var, default, required
+    def _parse_reference(cls, string, index):
+        """returns the reference starting at the $ at the index and the index after it, or None for a literal $"""
+        if not string.startswith("${", index):
+            name = cls.NAME.match(string, index + 1)
+            if not name:
+                return None, index
+            return Reference(name.group(0), None, ()), name.end()
+
+        name = cls.NAME.match(string, index + 2)
+        if not name:
+            return None, index
+        position = name.end()
+        if string.startswith("}", position):
+            return Reference(name.group(0), None, ()), position + 1
+
+        for operator in cls.OPERATORS:
+            if string.startswith(operator, position):
+                word_start = position + len(operator)
+                word_end = cls._find_closing_brace(string, word_start)
+                if word_end == -1:
+                    return None, index
+                word = _tokenize(string[word_start:word_end])
+                return Reference(name.group(0), operator, word), word_end + 1
+        return None, index
 
     @staticmethod
-    def _enforce_braces(string):
-        if string.startswith('$') and not string.startswith('${'):
-            string = "${" + string[1:] + "}"
-        return string
+    def _find_closing_brace(string, start):
+        """finds the brace closing the reference, skipping the braces of nested references in the word"""
+        depth = 1
+        index = start
+        while index < len(string):
+            if string.startswith("${", index):
+                depth += 1
+                index += 2
+                continue
+            if string[index] == "}":
+                depth -= 1
+                if depth == 0:
+                    return index
+            index += 1
+        return -1
 
-    @classmethod
-    def _split_var_from_default(cls, string, splitter):
-        var = None
-        default = None
-        required = False
-        if not splitter:
-            required = string[-2] == "?"
-            if required:
-                var = string[2:-2]
-            else:
-                var = string[2:-1]
-        elif len(string.split(splitter)) > 1:
-            parts = string.split(splitter)
-            var = parts[0][2:]
-            default = parts[1][0:-1]
-        return var, default, required
+
+@lru_cache(maxsize=4096)
+def _tokenize(string):
+    return PosixStyleExpander._tokenize(string)  # pylint: disable=protected-access
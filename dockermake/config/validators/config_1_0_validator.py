@@ -1,5 +1,4 @@
 import os
-import jsonschema
 
 from dockermake.utils.helpers import load_json
 from dockermake.dockerfile.instructions import Keywords
@@ -19,6 +18,7 @@ class Config10Validator:
         9. all ARGs specified in Dockerfile must be specified by build-args
         10. all build-args must be unique per section
         11. all labels must be unique per section
+        12. all targets must be named stages of the Dockerfile
     """
 
     JSON_SCHEMA = "schema_1_0.json"
@@ -40,10 +40,12 @@ class Config10Validator:
         self.args_in_dockerfile(dockerfile)
         self.build_args_unique_per_section()
         self.labels_are_unique_per_section()
+        self.targets_in_dockerfile(dockerfile)
 
     def has_valid_schema(self):
         schema_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "schemas", self.JSON_SCHEMA)
         schema = load_json(schema_path)
+        import jsonschema  # pylint: disable=import-outside-toplevel
         try:
             jsonschema.validate(self.config, schema)
         except jsonschema.exceptions.ValidationError as exception:
@@ -161,6 +163,12 @@ class Config10Validator:
                 if duplicates:
                     self.error("labels of %s have duplicate keys: %s" % (build['name'], ", ".join(duplicates)))
 
+    def targets_in_dockerfile(self, dockerfile):
+        for build in self.config_wrapper.get_builds():
+            target = self.config_wrapper.get_build_target(build)
+            if target is not None and target not in dockerfile.stages:
+                self.error("target %s of build \"%s\" is not a stage of the Dockerfile" % (target, build['name']))
+
     def error(self, msg):
         self.errors.append(msg)
 
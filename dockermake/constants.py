@@ -1,4 +1,3 @@
-from distutils.util import strtobool
 import os
 
 
@@ -19,8 +18,26 @@ class Constants:
     DEFAULT_GIT_REMOTE_URL_LABEL_NAME = "git.remote_url"
     DEFAULT_CREATE_GIT_SHA1_LABEL = True
     DEFAULT_GIT_SHA1_LABEL_NAME = "git.sha1"
+    DEFAULT_JOBS = 1
+    DEFAULT_PUSH_JOBS = 1
+    DEFAULT_LINT_JOBS = os.cpu_count() or 1
+    PARSER_BACKENDS = ["pyparsing", "scanner"]
+    DEFAULT_PARSER_BACKEND = os.getenv("DOCKER_MAKE_PARSER_BACKEND", "pyparsing")
+    DOCKER_BACKENDS = ["auto", "cli", "api"]
+    DEFAULT_DOCKER_BACKEND = os.getenv("DOCKER_MAKE_DOCKER_BACKEND", "cli")
+    PROFILE_FORMATS = ["json", "chrome"]
+    INLINE_CACHE_BUILD_ARG = "BUILDKIT_INLINE_CACHE=1"
+
+    CACHE_DIR = os.getenv("DOCKER_MAKE_CACHE_DIR", os.path.join(
+        os.getenv("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")), "docker-make"))
+    DEFAULT_BUILD_STATE_FILE = os.path.join(CACHE_DIR, "build-state.json")
+    DEFAULT_LINT_CACHE_MAX_SIZE = int(os.getenv("DOCKER_MAKE_LINT_CACHE_MAX_SIZE", str(10 * 1024 * 1024)))
+    DOCKER_VERSION_CACHE_FILE = os.path.join(CACHE_DIR, "docker-version.json")
+    DOCKER_VERSION_CACHE_TTL = int(os.getenv("DOCKER_MAKE_DOCKER_VERSION_CACHE_TTL", str(24 * 60 * 60)))
 
     DOCKER_PATH = os.getenv("DOCKER_MAKE_DOCKER_PATH", "docker")
+    DOCKER_HOST = os.getenv("DOCKER_HOST", "unix:///var/run/docker.sock")
+    DOCKER_CONFIG = os.getenv("DOCKER_CONFIG", os.path.join(os.path.expanduser("~"), ".docker"))
     DOCKER_MAKE_BASE_NAME = "docker-make"
     YAML_ALLOWED_EXTENSIONS = ["." + extension.strip() for extension in
                                os.getenv("DOCKER_MAKE_YAML_ALLOWED_EXTENSIONS", "yml, yaml").split(",")]
@@ -30,7 +47,7 @@ class Constants:
     REGISTRY_LOGIN_PASSWORD = os.getenv("DOCKER_MAKE_REGISTRY_LOGIN_PASSWORD", None)
 
     CI_BUILD_URL = None
-    if strtobool(os.getenv("GITLAB_CI", "False")):
+    if os.getenv("GITLAB_CI", "False").lower() in ("y", "yes", "t", "true", "on", "1"):
         # supports Gitlab
         CI_BUILD_URL = os.getenv("CI_JOB_URL")
     else:
@@ -1,10 +1,19 @@
+import json
 import logging
+import os
+import tempfile
+import time
 
 from dockermake.constants import Constants
 from dockermake.utils.helpers import System
 
 
 def get_docker_version():
+    cached_version = _read_cached_docker_version()
+    if cached_version:
+        logging.debug("Found cached docker version: %s (edition: %s)", *cached_version)
+        return cached_version
+
     cmd = " ".join([Constants.DOCKER_PATH, "version", "--format", "{{.Server.Version}}"])
     version, _, return_code = System.run_command(cmd, fail_on_bad_return_code=False, shell=True)
     if return_code != 0:
@@ -18,4 +27,55 @@ def get_docker_version():
         version = split[0]
         suffix = split[1]
     logging.debug("Found docker version: %s (edition: %s)", version, suffix)
+    _write_cached_docker_version(version, suffix)
     return version, suffix
+
+
+def _read_cached_docker_version():
+    """the version of the daemon is cached on disk for DOCKER_VERSION_CACHE_TTL seconds"""
+    entry = _read_docker_version_cache().get(_docker_version_cache_key())
+    if not entry or time.time() - entry.get("time", 0) > Constants.DOCKER_VERSION_CACHE_TTL:
+        return None
+    return entry["version"], entry.get("suffix")
+
+
+def _write_cached_docker_version(version, suffix):
+    if Constants.DOCKER_VERSION_CACHE_TTL <= 0:
+        return
+    entries = _read_docker_version_cache()
+    entries[_docker_version_cache_key()] = dict(version=version, suffix=suffix, time=time.time())
+    try:
+        directory = os.path.dirname(Constants.DOCKER_VERSION_CACHE_FILE)
+        os.makedirs(directory, exist_ok=True)
+        descriptor, temporary_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(descriptor, "w", encoding="UTF-8") as cache_file:
+            json.dump(entries, cache_file, indent=2, sort_keys=True)
+        os.replace(temporary_path, Constants.DOCKER_VERSION_CACHE_FILE)
+    except (IOError, OSError) as exception:
+        logging.debug("Could not cache docker version in %s: %s", Constants.DOCKER_VERSION_CACHE_FILE, exception)
+
+
+def _read_docker_version_cache():
+    try:
+        with open(Constants.DOCKER_VERSION_CACHE_FILE, "r", encoding="UTF-8") as cache_file:
+            entries = json.load(cache_file)
+            return entries if isinstance(entries, dict) else dict()
+    except (IOError, OSError, ValueError):
+        return dict()
+
+
+def _docker_version_cache_key():
+    """the daemon is the one of DOCKER_HOST, unless another docker context is active, e.g. by docker context use"""
+    context = os.getenv("DOCKER_CONTEXT") or _current_docker_context()
+    if not context or context == "default":
+        return Constants.DOCKER_HOST
+    return "%s (context: %s)" % (Constants.DOCKER_HOST, context)
+
+
+def _current_docker_context():
+    try:
+        with open(os.path.join(Constants.DOCKER_CONFIG, "config.json"), "r", encoding="UTF-8") as config_file:
+            config = json.load(config_file)
+            return config.get("currentContext") if isinstance(config, dict) else None
+    except (IOError, OSError, ValueError):
+        return None
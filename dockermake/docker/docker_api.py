@@ -0,0 +1,618 @@
+import base64
+import codecs
+from collections import deque
+import http.client
+import json
+import logging
+import os
+import socket
+import tarfile
+import threading
+import urllib.parse
+import uuid
+
+from dockermake.constants import Constants
+from dockermake.docker.docker_cli_1_12 import DockerCli112
+from dockermake.docker.docker_cli_base import DockerCliBase
+from dockermake.docker.go_template import GoTemplate
+from dockermake.utils import display
+from dockermake.utils.docker_ignore import DockerIgnore
+from dockermake.utils.helpers import System, OutputStream, OutputOptions
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path, timeout=None):
+        super(UnixHTTPConnection, self).__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout:
+            self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class DockerApiException(Exception):
+    def __init__(self, message, status=None):
+        self.status = status
+        super(DockerApiException, self).__init__(message)
+
+
+class DockerApi(DockerCliBase):
+    """
+    Talks to the docker daemon through its HTTP API on the unix socket instead of forking the docker CLI for every
+    operation. Every thread keeps a persistent connection to the daemon.
+
+    The methods take the same arguments and return the same (out, err, return_code) tuples as the ones of
+    DockerCli112, so that both can be used interchangeably.
+    """
+
+    DOCKER_CLI_VERSION = "api"
+    CHUNK_SIZE = 64 * 1024
+    DEFAULT_INDEX_SERVER = "https://index.docker.io/v1/"
+
+    socket_path = None
+    __connections = threading.local()
+    __credentials = dict()
+    __credentials_lock = threading.Lock()
+
+    @classmethod
+    def is_available(cls, docker_host=None):
+        socket_path = cls.socket_path_of(docker_host or Constants.DOCKER_HOST)
+        if not socket_path or not os.path.exists(socket_path):
+            return False
+        cls.socket_path = socket_path
+        try:
+            cls.version()
+        except (OSError, DockerApiException, http.client.HTTPException) as exception:
+            logging.debug("Docker API is not available at %s: %s", socket_path, exception)
+            return False
+        return True
+
+    @staticmethod
+    def socket_path_of(docker_host):
+        if docker_host.startswith("unix://"):
+            return docker_host[len("unix://"):]
+        return None
+
+    @classmethod
+    def docker_cli_version(cls):
+        return cls.DOCKER_CLI_VERSION
+
+    @classmethod
+    def version(cls):
+        """returns the version of the daemon and its edition suffix like get_docker_version does"""
+        response = cls._request_json("GET", "/version")
+        version = response.get("Version", "").split("+", 1)[0]
+        suffix = None
+        if "-" in version:
+            version, suffix = version.split("-", 1)
+        return version, suffix
+
+    @classmethod
+    def build(cls, path, **kwargs):
+        if cls._needs_buildkit(kwargs):
+            # the API builds with the legacy builder, BuildKit and buildx are only available through the docker CLI
+            logging.debug("Building %s with the docker CLI, the build needs BuildKit", path)
+            return DockerCli112.build(path, **kwargs)
+
+        options = cls._options(kwargs)
+        tags = kwargs.pop("tags", [])
+        dockerfile = kwargs.pop("file", None) or os.path.join(path, "Dockerfile")
+        params = [("t", tag) for tag in tags] + [
+            ("buildargs", json.dumps(dict(build_arg.split("=", 1) for build_arg in kwargs.pop("build_args", [])))),
+            ("labels", json.dumps(dict(cls._split_label(label) for label in kwargs.pop("labels", [])))),
+            ("pull", cls._flag(kwargs.pop("pull", False))),
+            ("rm", cls._flag(kwargs.pop("remove", False))),
+            ("nocache", cls._flag(kwargs.pop("no_cache", False))),
+            ("q", cls._flag(kwargs.pop("quiet", False))),
+        ]
+        target = kwargs.pop("target", None)
+        if target:
+            params.append(("target", target))
+        cache_from = kwargs.pop("cache_from", [])
+        if cache_from:
+            params.append(("cachefrom", json.dumps(cache_from)))
+        kwargs.pop("cache_to", None)
+        cls._unknown_arguments(kwargs)
+
+        relative_dockerfile = os.path.relpath(dockerfile, path)
+        outside_of_context = relative_dockerfile.startswith("..")
+        if outside_of_context:
+            # the docker CLI sends a Dockerfile outside of the context along with the context as well
+            relative_dockerfile = ".dockerfile." + uuid.uuid4().hex[:20]
+        params.append(("dockerfile", relative_dockerfile))
+
+        headers = {"Content-Type": "application/x-tar"}
+        registry_config = cls._registry_config()
+        if registry_config:
+            headers["X-Registry-Config"] = cls._encode_header(registry_config)
+
+        def body():
+            return cls._context_tar_stream(path, dockerfile, relative_dockerfile if outside_of_context else None)
+
+        description = "POST /build of %s" % path
+        return cls._stream("POST", "/build", description, options, params=params, headers=headers, body=body)
+
+    @staticmethod
+    def _needs_buildkit(kwargs):
+        """exporting the build cache and inline cache metadata need BuildKit, as does a build that asks for it"""
+        return bool(kwargs.get("cache_to")) or Constants.INLINE_CACHE_BUILD_ARG in kwargs.get("build_args", []) or \
+            os.getenv("DOCKER_BUILDKIT", "0").lower() in ("1", "true")
+
+    @classmethod
+    def inspect(cls, name, **kwargs):
+        options = cls._options(kwargs)
+        output_format = kwargs.pop("output_format", None)
+        kwargs.pop("size", None)
+        cls._unknown_arguments(kwargs)
+
+        # like the docker CLI, several images are inspected at once and the missing ones are reported as errors
+        names = name if isinstance(name, list) else [name]
+        if options["dry_run"]:
+            return cls._dry_run("GET " + ", ".join("/images/%s/json" % cls._quote(image) for image in names))
+        images = list()
+        errors = list()
+        for image_name in names:
+            try:
+                images.append(cls._request_json("GET", "/images/%s/json" % cls._quote(image_name)))
+            except DockerApiException as exception:
+                if exception.status != 404:
+                    return cls._failed("GET /images/%s/json" % cls._quote(image_name), exception, options)
+                errors.append("Error: No such image: %s" % image_name)
+
+        if output_format:
+            out = "\n".join(GoTemplate.render(output_format, image) for image in images)
+        else:
+            out = json.dumps(images, indent=4)
+        if errors:
+            return cls._failed("GET /images/json of " + ", ".join(names), DockerApiException("\n".join(errors)),
+                               options, out=out.strip())
+        return out.strip(), "", 0
+
+    @classmethod
+    def images(cls, **kwargs):
+        options = cls._options(kwargs)
+        image = kwargs.pop("image", None)
+        params = [("all", cls._flag(kwargs.pop("all_images", False))),
+                  ("digests", cls._flag(kwargs.pop("digests", False)))]
+        image_filter = kwargs.pop("image_filter", None)
+        output_format = kwargs.pop("output_format", None)
+        no_trunc = kwargs.pop("no_trunc", False)
+        quiet = kwargs.pop("quiet", False)
+        cls._unknown_arguments(kwargs)
+
+        filters = dict()
+        if image:
+            filters["reference"] = [image]
+        if image_filter:
+            key, value = image_filter.split("=", 1)
+            filters.setdefault(key, list()).append(value)
+        params.append(("filters", json.dumps(filters)))
+
+        if options["dry_run"]:
+            cls._dry_run("GET /images/json")
+            return list()
+        try:
+            summaries = cls._request_json("GET", "/images/json", params=params)
+        except DockerApiException as exception:
+            cls._failed("GET /images/json", exception, options)
+            return list()
+
+        images = list()
+        for summary in summaries:
+            image_id = summary.get("Id", "")
+            if not no_trunc:
+                image_id = image_id.split(":", 1)[-1][:12]
+            if quiet:
+                images.append(image_id)
+            elif output_format:
+                images.append(GoTemplate.render(output_format, summary))
+            else:
+                for repo_tag in summary.get("RepoTags") or ["<none>:<none>"]:
+                    images.append("%s %s" % (repo_tag, image_id))
+        return list(set(images))
+
+    @classmethod
+    def login(cls, server, **kwargs):
+        options = cls._options(kwargs)
+        user = kwargs.pop("user", None)
+        password = kwargs.pop("password", None)
+        cls._unknown_arguments(kwargs)
+
+        if options["dry_run"]:
+            return cls._dry_run("POST /auth of %s" % server)
+        credentials = dict(username=user, password=password, serveraddress=server)
+        try:
+            cls._request_json("POST", "/auth", body=json.dumps(credentials).encode("UTF-8"),
+                              headers={"Content-Type": "application/json"})
+        except DockerApiException as exception:
+            return cls._failed("POST /auth of %s" % server, exception, options)
+
+        # the daemon does not store the credentials, they are sent along with every push and pull instead
+        with cls.__credentials_lock:
+            cls.__credentials[server] = credentials
+        return "Login Succeeded", "", 0
+
+    @classmethod
+    def manifest_inspect(cls, image, **kwargs):
+        options = cls._options(kwargs)
+        kwargs.pop("verbose", None)
+        kwargs.pop("insecure", None)
+        cls._unknown_arguments(kwargs)
+
+        path = "/distribution/%s/json" % cls._quote(image)
+        if options["dry_run"]:
+            return cls._dry_run("GET " + path)
+        headers = {"X-Registry-Auth": cls._encode_header(cls._credentials_of(image))}
+        try:
+            distribution = cls._request_json("GET", path, headers=headers)
+        except DockerApiException as exception:
+            return cls._failed("GET " + path, exception, options)
+        # the verbose output of docker manifest inspect contains the descriptor of the manifest as well
+        return json.dumps(distribution), "", 0
+
+    @classmethod
+    def pull(cls, image, **kwargs):
+        options = cls._options(kwargs)
+        all_tags = kwargs.pop("all_tags", False)
+        kwargs.pop("disable_content_trust", None)
+        cls._unknown_arguments(kwargs)
+
+        repository, tag = cls._split_reference(image)
+        params = [("fromImage", repository)]
+        if not all_tags:
+            params.append(("tag", tag or "latest"))
+        headers = {"X-Registry-Auth": cls._encode_header(cls._credentials_of(image))}
+        return cls._stream("POST", "/images/create", "POST /images/create of %s" % image, options, params=params,
+                           headers=headers)
+
+    @classmethod
+    def push(cls, image, **kwargs):
+        options = cls._options(kwargs)
+        kwargs.pop("disable_content_trust", None)
+        cls._unknown_arguments(kwargs)
+
+        repository, tag = cls._split_reference(image)
+        params = [("tag", tag)] if tag else list()
+        headers = {"X-Registry-Auth": cls._encode_header(cls._credentials_of(image))}
+        path = "/images/%s/push" % cls._quote(repository)
+        return cls._stream("POST", path, "POST %s of %s" % (path, image), options, params=params, headers=headers)
+
+    @classmethod
+    def remove_images(cls, image, **kwargs):
+        options = cls._options(kwargs)
+        params = [("force", cls._flag(kwargs.pop("force", False))),
+                  ("noprune", cls._flag(kwargs.pop("no_prune", False)))]
+        cls._unknown_arguments(kwargs)
+
+        outputs = list()
+        for name in image if isinstance(image, list) else [image]:
+            path = "/images/%s" % cls._quote(name)
+            if options["dry_run"]:
+                cls._dry_run("DELETE " + path)
+                continue
+            try:
+                for deleted in cls._request_json("DELETE", path, params=params):
+                    outputs += ["%s: %s" % item for item in deleted.items()]
+            except DockerApiException as exception:
+                return cls._failed("DELETE " + path, exception, options)
+        out = "\n".join(outputs)
+        if options["output"].continuous and out:
+            display.info(out)
+        return out, "", 0
+
+    @classmethod
+    def tag(cls, source_image, target_image, **kwargs):
+        options = cls._options(kwargs)
+        cls._unknown_arguments(kwargs)
+
+        repository, tag = cls._split_reference(target_image)
+        params = [("repo", repository)] + ([("tag", tag)] if tag else list())
+        path = "/images/%s/tag" % cls._quote(source_image)
+        if options["dry_run"]:
+            return cls._dry_run("POST %s as %s" % (path, target_image))
+        try:
+            cls._request("POST", path, params=params)
+        except DockerApiException as exception:
+            return cls._failed("POST " + path, exception, options)
+        return "", "", 0
+
+    @classmethod
+    def _stream(cls, method, path, description, options, params=None, headers=None, body=None):
+        """runs a request that answers with a stream of JSON progress messages"""
+        if options["dry_run"]:
+            return cls._dry_run(description)
+        logging.debug("Requesting docker API: %s", description)
+
+        out = deque(maxlen=OutputStream.TAIL_LINES) if not options["output"].capture else list()
+        errors = list()
+        try:
+            for message in cls._request_stream(method, path, params=params, headers=headers, body=body):
+                if "error" in message:
+                    errors.append(message["error"].strip())
+                    continue
+                for line in cls._progress_lines(message):
+                    out.append(line)
+                    if options["output"].continuous:
+                        display.info(line)
+        except DockerApiException as exception:
+            errors.append(str(exception))
+
+        if errors:
+            return cls._failed(description, DockerApiException("; ".join(errors)), options, out="\n".join(out))
+        return "\n".join(out).strip(), "", 0
+
+    @staticmethod
+    def _progress_lines(message):
+        if "stream" in message:
+            return [line.rstrip() for line in message["stream"].rstrip("\n").split("\n")]
+        if "status" in message:
+            if message.get("progress") or message.get("progressDetail", dict()).get("current"):
+                # progress bars are left out, like the docker CLI does without a terminal
+                return list()
+            prefix = message["id"] + ": " if message.get("id") else ""
+            return [prefix + message["status"]]
+        if "aux" in message and "ID" in message["aux"]:
+            return ["Built image %s" % message["aux"]["ID"]]
+        return list()
+
+    @classmethod
+    def _request_json(cls, method, path, params=None, headers=None, body=None):
+        data = cls._request(method, path, params=params, headers=headers, body=body)
+        return json.loads(data.decode("UTF-8")) if data else dict()
+
+    @classmethod
+    def _request(cls, method, path, params=None, headers=None, body=None):
+        response = cls._send(method, path, params, headers, body)
+        data = response.read()
+        cls._raise_for_status(response, data)
+        return data
+
+    @classmethod
+    def _request_stream(cls, method, path, params=None, headers=None, body=None):
+        """yields the JSON messages of the response as soon as they are complete"""
+        response = cls._send(method, path, params, headers, body)
+        if response.status >= 400:
+            cls._raise_for_status(response, response.read())
+
+        decoder = json.JSONDecoder()
+        text_decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        buffer = ""
+        while True:
+            chunk = response.read1(cls.CHUNK_SIZE) if hasattr(response, "read1") else response.read(cls.CHUNK_SIZE)
+            buffer += text_decoder.decode(chunk, final=not chunk)
+            while True:
+                buffer = buffer.lstrip()
+                if not buffer:
+                    break
+                try:
+                    message, end = decoder.raw_decode(buffer)
+                except ValueError:
+                    # incomplete message, wait for the next chunk
+                    break
+                buffer = buffer[end:]
+                yield message
+            if not chunk:
+                break
+        # completes the response, so that the persistent connection can be used for the next request
+        response.read()
+        if buffer.strip():
+            raise DockerApiException("Incomplete response of docker API: %s" % buffer.strip())
+
+    @classmethod
+    def _send(cls, method, path, params, headers, body):
+        url = path
+        if params:
+            url += "?" + urllib.parse.urlencode(params)
+        headers = dict(headers or dict())
+
+        for attempt in range(2):
+            connection = cls._connection()
+            payload = body() if callable(body) else body
+            try:
+                # a payload without a length, like the build context, is sent chunked
+                connection.request(method, url, body=payload, headers=headers)
+                return connection.getresponse()
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError) as exception:
+                # the daemon may have closed the persistent connection in the meantime
+                cls._close_connection()
+                if attempt:
+                    raise DockerApiException("Docker API request %s %s failed: %s" % (method, path, exception)) \
+                        from exception
+                logging.debug("Reconnecting to the docker API: %s", exception)
+            finally:
+                if hasattr(payload, "close"):
+                    payload.close()
+        return None
+
+    @classmethod
+    def reset(cls):
+        """closes the connection of the current thread and forgets the credentials of previous logins"""
+        cls._close_connection()
+        with cls.__credentials_lock:
+            cls.__credentials.clear()
+
+    @classmethod
+    def _connection(cls):
+        connection = getattr(cls.__connections, "connection", None)
+        if connection is None:
+            connection = UnixHTTPConnection(cls.socket_path or cls.socket_path_of(Constants.DOCKER_HOST))
+            cls.__connections.connection = connection
+        return connection
+
+    @classmethod
+    def _close_connection(cls):
+        connection = getattr(cls.__connections, "connection", None)
+        if connection is not None:
+            connection.close()
+            cls.__connections.connection = None
+
+    @staticmethod
+    def _raise_for_status(response, data):
+        if response.status < 400:
+            return
+        try:
+            message = json.loads(data.decode("UTF-8")).get("message", "")
+        except ValueError:
+            message = data.decode("UTF-8", errors="replace")
+        raise DockerApiException(message.strip() or response.reason, status=response.status)
+
+    @classmethod
+    def _context_tar_stream(cls, path, dockerfile, dockerfile_name_in_context):
+        """writes the tar of the build context into a pipe in the background, the request reads from the pipe"""
+        read_descriptor, write_descriptor = os.pipe()
+        reader = os.fdopen(read_descriptor, "rb")
+        writer = os.fdopen(write_descriptor, "wb")
+
+        def write():
+            try:
+                with tarfile.open(fileobj=writer, mode="w|", format=tarfile.PAX_FORMAT) as tar:
+                    dockerignore, _ = DockerIgnore.load(path, dockerfile)
+                    included = [DockerIgnore.FILE_NAME]
+                    if not dockerfile_name_in_context:
+                        included.append(os.path.relpath(dockerfile, path))
+                    for relative_path, full_path in dockerignore.walk(path, included=included):
+                        tar.add(full_path, arcname=relative_path, recursive=False)
+                    if dockerfile_name_in_context:
+                        tar.add(dockerfile, arcname=dockerfile_name_in_context, recursive=False)
+            except BrokenPipeError:
+                logging.debug("Docker API closed the connection while sending the build context")
+            except Exception as exception:  # pylint: disable=broad-except
+                logging.error("Sending the build context failed: %s", exception)
+            finally:
+                try:
+                    writer.close()
+                except BrokenPipeError:
+                    pass
+
+        threading.Thread(target=write, daemon=True).start()
+        return reader
+
+    @classmethod
+    def _credentials_of(cls, image):
+        return cls._credentials_of_server(cls._registry_of(image))
+
+    @classmethod
+    def _credentials_of_server(cls, server):
+        with cls.__credentials_lock:
+            if server not in cls.__credentials:
+                cls.__credentials[server] = DockerConfig.credentials(server)
+            return cls.__credentials[server] or dict()
+
+    @classmethod
+    def _registry_config(cls):
+        config = dict()
+        for server in DockerConfig.servers():
+            credentials = cls._credentials_of_server(server)
+            if credentials:
+                config[server] = dict(username=credentials.get("username"), password=credentials.get("password"))
+        with cls.__credentials_lock:
+            for server, credentials in cls.__credentials.items():
+                if credentials:
+                    config[server] = dict(username=credentials.get("username"),
+                                          password=credentials.get("password"))
+        return config
+
+    @classmethod
+    def _registry_of(cls, image):
+        first, _, rest = image.partition("/")
+        if rest and ("." in first or ":" in first or first == "localhost"):
+            return first
+        return cls.DEFAULT_INDEX_SERVER
+
+    @staticmethod
+    def _split_reference(image):
+        """splits an image reference into repository and tag (or digest)"""
+        if "@" in image:
+            return image.split("@", 1)
+        repository, _, tag = image.rpartition(":")
+        if not repository or "/" in tag:
+            return image, None
+        return repository, tag
+
+    @staticmethod
+    def _split_label(label):
+        key, _, value = label.partition("=")
+        return key, value
+
+    @staticmethod
+    def _encode_header(value):
+        return base64.urlsafe_b64encode(json.dumps(value).encode("UTF-8")).decode("ascii")
+
+    @staticmethod
+    def _quote(name):
+        return urllib.parse.quote(name, safe="/:@")
+
+    @staticmethod
+    def _flag(value):
+        return "1" if value else "0"
+
+    @staticmethod
+    def _options(kwargs):
+        """the options that the docker CLI commands pass to System.run_command"""
+        return dict(
+            dry_run=kwargs.pop("dry_run", False),
+            fail_on_bad_return_code=kwargs.pop("fail_on_bad_return_code", True),
+            output=kwargs.pop("output", OutputOptions()),
+            stdin_feed=kwargs.pop("stdin_feed", None),
+            shell=kwargs.pop("shell", False),
+            cwd=kwargs.pop("cwd", None),
+        )
+
+    @staticmethod
+    def _unknown_arguments(kwargs):
+        if kwargs:
+            logging.error("Docker API called with unknown args: %s", kwargs)
+
+    @staticmethod
+    def _dry_run(description):
+        display.info("[DRY] Would request docker API: %s" % description)
+        return "", "", 0
+
+    @staticmethod
+    def _failed(description, exception, options, out=""):
+        if options["output"].omit:
+            description = System.OMITTED_CMD
+        if options["fail_on_bad_return_code"]:
+            raise Exception("Docker API request failed: %s: %s" % (description, exception))
+        return out, str(exception), 1
+
+
+class DockerConfig:
+    """Reads the credentials of registries from the config of the docker CLI, including credential helpers."""
+
+    @staticmethod
+    def _load():
+        path = os.path.join(Constants.DOCKER_CONFIG, "config.json")
+        try:
+            with open(path, "r", encoding="UTF-8") as config:
+                return json.load(config)
+        except (IOError, OSError, ValueError):
+            return dict()
+
+    @classmethod
+    def servers(cls):
+        return list(cls._load().get("auths", dict()).keys())
+
+    @classmethod
+    def credentials(cls, server):
+        config = cls._load()
+        helper = config.get("credHelpers", dict()).get(server) or config.get("credsStore")
+        if helper:
+            return cls._credentials_from_helper(helper, server)
+
+        auth = config.get("auths", dict()).get(server, dict()).get("auth")
+        if not auth:
+            return None
+        username, _, password = base64.b64decode(auth).decode("UTF-8").partition(":")
+        return dict(username=username, password=password, serveraddress=server)
+
+    @staticmethod
+    def _credentials_from_helper(helper, server):
+        out, _, return_code = System.run_command(["docker-credential-" + helper, "get"], stdin_feed=server,
+                                                 fail_on_bad_return_code=False, output=OutputOptions(omit=True))
+        if return_code != 0 or not out:
+            return None
+        credentials = json.loads(out)
+        return dict(username=credentials.get("Username"), password=credentials.get("Secret"), serveraddress=server)
@@ -36,6 +36,10 @@ class DockerCli112(DockerCliBase):
             kwargs["stdin_feed"] = password
         return cls.LoginCommand(server, **kwargs).run()
 
+    @classmethod
+    def manifest_inspect(cls, image, **kwargs):
+        return cls.ManifestInspectCommand(image, **kwargs).run()
+
     @classmethod
     def pull(cls, image, **kwargs):
         return cls.PullCommand(image, **kwargs).run()
@@ -55,6 +59,7 @@ class DockerCli112(DockerCliBase):
     # pylint: disable=too-many-instance-attributes
     class BuildCommand(CommandBase):
         BUILD = "build"
+        BUILDX = "buildx"
 
         def __init__(self, path, **kwargs):
             self.path = path
@@ -67,10 +72,15 @@ class DockerCli112(DockerCliBase):
             self.file = kwargs.pop("file", None)
             self.no_cache = kwargs.pop("no_cache", False)
             self.target = kwargs.pop("target", None)
+            self.cache_from = kwargs.pop("cache_from", [])
+            self.cache_to = kwargs.pop("cache_to", [])
             super(DockerCli112.BuildCommand, self).__init__(**kwargs)
 
         def _build_command(self):
             parts = self._base()
+            if self.cache_to:
+                # only buildx exports the cache, --load puts the image into the local image store for the push
+                parts.append(self.BUILDX)
             parts.append(self.BUILD)
 
             for build_arg in self.build_args:
@@ -96,6 +106,14 @@ class DockerCli112(DockerCliBase):
             if self.target:
                 parts.append("--target")
                 parts.append(self.target)
+            for cache_from in self.cache_from:
+                parts.append("--cache-from")
+                parts.append(cache_from)
+            for cache_to in self.cache_to:
+                parts.append("--cache-to")
+                parts.append(cache_to)
+            if self.cache_to:
+                parts.append("--load")
 
             parts.append(self.path)
 
@@ -120,7 +138,10 @@ class DockerCli112(DockerCliBase):
             if self.size:
                 parts.append("--size")
 
-            parts.append(self.name)
+            if isinstance(self.name, list):
+                parts += self.name
+            else:
+                parts.append(self.name)
 
             return parts
 
@@ -184,6 +205,30 @@ class DockerCli112(DockerCliBase):
 
             return parts
 
+    class ManifestInspectCommand(CommandBase):
+        MANIFEST = "manifest"
+        INSPECT = "inspect"
+
+        def __init__(self, image, **kwargs):
+            self.image = image
+            self.verbose = kwargs.pop("verbose", False)
+            self.insecure = kwargs.pop("insecure", False)
+            super(DockerCli112.ManifestInspectCommand, self).__init__(**kwargs)
+
+        def _build_command(self):
+            parts = self._base()
+            parts.append(self.MANIFEST)
+            parts.append(self.INSPECT)
+
+            if self.verbose:
+                parts.append("--verbose")
+            if self.insecure:
+                parts.append("--insecure")
+
+            parts.append(self.image)
+
+            return parts
+
     class PullCommand(CommandBase):
         PULL = "pull"
 
@@ -22,6 +22,10 @@ class DockerCliBase(metaclass=ABCMeta):
     def login(self, server, **kwargs):
         raise NotImplementedError
 
+    @abstractmethod
+    def manifest_inspect(self, image, **kwargs):
+        raise NotImplementedError
+
     @abstractmethod
     def pull(self, image, **kwargs):
         raise NotImplementedError
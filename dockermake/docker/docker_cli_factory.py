@@ -1,15 +1,79 @@
-from distutils.version import StrictVersion
+import logging
+import re
+import threading
 
+from dockermake.constants import Constants
 from dockermake.docker import get_docker_version
 from dockermake.docker.docker_cli_1_12 import DockerCli112
+from dockermake.docker.image_inspector import ImageInspector
 
 
 class DockerCliFactory:
+    AUTO_BACKEND = "auto"
+    CLI_BACKEND = "cli"
+    API_BACKEND = "api"
+    BACKENDS = Constants.DOCKER_BACKENDS
+
     @staticmethod
-    def create(docker_version=None):
+    def create(docker_version=None, backend=None, dry_run=False):
+        backend = backend or Constants.DEFAULT_DOCKER_BACKEND
+        if backend not in DockerCliFactory.BACKENDS:
+            raise Exception("Unknown docker backend: %s" % backend)
+
+        if backend != DockerCliFactory.CLI_BACKEND:
+            # the API client is only imported when it is used, it pulls in http.client and tarfile
+            from dockermake.docker.docker_api import DockerApi  # pylint: disable=import-outside-toplevel
+            if DockerApi.is_available():
+                return DockerApi
+            if backend == DockerCliFactory.API_BACKEND:
+                raise Exception("Docker API is not available at %s" % Constants.DOCKER_HOST)
+            logging.debug("Falling back to the docker CLI")
+
+        if dry_run and not docker_version:
+            # a dry run does not run docker commands, the version of the daemon does not matter
+            return DockerCli112
         if not docker_version:
             docker_version, _ = get_docker_version()
 
-        if StrictVersion("1.12") <= StrictVersion(docker_version):
+        if (1, 12) <= DockerCliFactory._parse_version(docker_version):
             return DockerCli112
         raise Exception("Docker version is not supported: %s" % docker_version)
+
+    @staticmethod
+    def _parse_version(docker_version):
+        match = re.match(r"^(\d+)\.(\d+)(?:\.(\d+))?$", docker_version.strip())
+        if not match:
+            raise Exception("Docker version is not supported: %s" % docker_version)
+        return tuple(int(part or 0) for part in match.groups())
+
+
+class LazyDockerCli:
+    """
+    Resolves the docker backend on first use, so that linting and showing the builds work without docker. The image
+    inspector of the run belongs to the backend.
+    """
+
+    def __init__(self, backend=None, dry_run=False):
+        self.backend = backend
+        self.dry_run = dry_run
+        self.lock = threading.Lock()
+        self._docker_cli = None
+        self._image_inspector = None
+
+    def get(self):
+        with self.lock:
+            if self._docker_cli is None:
+                self._docker_cli = DockerCliFactory.create(backend=self.backend, dry_run=self.dry_run)
+            return self._docker_cli
+
+    def set(self, docker_cli):
+        with self.lock:
+            self._docker_cli = docker_cli
+            self._image_inspector = None
+
+    def image_inspector(self):
+        docker_cli = self.get()
+        with self.lock:
+            if self._image_inspector is None:
+                self._image_inspector = ImageInspector(docker_cli, dry_run=self.dry_run)
+            return self._image_inspector
@@ -0,0 +1,52 @@
+import json
+import re
+
+
+class GoTemplate:
+    """
+    Renders the subset of Go templates that is used for the --format option of docker commands: actions that print
+    a field path (e.g. {{.Id}} or {{ .Config.Labels }}), optionally piped through json (e.g. {{ json . }}).
+    """
+
+    ACTION = re.compile(r"\{\{-?\s*(.*?)\s*-?\}\}")
+    EXPRESSION = re.compile(r"^(?:(json)\s+)?(\.|(?:\.\w+)+)$")
+    NO_VALUE = "<no value>"
+
+    @classmethod
+    def render(cls, template, data):
+        return cls.ACTION.sub(lambda action: cls._evaluate(action.group(1), data), template)
+
+    @classmethod
+    def _evaluate(cls, expression, data):
+        match = cls.EXPRESSION.match(expression)
+        if not match:
+            raise Exception("Unsupported format expression: {{ %s }}" % expression)
+        function, path = match.groups()
+
+        value = data
+        found = True
+        for field in path.split(".")[1:] if path != "." else []:
+            if isinstance(value, dict) and field in value:
+                value = value[field]
+            else:
+                value, found = None, False
+                break
+
+        if function == "json":
+            return json.dumps(value, separators=(",", ":"))
+        if not found:
+            return cls.NO_VALUE
+        return cls._format(value)
+
+    @classmethod
+    def _format(cls, value):
+        """formats the value like Go prints it"""
+        if value is None:
+            return cls.NO_VALUE
+        if isinstance(value, bool):
+            return "true" if value else "false"
+        if isinstance(value, dict):
+            return "map[%s]" % " ".join("%s:%s" % (key, cls._format(value[key])) for key in sorted(value))
+        if isinstance(value, list):
+            return "[%s]" % " ".join(cls._format(item) for item in value)
+        return str(value)
@@ -0,0 +1,71 @@
+import json
+import logging
+import re
+import threading
+
+
+class ImageInspector:
+    """
+    Inspects many images with a single docker inspect and caches the results for the run: the inspect outputs by
+    image ID and the image IDs by reference, so that images referenced by several builds are inspected only once.
+    """
+
+    OUTPUT_FORMAT = "{{ json . }}"
+    MISSING_IMAGE = re.compile(r"No such (?:image|object): (\S+)")
+
+    def __init__(self, docker_cli, dry_run=False):
+        self.docker_cli = docker_cli
+        self.dry_run = dry_run
+        self.images = dict()
+        self.references = dict()
+        self.lock = threading.Lock()
+
+    def inspect(self, images):
+        """returns the inspect outputs by reference, None for images that do not exist locally"""
+        with self.lock:
+            unknown = [image for image in dict.fromkeys(images) if image not in self.references]
+        results = self._inspect(unknown) if unknown else dict()
+
+        with self.lock:
+            for image in images:
+                if image not in results:
+                    results[image] = self.images.get(self.references.get(image))
+        return results
+
+    def get(self, image):
+        return self.inspect([image])[image]
+
+    def forget(self, images):
+        """forgets the references of images that were built, tagged, pulled or pushed since they were inspected"""
+        with self.lock:
+            for image in images:
+                self.references.pop(image, None)
+
+    def _inspect(self, images):
+        output, err, return_code = self.docker_cli.inspect(images, output_format=self.OUTPUT_FORMAT,
+                                                           dry_run=self.dry_run, fail_on_bad_return_code=False)
+        lines = [line for line in output.splitlines() if line.strip()] if output else list()
+        if return_code == 0 and not lines:
+            # a dry run does not inspect anything, the results are not cached
+            return {image: dict() for image in images}
+
+        missing = set(self.MISSING_IMAGE.findall(err or ""))
+        found = [image for image in images if image not in missing]
+        if len(lines) != len(found):
+            if len(images) > 1:
+                logging.debug("Could not match the output of docker inspect, inspecting images one by one")
+                results = dict()
+                for image in images:
+                    results.update(self._inspect([image]))
+                return results
+            return {images[0]: None}
+
+        results = {image: None for image in missing if image in images}
+        with self.lock:
+            for image, line in zip(found, lines):
+                inspect_output = json.loads(line)
+                image_id = inspect_output.get("Id", image)
+                self.images[image_id] = inspect_output
+                self.references[image] = image_id
+                results[image] = inspect_output
+        return results
@@ -10,10 +10,13 @@ from dockermake.dockerfile.logical_line_extractor import LogicalLineExtractor
 class Dockerfile:
     def __init__(self):
         self.path = None
+        self.context = ""
         self.physical_lines = list()
         self.logical_lines = list()
         self.instructions = list()
         self.stages = list()
+        self.index = dict()
+        self.positions = dict()
 
     @staticmethod
     def load(working_directory_path, dockerfile_name):
@@ -35,10 +38,12 @@ class Dockerfile:
     def _parse(context):
         dockerfile = Dockerfile()
 
+        dockerfile.context = context
         dockerfile.physical_lines = context.splitlines()
         dockerfile.logical_lines = LogicalLineExtractor.parse_dockerfile(context)
         dockerfile.instructions = Dockerfile._create_instructions_from_logical_lines(dockerfile.logical_lines)
         dockerfile.stages = Dockerfile._set_stage_names_from_instructions(dockerfile.instructions)
+        dockerfile.index, dockerfile.positions = Dockerfile._index_instructions(dockerfile.instructions)
 
         logging.debug("Dockerfile instructions successfully parsed: %s", dockerfile.instructions)
 
@@ -78,8 +83,23 @@ class Dockerfile:
             instruction.stage = stage
         return stages
 
-    def lint(self, exit_on_errors, exclude):
-        DockerfileLint(self, exit_on_errors, exclude).lint()
+    @staticmethod
+    def _index_instructions(instructions):
+        """
+        Indexes the instructions and their positions by stage and by instruction type in a single pass. None stands
+        for all stages and for all instruction types respectively.
+        """
+        index = dict()
+        positions = dict()
+        for position, instruction in enumerate(instructions):
+            for stage in (None, instruction.stage):
+                for instruction_type in (None, instruction.get_type()):
+                    index.setdefault((stage, instruction_type), list()).append(instruction)
+                    positions.setdefault((stage, instruction_type), list()).append(position)
+        return index, positions
+
+    def lint(self, exit_on_errors, exclude, cache=None):
+        DockerfileLint(self, exit_on_errors, exclude, cache=cache).lint()
 
     def get_physical_lines(self):
         return self.physical_lines
@@ -88,43 +108,72 @@ class Dockerfile:
         return self.stages[-1]
 
     def get_instructions(self, stage=None):
-        instructions = list()
-        for instruction in self.instructions:
-            if stage is None or instruction.stage == stage:
-                instructions.append(instruction)
-        return instructions
+        """the returned list is shared and must not be modified"""
+        return self.index.get((stage, None), list())
 
     def get_instructions_of_type(self, instruction_type, stage=None):
-        instructions = list()
-        for instruction in self.get_instructions(stage=stage):
-            if instruction.get_type() == instruction_type:
-                instructions.append(instruction)
-        return instructions
+        """the returned list is shared and must not be modified"""
+        return self.index.get((stage, instruction_type), list())
 
     def get_first_instruction_of_type(self, instruction_type, stage=None):
-        for instruction in self.get_instructions(stage=stage):
-            if instruction.get_type() == instruction_type:
-                return instruction
-        return None
+        instructions = self.get_instructions_of_type(instruction_type, stage=stage)
+        return instructions[0] if instructions else None
 
     def get_maintainer_labels(self, ignore_case, stage=None):
         instructions = list()
-        for instruction in self.get_instructions(stage=stage):
-            if instruction.get_type() == Keywords.LABEL and instruction.contains("maintainer", ignore_case):
+        for instruction in self.get_instructions_of_type(Keywords.LABEL, stage=stage):
+            if instruction.contains("maintainer", ignore_case):
                 instructions.append(instruction)
         return instructions
 
     def get_last_index_of(self, instruction_type, stage=None):
-        last_index = -1
-        for index, instruction in enumerate(self.instructions):
-            if stage is None or instruction.stage == stage:
-                if instruction.get_type() == instruction_type:
-                    last_index = index
-        return last_index
+        positions = self.positions.get((stage, instruction_type), list())
+        return positions[-1] if positions else -1
 
     def get_instruction_count(self, stage=None):
         return len(self.get_instructions(stage=stage))
 
+    def get_stage_dependencies(self):
+        """the earlier stages every stage uses as base image or copies files from with COPY --from"""
+        dependencies = dict()
+        for position, stage in enumerate(self.stages):
+            references = [instruction.full_image_name
+                          for instruction in self.get_instructions_of_type(Keywords.FROM, stage=stage)]
+            references += [getattr(instruction, "from")
+                           for instruction in self.get_instructions_of_type(Keywords.COPY, stage=stage)]
+            used_stages = list()
+            for reference in references:
+                used_stage = self._find_stage(reference, before=position)
+                if used_stage is not None and used_stage not in used_stages:
+                    used_stages.append(used_stage)
+            dependencies[stage] = used_stages
+        return dependencies
+
+    def get_required_stages(self, target=None):
+        """the stages needed to build the target stage, the last stage by default, in the order of the Dockerfile"""
+        target = self.get_last_stage() if target is None else target
+        if target not in self.stages:
+            raise Exception("Target stage %s not found in Dockerfile" % target)
+        dependencies = self.get_stage_dependencies()
+        required = set()
+        pending = [target]
+        while pending:
+            stage = pending.pop()
+            if stage not in required:
+                required.add(stage)
+                pending.extend(dependencies[stage])
+        return [stage for stage in self.stages if stage in required]
+
+    def _find_stage(self, reference, before):
+        """the stage a FROM or COPY --from refers to by name or by number, None for images"""
+        if not reference:
+            return None
+        # the instructions before the first FROM form stage -1, it cannot be referred to
+        earlier_stages = [stage for stage in self.stages[:before] if stage != -1]
+        if reference.isdigit():
+            return earlier_stages[int(reference)] if int(reference) < len(earlier_stages) else None
+        return reference if reference in earlier_stages else None
+
     def contains_arg_with_name(self, name):
         """Returns true if arg is part of one of all instructions"""
         return name in set(instruction.name for instruction in self.get_instructions_of_type(Keywords.ARG))
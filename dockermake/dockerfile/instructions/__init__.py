@@ -1,53 +1,43 @@
 import importlib
-from inspect import isabstract
-import pkgutil
-import sys
 
 from dockermake.utils.helpers import dockerfile_keyword
 
-BASE_MODULE = importlib.import_module(__name__)
-MODULE_PREFIX = BASE_MODULE.__name__ + "."
-
-
-def _dynamically_load():
-    module_names = [m[1] for m in pkgutil.iter_modules(__path__, MODULE_PREFIX)]
-
-    # this is for pyinstaller
-    # see https://github.com/pyinstaller/pyinstaller/issues/1905
-    toc = set()
-    for importer in pkgutil.iter_importers('dockermake'):
-        if hasattr(importer, 'toc'):
-            toc |= importer.toc
-    for elm in toc:
-        if elm.startswith(MODULE_PREFIX):
-            module_names.append(elm)
-
-    for name in module_names:
-        try:
-            importlib.import_module(name)
-        except ImportError as msg:
-            raise Exception("could not load module %s: %s" % (name, msg))
-
-
-def _get_keywords():
+MODULE_PREFIX = __name__ + "."
+
+# The instruction classes are registered statically by module and class name, scanning the package with pkgutil on
+# every start was slow and needed a workaround for pyinstaller. New instructions have to be added here, the tests
+# compare the registry with the modules of the package.
+INSTRUCTIONS = [
+    ("add", "Add"),
+    ("arg", "Arg"),
+    ("cmd", "Cmd"),
+    ("copy", "Copy"),
+    ("entrypoint", "Entrypoint"),
+    ("env", "Env"),
+    ("expose", "Expose"),
+    ("from", "From"),
+    ("healthcheck", "Healthcheck"),
+    ("label", "Label"),
+    ("maintainer", "Maintainer"),
+    ("onbuild", "OnBuild"),
+    ("run", "Run"),
+    ("shell", "Shell"),
+    ("stopsignal", "StopSignal"),
+    ("user", "User"),
+    ("volume", "Volume"),
+    ("workdir", "Workdir"),
+]
+
+
+def _load():
     keywords = dict()
-    instruction_base_module = sys.modules[MODULE_PREFIX + "instruction_base"]
-    instruction_base_class = getattr(instruction_base_module, "InstructionBase")
-    for instruction_class in _get_all_subclasses(instruction_base_class):
-        keyword = get_keyword_from_class(instruction_class)
-        keywords[keyword] = instruction_class
+    for module_name, class_name in INSTRUCTIONS:
+        # "from" is a reserved word, the modules cannot be imported with import statements
+        instruction_class = getattr(importlib.import_module(MODULE_PREFIX + module_name), class_name)
+        keywords[get_keyword_from_class(instruction_class)] = instruction_class
     return keywords
 
 
-def _get_all_subclasses(cls):
-    all_subclasses = []
-    for subclass in cls.__subclasses__():
-        if not isabstract(subclass):
-            all_subclasses.append(subclass)
-        all_subclasses.extend(_get_all_subclasses(subclass))
-    return all_subclasses
-
-
 def get_keyword_from_class(instruction_class):
     return instruction_class.__name__.upper()
 
@@ -56,12 +46,7 @@ def get_class_from_keyword(keyword):
     return Keywords.mapping[keyword]
 
 
-# We load the instruction classes dynamically in order not to have to define
-# all the instructions for the factory statically. New instructions will
-# automatically be picked up and the keyword (class_name.upper()) will be added accordingly.
-
-_dynamically_load()
-Keywords = dockerfile_keyword(**_get_keywords())
+Keywords = dockerfile_keyword(**_load())
 
 
 class InstructionFactory:
@@ -11,6 +11,7 @@ class ExecFormBase(InstructionBase, metaclass=ABCMeta):
     QuotingType = enum('SINGLE', 'DOUBLE', 'BOTH')
     SINGLE_QUOTED_STRING = InstructionBase.pp_quoted(quote="'", unquote=True).setName("single quoted string")
     DOUBLE_QUOTED_STRING = InstructionBase.pp_quoted(unquote=True).setName("double quoted string")
+    PURE_EXEC_FORMS = dict()
 
     @staticmethod
     def _exec_form_grammar(allow_shell_form=True):
@@ -36,6 +37,12 @@ class ExecFormBase(InstructionBase, metaclass=ABCMeta):
 
         return exec_form
 
+    @staticmethod
+    def _cached_pure_exec_form(quoting_type):
+        if quoting_type not in ExecFormBase.PURE_EXEC_FORMS:
+            ExecFormBase.PURE_EXEC_FORMS[quoting_type] = ExecFormBase._pure_exec_form(quoting_type=quoting_type)
+        return ExecFormBase.PURE_EXEC_FORMS[quoting_type]
+
     @staticmethod
     def _argument_from_quoting_type(quoting_type):
         if quoting_type == ExecFormBase.QuotingType.SINGLE:
@@ -56,7 +63,7 @@ class ExecFormBase(InstructionBase, metaclass=ABCMeta):
     @staticmethod
     def is_pure_double_quoted_exec_form(instruction):
         # first figure out if we have an exec form
-        regular_grammar = ExecFormBase._pure_exec_form(quoting_type=ExecFormBase.QuotingType.BOTH)
+        regular_grammar = ExecFormBase._cached_pure_exec_form(ExecFormBase.QuotingType.BOTH)
         is_pure_exec_form = False
         try:
             regular_grammar.parseString(instruction.argument, parseAll=True)
@@ -65,7 +72,7 @@ class ExecFormBase(InstructionBase, metaclass=ABCMeta):
             pass
         if is_pure_exec_form:
             # then check if it contains only of double quoted string
-            only_double = ExecFormBase._pure_exec_form(quoting_type=ExecFormBase.QuotingType.DOUBLE)
+            only_double = ExecFormBase._cached_pure_exec_form(ExecFormBase.QuotingType.DOUBLE)
             try:
                 only_double.parseString(instruction.argument, parseAll=True)
             except pp.ParseException:
@@ -1,4 +1,5 @@
 from abc import ABCMeta, abstractmethod
+import threading
 import pyparsing as pp
 
 from dockermake.dockerfile.instructions import get_keyword_from_class
@@ -9,16 +10,39 @@ pp.ParserElement.enablePackrat()
 class InstructionBase(metaclass=ABCMeta):
     """Abstract base class for all Instructions"""
 
+    __grammars = dict()
+    __grammars_lock = threading.RLock()
+
     def __init__(self, argument, physical_line_number=None):
         self.argument = argument
         self.physical_line_number = physical_line_number
         self.stage_name = None
         self.syntax_errors = list()
 
-        self.grammar = self.build_grammar()
+        self.grammar, self.result_names = self._get_grammar()
         parsed_results = self._parse_instruction()
         self._set_grammar_attributes(parsed_results)
 
+    def grammar_cache_key(self):
+        """
+        The grammar is built once per class and shared by all its instances. Instructions whose grammar depends on
+        the argument have to return a key that distinguishes the different grammars.
+        """
+        return self.get_type()
+
+    def _get_grammar(self):
+        key = self.grammar_cache_key()
+        with InstructionBase.__grammars_lock:
+            if key not in InstructionBase.__grammars:
+                grammar = self.build_grammar()
+                InstructionBase.__grammars[key] = (grammar, self._find_all_result_names(grammar))
+            return InstructionBase.__grammars[key]
+
+    @classmethod
+    def clear_grammar_cache(cls):
+        with InstructionBase.__grammars_lock:
+            InstructionBase.__grammars.clear()
+
     def _parse_instruction(self):
         result = dict()
         try:
@@ -33,7 +57,7 @@ class InstructionBase(metaclass=ABCMeta):
         """
         Writes all the result names defined in the grammar as attributes into the instruction class.
         """
-        for var_name in self._find_all_result_names(self.grammar):
+        for var_name in self.result_names:
             var_value = parse_result.get(var_name, None)
             if isinstance(var_value, pp.ParseResults):
                 var_value = var_value.asList()
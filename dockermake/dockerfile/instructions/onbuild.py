@@ -5,32 +5,41 @@ from dockermake.dockerfile.instructions import get_class_from_keyword
 
 
 class OnBuild(InstructionBase):
+    FORBIDDEN_KEYWORDS = ~pp.Literal("ONBUILD") + ~pp.Literal("MAINTAINER") + ~pp.Literal("FROM")
+    KEYWORD = (FORBIDDEN_KEYWORDS + pp.Word(pp.srange("[A-Z]")).setResultsName("onbuild").setName("keyword"))
+    KEYWORD_GRAMMAR = KEYWORD + pp.OneOrMore(pp.White()) + pp.restOfLine.setResultsName("onbuild_argument")
+
+    def __init__(self, argument, physical_line_number=None):
+        self.onbuild_instruction = None
+        super(OnBuild, self).__init__(argument, physical_line_number=physical_line_number)
+
+    def grammar_cache_key(self):
+        # the grammar depends on the instruction that is triggered on build
+        self.onbuild_instruction = self._create_onbuild_instruction()
+        if self.onbuild_instruction:
+            return self.get_type(), self.onbuild_instruction.get_type()
+        return self.get_type()
+
     def build_grammar(self):
-        forbidden_keywords = ~pp.Literal("ONBUILD") + ~pp.Literal("MAINTAINER") + ~pp.Literal("FROM")
-        keyword = (forbidden_keywords + pp.Word(pp.srange("[A-Z]")).setResultsName("onbuild").setName("keyword"))
-        grammar = keyword + pp.OneOrMore(pp.White()) + pp.restOfLine.setResultsName("onbuild_argument")
+        if self.onbuild_instruction:
+            return self.KEYWORD + self.onbuild_instruction.grammar
+        return self.KEYWORD_GRAMMAR
 
+    def _create_onbuild_instruction(self):
         try:
-            result = grammar.parseString(self.argument, parseAll=True)
-            onbuild_command = result.get("onbuild", None)
-            onbuild_argument = result.get("onbuild_argument", "")
-
-            if onbuild_command:
-                instruction_class = None
-                try:
-                    instruction_class = get_class_from_keyword(onbuild_command)
-                except KeyError:
-                    self.append_syntax_error(
-                        self.argument, hint="Instruction of type " + onbuild_command + " does not exist."
-                    )
-
-                if instruction_class:
-                    instruction = instruction_class(onbuild_argument, self.physical_line_number)
-                    foreign_grammar = instruction.build_grammar()
-                    grammar = keyword + foreign_grammar
-
+            result = self.KEYWORD_GRAMMAR.parseString(self.argument, parseAll=True)
         except pp.ParseException:
             # This will be reraised again by the instruction base anyway
-            pass
+            return None
+
+        onbuild_command = result.get("onbuild", None)
+        onbuild_argument = result.get("onbuild_argument", "")
+        if not onbuild_command:
+            return None
 
-        return grammar
+        try:
+            instruction_class = get_class_from_keyword(onbuild_command)
+        except KeyError:
+            self.append_syntax_error(self.argument, hint="Instruction of type " + onbuild_command + " does not exist.")
+            return None
+        return instruction_class(onbuild_argument, self.physical_line_number)
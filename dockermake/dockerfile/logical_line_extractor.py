@@ -1,9 +1,19 @@
 import pyparsing as pp
 
+from dockermake.constants import Constants
+from dockermake.dockerfile.logical_line_scanner import LogicalLineScanner
+
 pp.ParserElement.enablePackrat()
 
 
 class LogicalLineExtractor:
+    PYPARSING_BACKEND = "pyparsing"
+    SCANNER_BACKEND = "scanner"
+    BACKENDS = Constants.PARSER_BACKENDS
+
+    backend = Constants.DEFAULT_PARSER_BACKEND
+    __parser = None
+
     DEFAULT_WHITESPACE = ' \t'
     BACKSLASH = '\\'
     HASH_MARK = '#'
@@ -17,11 +27,23 @@ class LogicalLineExtractor:
     BLANKLINE = SOL + pp.LineEnd() | SOL + COMMENT + pp.LineEnd()
 
     @classmethod
-    def parse_dockerfile(cls, context):
+    def parse_dockerfile(cls, context, backend=None):
         """
-        Parses the logical lines of a Dockerfile with pyparse. Returns tuples of
+        Parses the logical lines of a Dockerfile with the selected backend. Returns tuples of
         tokens and physical line numbers.
         """
+        backend = backend or cls.backend
+        if backend == cls.SCANNER_BACKEND:
+            return LogicalLineScanner.parse_dockerfile(context)
+        if backend != cls.PYPARSING_BACKEND:
+            raise Exception("Unknown parser backend: %s" % backend)
+        return cls._parse_with_pyparsing(context)
+
+    @classmethod
+    def _parse_with_pyparsing(cls, context):
+        """
+        Parses the logical lines of a Dockerfile with pyparse.
+        """
         parser = cls._parser()
 
         logical_lines = list()
@@ -34,6 +56,13 @@ class LogicalLineExtractor:
 
     @classmethod
     def _parser(cls):
+        """the grammar is built once and reused for all Dockerfiles, e.g. when linting many of them"""
+        if cls.__parser is None:
+            cls.__parser = cls._build_parser()
+        return cls.__parser
+
+    @classmethod
+    def _build_parser(cls):
         # Exclude newlines from the default whitespace characters
         # We need to deal with them manually
         pp.ParserElement.setDefaultWhitespaceChars(cls.DEFAULT_WHITESPACE)
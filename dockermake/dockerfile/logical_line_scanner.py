@@ -0,0 +1,90 @@
+import re
+
+
+class LogicalLineScanner:
+    """
+    A hand-written, single pass alternative to the pyparsing based LogicalLineExtractor with the same output:
+    tuples of logical lines and the physical line numbers they start at.
+
+    The scanner follows the tokens of the pyparsing grammar: quoted strings protect from comments, a backslash
+    followed by a printable character is an escape code (spaces between the two are dropped), a backslash at the
+    end of a line continues the line and blank lines as well as comment lines within a continuation are skipped.
+    Contrary to pyparsing, it does not fail on non-ASCII characters outside of quoted strings and on continuations
+    at the end of the file.
+    """
+
+    TOKEN = re.compile(
+        r"(?P<white> +)"
+        r"|(?P<quoted>'(?:[^'\n\r\\]|\\.)*'|\"(?:[^\"\n\r\\]|\\.)*\")"
+        r"|(?P<word>[^\s#\\]+)"
+        r"|\\(?:(?P<escaped_hash>#)| *(?P<escaped>[^\s#]))"
+    )
+    CONTINUATION = re.compile(r"\\ *(?:#.*)?$")
+    SPECIAL_CHARACTERS = re.compile(r"[#\\'\"]")
+
+    @classmethod
+    def parse_dockerfile(cls, context):
+        logical_lines = list()
+        segments = list()
+        start_line_number = None
+
+        # pyparsing expands tabs before parsing as well
+        for line_number, line in enumerate(context.expandtabs().split("\n"), start=1):
+            line = line.rstrip("\r")
+            stripped = line.strip(" ")
+            if not stripped or stripped.startswith("#"):
+                # blank lines and comment lines, also within continuations
+                continue
+
+            text, continues = cls._scan_physical_line(line)
+            if start_line_number is None:
+                start_line_number = line_number
+            segments.append(text)
+
+            if not continues:
+                logical_lines.append(cls._join(segments, start_line_number))
+                segments = list()
+                start_line_number = None
+
+        if segments:
+            logical_lines.append(cls._join(segments, start_line_number))
+
+        return logical_lines
+
+    @classmethod
+    def _scan_physical_line(cls, line):
+        """returns the text of the line without comments and whether the line is continued"""
+        if not cls.SPECIAL_CHARACTERS.search(line):
+            return line, False
+
+        tokens = list()
+        position = 0
+        length = len(line)
+        while position < length:
+            match = cls.TOKEN.match(line, position)
+            if match:
+                if match.group("escaped_hash"):
+                    tokens.append("\\#")
+                elif match.group("escaped"):
+                    tokens.append("\\" + match.group("escaped"))
+                else:
+                    tokens.append(match.group(0))
+                position = match.end()
+                continue
+
+            character = line[position]
+            if character == "#":
+                break
+            if character == "\\" and cls.CONTINUATION.match(line, position):
+                return "".join(tokens), True
+            # pyparsing does not accept any other character, be lenient and take it as it is
+            tokens.append(character)
+            position += 1
+
+        return "".join(tokens), False
+
+    @staticmethod
+    def _join(segments, start_line_number):
+        last = len(segments) - 1
+        text = "".join(segment.lstrip() if i < last else segment.strip() for i, segment in enumerate(segments))
+        return text, start_line_number
@@ -1,19 +1,41 @@
 import logging
+import os
+import re
+import threading
 import urllib.parse
 
 from dockermake.utils.helpers import System
+from dockermake.utils.profiler import Profiler
 
 
+@Profiler.profiled("git.sha1")
 def get_gitsha1_hash_of_head():
-    cmd = ["git", "rev-parse", "--short=8", "HEAD"]
-    out, _, _ = System.run_command(cmd, fail_on_bad_return_code=False)
-    return out
+    return GitMetadata.for_working_directory().get_gitsha1_hash_of_head()
 
 
+@Profiler.profiled("git.remote-url")
 def get_git_remote_origin_url():
-    cmd = ["git", "config", "--get", "remote.origin.url"]
-    url, _, _ = System.run_command(cmd, fail_on_bad_return_code=False)
-    return url
+    return GitMetadata.for_working_directory().get_git_remote_origin_url()
+
+
+@Profiler.profiled("git.repository")
+def get_git_repository():
+    return GitMetadata.for_working_directory().get_git_repository()
+
+
+@Profiler.profiled("git.refresh")
+def refresh_git_metadata_if_head_changed():
+    GitMetadata.for_working_directory().refresh_if_head_changed()
+
+
+def get_changed_files(ref, working_directory):
+    """
+    The files below the working directory that differ from the ref, including uncommitted and untracked files. The
+    paths are relative to the working directory.
+    """
+    changed, _, _ = System.run_command(["git", "diff", "--name-only", "--relative", ref], cwd=working_directory)
+    untracked, _, _ = System.run_command(["git", "ls-files", "--others", "--exclude-standard"], cwd=working_directory)
+    return sorted(set(path for path in (changed + "\n" + untracked).splitlines() if path.strip()))
 
 
 def extract_git_repository(url):
@@ -37,3 +59,222 @@ def extract_git_repository(url):
 
     logging.debug("Git server and repository (derived from git remote url) is: %s", group)
     return group
+
+
+class GitMetadata:
+    """
+    Resolves HEAD, the remote url and the repository identity of the git repository in a working directory once
+    and serves all later calls from a cache.
+
+    The files in the .git directory are read directly. git is only forked if the repository layout is not
+    understood, e.g. for includes in the git config or refs that cannot be resolved from the files.
+    """
+
+    SHORT_SHA1_LENGTH = 8
+    SHA1_PATTERN = re.compile(r"^[0-9a-f]{40}$")
+    MAX_SYMBOLIC_REF_DEPTH = 5
+
+    __instances = dict()
+    __instances_lock = threading.Lock()
+
+    class _Unresolvable(Exception):
+        pass
+
+    def __init__(self, working_directory):
+        self.working_directory = working_directory
+        self.lock = threading.RLock()
+        self.cache = dict()
+        self.head = None
+
+    @classmethod
+    def for_working_directory(cls, working_directory=None):
+        working_directory = os.path.abspath(working_directory or os.getcwd())
+        with cls.__instances_lock:
+            if working_directory not in cls.__instances:
+                cls.__instances[working_directory] = GitMetadata(working_directory)
+            return cls.__instances[working_directory]
+
+    @classmethod
+    def clear(cls):
+        with cls.__instances_lock:
+            cls.__instances.clear()
+
+    def get_gitsha1_hash_of_head(self):
+        return self._cached("sha1", self._resolve_gitsha1_hash_of_head)
+
+    def get_git_remote_origin_url(self):
+        return self._cached("remote_url", self._resolve_git_remote_origin_url)
+
+    def get_git_repository(self):
+        return self._cached("repository", lambda: extract_git_repository(self.get_git_remote_origin_url()))
+
+    def refresh_if_head_changed(self):
+        """
+        Commands (e.g. the before commands) may check out another revision. Only then the cache is invalidated.
+        """
+        with self.lock:
+            if not self.cache:
+                return
+            try:
+                head = self._read_head()
+            except GitMetadata._Unresolvable:
+                head = None
+            if head is None or head != self.head:
+                logging.debug("Git HEAD has changed, invalidating the cached git metadata")
+                self.cache.clear()
+
+    def _cached(self, key, resolve):
+        with self.lock:
+            if key not in self.cache:
+                if not self.cache:
+                    try:
+                        self.head = self._read_head()
+                    except GitMetadata._Unresolvable:
+                        self.head = None
+                self.cache[key] = resolve()
+            return self.cache[key]
+
+    def _resolve_gitsha1_hash_of_head(self):
+        try:
+            git_dir, common_dir = self._find_git_dirs()
+            if git_dir is None:
+                return ""
+            sha1 = self._resolve_ref(git_dir, common_dir, "HEAD")
+            return sha1[:self.SHORT_SHA1_LENGTH]
+        except GitMetadata._Unresolvable as exception:
+            logging.debug("Falling back to git for resolving HEAD: %s", exception)
+        cmd = ["git", "rev-parse", "--short=%d" % self.SHORT_SHA1_LENGTH, "HEAD"]
+        out, _, _ = System.run_command(cmd, fail_on_bad_return_code=False, cwd=self.working_directory)
+        return out
+
+    def _resolve_git_remote_origin_url(self):
+        try:
+            git_dir, common_dir = self._find_git_dirs()
+            if git_dir is None:
+                return ""
+            return self._read_config_value(common_dir, "remote", "origin", "url")
+        except GitMetadata._Unresolvable as exception:
+            logging.debug("Falling back to git for resolving the remote url: %s", exception)
+        cmd = ["git", "config", "--get", "remote.origin.url"]
+        url, _, _ = System.run_command(cmd, fail_on_bad_return_code=False, cwd=self.working_directory)
+        return url
+
+    def _read_head(self):
+        git_dir, common_dir = self._find_git_dirs()
+        if git_dir is None:
+            return None
+        return self._resolve_ref(git_dir, common_dir, "HEAD")
+
+    def _find_git_dirs(self):
+        """returns the git directory and the common git directory (differs for worktrees)"""
+        if any(variable in os.environ for variable in ("GIT_DIR", "GIT_COMMON_DIR", "GIT_WORK_TREE")):
+            raise GitMetadata._Unresolvable("git environment variables are set")
+
+        directory = self.working_directory
+        while True:
+            candidate = os.path.join(directory, ".git")
+            if os.path.isdir(candidate):
+                git_dir = candidate
+                break
+            if os.path.isfile(candidate):
+                content = self._read_file(candidate)
+                if not content.startswith("gitdir:"):
+                    raise GitMetadata._Unresolvable("unknown .git file format")
+                git_dir = os.path.join(directory, content[len("gitdir:"):].strip())
+                break
+            parent = os.path.dirname(directory)
+            if parent == directory:
+                return None, None
+            directory = parent
+
+        common_dir = git_dir
+        commondir_file = os.path.join(git_dir, "commondir")
+        if os.path.isfile(commondir_file):
+            common_dir = os.path.join(git_dir, self._read_file(commondir_file))
+        return os.path.normpath(git_dir), os.path.normpath(common_dir)
+
+    def _resolve_ref(self, git_dir, common_dir, ref, depth=0):
+        if depth > self.MAX_SYMBOLIC_REF_DEPTH:
+            raise GitMetadata._Unresolvable("too many levels of symbolic refs")
+
+        # HEAD and other pseudo refs belong to the worktree, all other refs to the common directory
+        base_dir = git_dir if "/" not in ref else common_dir
+        path = os.path.join(base_dir, ref)
+        if os.path.isfile(path):
+            content = self._read_file(path)
+            if content.startswith("ref:"):
+                return self._resolve_ref(git_dir, common_dir, content[len("ref:"):].strip(), depth + 1)
+            if self.SHA1_PATTERN.match(content):
+                return content
+            raise GitMetadata._Unresolvable("unknown format of ref %s" % ref)
+
+        sha1 = self._read_packed_ref(common_dir, ref)
+        if sha1 is None:
+            raise GitMetadata._Unresolvable("ref %s not found" % ref)
+        return sha1
+
+    def _read_packed_ref(self, common_dir, ref):
+        path = os.path.join(common_dir, "packed-refs")
+        if not os.path.isfile(path):
+            return None
+        with open(path, "r", encoding="UTF-8") as packed_refs:
+            for line in packed_refs:
+                if line.startswith("#") or line.startswith("^"):
+                    continue
+                parts = line.strip().split(" ", 1)
+                if len(parts) == 2 and parts[1] == ref and self.SHA1_PATTERN.match(parts[0]):
+                    return parts[0]
+        return None
+
+    def _read_config_value(self, common_dir, section, subsection, key):
+        path = os.path.join(common_dir, "config")
+        if not os.path.isfile(path):
+            return ""
+
+        value = ""
+        in_section = False
+        with open(path, "r", encoding="UTF-8") as config:
+            for line in config:
+                line = line.strip()
+                if not line or line[0] in "#;":
+                    continue
+                if line.startswith("["):
+                    header = re.match(r'^\[\s*([\w.-]+)(?:\s+"((?:[^"\\]|\\.)*)")?\s*\]', line)
+                    if not header:
+                        raise GitMetadata._Unresolvable("unknown git config section format: %s" % line)
+                    name = header.group(1).lower()
+                    if name in ("include", "includeif"):
+                        raise GitMetadata._Unresolvable("git config contains includes")
+                    in_section = name == section and header.group(2) == subsection
+                    continue
+                if in_section:
+                    name, _, raw_value = line.partition("=")
+                    if name.strip().lower() == key:
+                        # the last value wins, as it does for git config --get
+                        value = self._parse_config_value(raw_value)
+        return value
+
+    @staticmethod
+    def _parse_config_value(raw_value):
+        value = ""
+        quoted = False
+        iterator = iter(raw_value.strip())
+        for character in iterator:
+            if character == '"':
+                quoted = not quoted
+            elif character == "\\":
+                escaped = next(iterator, "")
+                value += {"n": "\n", "t": "\t", "b": "\b"}.get(escaped, escaped)
+            elif character in "#;" and not quoted:
+                break
+            else:
+                value += character
+        return value.strip() if not quoted else value
+
+    @staticmethod
+    def _read_file(path):
+        try:
+            with open(path, "r", encoding="UTF-8") as file:
+                return file.read().strip()
+        except (IOError, UnicodeDecodeError) as exception:
+            raise GitMetadata._Unresolvable("cannot read %s: %s" % (path, exception))
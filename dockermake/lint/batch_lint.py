@@ -0,0 +1,84 @@
+from concurrent.futures import ProcessPoolExecutor
+import glob
+import logging
+import multiprocessing
+import os
+
+from dockermake.dockerfile.dockerfile import Dockerfile
+from dockermake.lint.linter import DockerfileLint
+from dockermake.lint.linting_exception import LintingException
+from dockermake.utils import display
+
+
+class BatchLint:
+    """
+    Lints many Dockerfiles in one run, e.g. all Dockerfiles of a monorepo. The Dockerfiles are parsed and linted by a
+    pool of processes, the findings of all Dockerfiles are reported at once in the order of the given paths.
+
+    The worker processes are forked, so that they start with the registries and the grammars already loaded by this
+    process instead of importing and loading them again.
+    """
+
+    def __init__(self, exclude=None, cache=None, jobs=None):
+        self.exclude = exclude
+        self.cache = cache
+        self.jobs = jobs or os.cpu_count() or 1
+
+    @staticmethod
+    def find_dockerfiles(work_dir, patterns, dockerfile_name):
+        """
+        Resolves the paths and glob patterns relative to the working directory. A directory stands for the Dockerfile
+        in it, ** matches any number of directories.
+        """
+        paths = dict()
+        for pattern in patterns:
+            matches = list()
+            for path in sorted(glob.glob(os.path.join(work_dir, pattern), recursive=True)):
+                if os.path.isdir(path):
+                    path = os.path.join(path, dockerfile_name)
+                if os.path.isfile(path):
+                    matches.append(os.path.normpath(path))
+            if not matches:
+                raise Exception("No Dockerfile found at %s" % pattern)
+            paths.update(dict.fromkeys(matches))
+        return list(paths)
+
+    def lint(self, paths):
+        """lints all Dockerfiles and raises a LintingException if any of them has errors"""
+        jobs = min(self.jobs, len(paths))
+        if jobs > 1:
+            logging.info("Linting %d Dockerfiles with %d processes", len(paths), jobs)
+            context = multiprocessing.get_context("fork") if hasattr(os, "fork") else None
+            with ProcessPoolExecutor(max_workers=jobs, mp_context=context) as executor:
+                chunksize = max(1, len(paths) // (jobs * 4))
+                results = list(executor.map(_lint_dockerfile, paths, [self.exclude] * len(paths),
+                                            [self.cache] * len(paths), chunksize=chunksize))
+        else:
+            results = [_lint_dockerfile(path, self.exclude, self.cache) for path in paths]
+
+        failed = 0
+        with_warnings = 0
+        for path, (errors, warnings) in zip(paths, results):
+            DockerfileLint.print_step(path)
+            DockerfileLint.print_findings(errors, warnings)
+            if errors:
+                failed += 1
+            elif warnings:
+                with_warnings += 1
+
+        summary = "Linted %d Dockerfiles: %d failed, %d with warning(s)" % (len(paths), failed, with_warnings)
+        if failed:
+            display.error(summary)
+            raise LintingException("Linting failed for %d of %d Dockerfiles" % (failed, len(paths)))
+        display.info(summary, color="green")
+
+
+def _lint_dockerfile(path, exclude, cache):
+    """returns the errors and warnings of the Dockerfile, runs in the worker processes"""
+    try:
+        dockerfile = Dockerfile.load_from_file_path(path)
+    except Exception as exception:  # pylint: disable=broad-except
+        return ["Dockerfile could not be parsed: %s" % exception], list()
+    linter = DockerfileLint(dockerfile, exit_on_errors=False, exclude=exclude, cache=cache)
+    linter.validate()
+    return linter.errors, linter.warnings
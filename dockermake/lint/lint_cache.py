@@ -0,0 +1,81 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+from dockermake.constants import Constants
+
+
+class LintCache:
+    """
+    Persistent cache of linting results, addressed by a hash over everything the result depends on.
+
+    Every result is stored in a file of its own. The modification time of a file is updated on every hit, so that
+    the least recently used results are evicted first once the cache exceeds its maximum size. The cache may be
+    shared by concurrent runs, failures to read or write it are never fatal.
+    """
+
+    FILE_EXTENSION = ".json"
+
+    def __init__(self, directory=None, max_size=None):
+        self.directory = os.path.join(directory or Constants.CACHE_DIR, "lint")
+        self.max_size = Constants.DEFAULT_LINT_CACHE_MAX_SIZE if max_size is None else max_size
+
+    @staticmethod
+    def key(content, rules, exclude, version, registries):
+        digest = hashlib.sha256()
+        digest.update(content.encode("UTF-8"))
+        digest.update(json.dumps([sorted(rules), sorted(exclude), version, registries], sort_keys=True,
+                                 default=str).encode("UTF-8"))
+        return digest.hexdigest()
+
+    def get(self, key):
+        """returns the stored errors and warnings or None"""
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="UTF-8") as cache_file:
+                result = json.load(cache_file)
+            os.utime(path)
+        except (IOError, OSError, ValueError) as exception:
+            logging.debug("No linting result in cache for %s: %s", key, exception)
+            return None
+        logging.info("Replaying linting result from cache: %s", path)
+        return result["errors"], result["warnings"]
+
+    def put(self, key, errors, warnings):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            descriptor, temporary_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(descriptor, "w", encoding="UTF-8") as cache_file:
+                json.dump(dict(errors=errors, warnings=warnings), cache_file)
+            # replacing is atomic, concurrent readers see either no or a complete result
+            os.replace(temporary_path, self._path(key))
+            self.evict()
+        except (IOError, OSError) as exception:
+            logging.warning("Could not write linting result to cache %s: %s", self.directory, exception)
+
+    def evict(self):
+        entries = list()
+        for name in os.listdir(self.directory):
+            if not name.endswith(self.FILE_EXTENSION):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+
+        size = sum(entry_size for _, entry_size, _ in entries)
+        for _, entry_size, name in sorted(entries):
+            if size <= self.max_size:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+                logging.debug("Evicted linting result from cache: %s", name)
+            except OSError:
+                pass
+            size -= entry_size
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + self.FILE_EXTENSION)
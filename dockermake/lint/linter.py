@@ -1,4 +1,7 @@
+from functools import lru_cache
+import hashlib
 import logging
+import sys
 
 from dockermake.lint.rules.general import GeneralRules
 from dockermake.lint.rules.every_stage import EveryStageRules
@@ -7,14 +10,20 @@ from dockermake.lint.rules.last_stage import LastStageRules
 
 from dockermake.lint.linting_exception import LintingException
 
+from dockermake.registries.registries import Registries
+from dockermake.version import VERSION
+
 from dockermake.utils import display
 
 
 class DockerfileLint:
     """Linting of Dockerfile against common coding style rules."""
 
-    def __init__(self, dockerfile, exit_on_errors=True, exclude=None):
+    RULE_SETS = [GeneralRules, EveryStageRules, LastStageRules, BuilderStagesRules]
+
+    def __init__(self, dockerfile, exit_on_errors=True, exclude=None, cache=None):
         self.dockerfile = dockerfile
+        self.cache = cache
         self.exit_on_errors = exit_on_errors
         self.exclude = []
         if exclude and isinstance(exclude, list):
@@ -25,29 +34,76 @@ class DockerfileLint:
         self.errors = list()
 
     def lint(self):
-        display.info("Step 0 : Linting \"%s\"" % str(self.dockerfile))
+        self.print_step(str(self.dockerfile))
 
-        self.validate_syntax()
-        self.validate_rules()
+        self.validate()
+        self.print_findings(self.errors, self.warnings)
+
+        if self.exit_on_errors and self.errors:
+            raise LintingException("Linting failed")
+
+    @staticmethod
+    def print_step(name):
+        display.info("Step 0 : Linting \"%s\"" % name)
 
-        for error in self.errors:
+    @staticmethod
+    def print_findings(errors, warnings):
+        for error in errors:
             display.error("---> %s" % error)
 
         with_warnings = ""
-        if self.warnings:
-            for warning in self.warnings:
+        if warnings:
+            for warning in warnings:
                 display.warn("---> [WARNING] %s" % warning)
-            if not self.errors:
+            if not errors:
                 with_warnings = " with warning(s)"
 
-        result = "---> %s%s" % ("FAILED" if self.errors else "OK", with_warnings)
-        if self.errors:
+        result = "---> %s%s" % ("FAILED" if errors else "OK", with_warnings)
+        if errors:
             display.error(result)
         else:
             display.info(result, color="green")
 
-        if self.exit_on_errors and self.errors:
-            raise LintingException("Linting failed")
+    def validate(self):
+        key = self._cache_key() if self.cache else None
+        cached = self.cache.get(key) if key else None
+        if cached is not None:
+            self.errors, self.warnings = cached
+            return
+
+        self.validate_syntax()
+        self.validate_rules()
+
+        if key:
+            self.cache.put(key, self.errors, self.warnings)
+
+    def _cache_key(self):
+        rules = list()
+        for rule_set in self.RULE_SETS:
+            rules += ["%s.%s" % (rule_set.__name__, rule) for rule in self.gather_rules(rule_set, self.exclude)]
+        registries = Registries()
+        relevant_registries = [registries.push_only_to_defined_registries, sorted(registries.get().keys())]
+        version = [VERSION, self._rules_digest()]
+        return self.cache.key(self.dockerfile.context, rules, self.exclude, version, relevant_registries)
+
+    @classmethod
+    @lru_cache(maxsize=None)
+    def _rules_digest(cls):
+        """
+        hash over the sources of the rule sets, the version alone is "devel" for development installs and does not
+        change along with the rules
+        """
+        digest = hashlib.sha256()
+        modules = sorted({base.__module__ for rule_set in cls.RULE_SETS for base in rule_set.__mro__
+                          if base.__module__.startswith("dockermake.")})
+        for module in modules:
+            digest.update(module.encode("UTF-8"))
+            try:
+                with open(sys.modules[module].__file__, "rb") as source:
+                    digest.update(source.read())
+            except (AttributeError, TypeError, IOError, OSError) as exception:
+                logging.debug("Could not read the source of %s: %s", module, exception)
+        return digest.hexdigest()
 
     def validate_syntax(self):
         for instruction in self.dockerfile.instructions:
@@ -55,8 +111,7 @@ class DockerfileLint:
                 self.errors.append(syntax_error)
 
     def validate_rules(self):
-        rule_sets = [GeneralRules, EveryStageRules, LastStageRules, BuilderStagesRules]
-        for rule_set in rule_sets:
+        for rule_set in self.RULE_SETS:
             self.validate_rule_set(rule_set)
 
     def validate_rule_set(self, rule_set):
@@ -1,18 +1,29 @@
+from concurrent.futures import ThreadPoolExecutor
+import functools
 import os
 import logging
 import json
-
-from mock import patch
+import re
+import sys
+import time
 
 from dockermake.constants import Constants
 from dockermake.dockerfile.dockerfile import Dockerfile
 from dockermake.dockerfile.instructions import Keywords
+from dockermake.dockerfile.logical_line_extractor import LogicalLineExtractor
 from dockermake.config.loader import ConfigLoader
-from dockermake.docker.docker_cli_factory import DockerCliFactory
+from dockermake.docker.docker_cli_factory import LazyDockerCli
+from dockermake.docker.go_template import GoTemplate
 from dockermake.git import check_if_git_is_installed
-from dockermake.git.git import get_gitsha1_hash_of_head, get_git_remote_origin_url
+from dockermake.git.git import get_gitsha1_hash_of_head, get_git_remote_origin_url, \
+    refresh_git_metadata_if_head_changed
+from dockermake.lint.batch_lint import BatchLint
+from dockermake.lint.lint_cache import LintCache
 from dockermake.registries.registries import Registries
-from dockermake.utils.helpers import System
+from dockermake.utils.fingerprint import BuildFingerprint, BuildState
+from dockermake.utils.helpers import System, OutputOptions
+from dockermake.utils.profiler import Profiler
+from dockermake.utils.scheduler import BuildPlan, BuildScheduler, PushPipeline
 from dockermake.utils.summary_printer import SummaryPrinter
 from dockermake.utils import display
 
@@ -21,21 +32,54 @@ class Make:
     def __init__(self, args):
         self.args = args
         Dockerfile.dockerfile = self.args.dockerfile
+        LogicalLineExtractor.backend = self.args.parser_backend
+        System.output_log_file = self.args.output_log_file
+        if self.args.profile_out:
+            Profiler.reset(enabled=True)
         self.dockerfile = None
         self.config = None
-        self.docker_cli = DockerCliFactory.create()
+        self.docker = LazyDockerCli(backend=self.args.docker_backend, dry_run=self.args.dry_run)
+        self.plan = BuildPlan()
         self.registries = Registries()
         self.registries.load(self.args)
 
+    @property
+    def docker_cli(self):
+        """the docker backend is resolved on first use, linting and showing the builds work without docker"""
+        return self.docker.get()
+
+    @docker_cli.setter
+    def docker_cli(self, docker_cli):
+        self.docker.set(docker_cli)
+
+    @property
+    def image_inspector(self):
+        return self.docker.image_inspector()
+
     def run(self):
         if self.args.show_linting_rules:
             SummaryPrinter.print_rule_summary()
             return
 
-        self.dockerfile = Dockerfile.load(self.args.work_dir, self.args.dockerfile)
+        try:
+            self._run()
+        finally:
+            if self.args.profile_out:
+                # the profile of a failed run shows where it failed
+                Profiler.write(self.args.profile_out, self.args.profile_format)
+                logging.info("Wrote profile to %s", self.args.profile_out)
+
+    def _run(self):
+        if self.args.lint_files:
+            self._lint_many(self.args.lint_files)
+            return
+
+        self.load_dockerfile()
 
         if self.args.only_lint:
-            self.dockerfile.lint(exit_on_errors=True, exclude=self.args.exclude_linting_rules)
+            with Profiler.phase("lint"):
+                self.dockerfile.lint(exit_on_errors=True, exclude=self.args.exclude_linting_rules,
+                                     cache=self._lint_cache())
             return
         self._lint()
 
@@ -55,28 +99,54 @@ class Make:
     def check_prerequisites():
         check_if_git_is_installed()
 
+    def load_dockerfile(self):
+        self.dockerfile = Dockerfile.load(self.args.work_dir, self.args.dockerfile)
+
+    def build_all(self):
+        """lints the loaded Dockerfile and runs all builds of the loaded config"""
+        self._lint()
+        self._make()
+
     def load(self):
-        self.config = ConfigLoader.load(self.args.work_dir, additional_build_args=self.args.docker_build_args,
-                                        alternative_file=self.args.file)
+        with Profiler.phase("config.load"):
+            self.config = ConfigLoader.load(self.args.work_dir, additional_build_args=self.args.docker_build_args,
+                                            alternative_file=self.args.file)
         self._prepare_config()
         self._validate_config()
 
     def _prepare_config(self):
-        self.config.add_metadata_to_config(self.dockerfile)
-        self.config.expand()
+        with Profiler.phase("config.expand"):
+            self.config.add_metadata_to_config(self.dockerfile)
+            self.config.expand()
 
     def _validate_config(self):
-        self.config.validate(self.dockerfile)
+        with Profiler.phase("config.validate"):
+            self.config.validate(self.dockerfile)
 
+    @Profiler.profiled("lint")
     def _lint(self):
         if self.args.linting is None:
             return
 
         if self.args.linting == 'exit_on_errors':
-            self.dockerfile.lint(exit_on_errors=True, exclude=self.args.exclude_linting_rules)
+            self.dockerfile.lint(exit_on_errors=True, exclude=self.args.exclude_linting_rules,
+                                 cache=self._lint_cache())
 
         if self.args.linting == 'proceed_on_errors':
-            self.dockerfile.lint(exit_on_errors=False, exclude=self.args.exclude_linting_rules)
+            self.dockerfile.lint(exit_on_errors=False, exclude=self.args.exclude_linting_rules,
+                                 cache=self._lint_cache())
+
+    @Profiler.profiled("lint")
+    def _lint_many(self, patterns):
+        paths = BatchLint.find_dockerfiles(self.args.work_dir, patterns, self.args.dockerfile)
+        batch_lint = BatchLint(exclude=self.args.exclude_linting_rules, cache=self._lint_cache(),
+                               jobs=self.args.lint_jobs)
+        batch_lint.lint(paths)
+
+    def _lint_cache(self):
+        if self.args.no_lint_cache:
+            return None
+        return LintCache()
 
     def _make(self):
         self._run_before_commands()
@@ -87,12 +157,29 @@ class Make:
         if not self.args.skip_registry_auth:
             self._run_registry_auth_commands()
 
-        build_summary = list()
-        for build in self.config.get_builds():
-            self._run_before_build_commands(build)
-            summary_part = self._run_docker_build_and_push_commands(build)
-            build_summary.append(summary_part)
-            self._run_after_build_commands(build)
+        self.plan.build_state = self._load_build_state()
+        builds = self.config.get_builds()
+        dependencies = self._get_build_dependencies(builds)
+        if not self.args.no_deduplicate_builds:
+            self._get_duplicate_builds(builds, dependencies)
+        if self.args.prepull and self.pull():
+            self._prepull_base_images(self.config.get_builds())
+        if self.args.create_parent_label:
+            self._prefetch_base_images(self.config.get_builds())
+        if self.args.jobs > 1 and not self.args.no_prebuild_shared_stages and not self.args.no_cache \
+                and not self.plan.build_state:
+            self._prebuild_shared_stages(builds)
+
+        scheduler = BuildScheduler(jobs=self.args.jobs, fail_fast=not self.args.keep_going)
+        if self.args.pipeline_push:
+            self.plan.push_pipeline = PushPipeline(fail_fast=not self.args.keep_going)
+        try:
+            build_summary = scheduler.run(builds, self._run_build, dependencies=dependencies)
+        finally:
+            if self.plan.push_pipeline:
+                # waiting for the pushes also when a build failed, the build failure takes precedence
+                self.plan.push_pipeline.wait(raise_failures=sys.exc_info()[0] is None)
+                self.plan.push_pipeline = None
 
         self._run_after_commands()
 
@@ -100,21 +187,25 @@ class Make:
         if self.args.summary:
             SummaryPrinter.print_full_build_summary(build_summary)
 
+    @Profiler.profiled("before-commands")
     def _run_before_commands(self):
         self._run_commands(self.config.get_before_commands(), "before commands")
+        refresh_git_metadata_if_head_changed()
 
     def _run_commands(self, commands, name):
         logging.info("Running %s", name)
         if commands:
-            System.run_commands(commands, dry_run=self.args.dry_run, with_continuous_output=True,
+            System.run_commands(commands, dry_run=self.args.dry_run, output=OutputOptions(continuous=True),
                                 cwd=self.args.work_dir, shell=True)
             logging.info("Finished running %s", name)
         else:
             logging.info("No commands given, continuing...")
 
+    @Profiler.profiled("after-commands")
     def _run_after_commands(self):
         self._run_commands(self.config.get_after_commands(), "after commands")
 
+    @Profiler.profiled("purge")
     def _purge(self):
         image = self.config.get_image_name()
         logging.info("Retrieving images to purge")
@@ -123,10 +214,11 @@ class Make:
         if images_to_purge:
             logging.info("Running purge command")
             self.docker_cli.remove_images(images_to_purge, force=True, dry_run=self.args.dry_run,
-                                          with_continuous_output=True)
+                                          output=OutputOptions(continuous=True))
         else:
             logging.info("No images to purge")
 
+    @Profiler.profiled("registry-auth")
     def _run_registry_auth_commands(self):
         registry_name = self.config.get_registry_host()
 
@@ -134,75 +226,389 @@ class Make:
         if user and password:
             logging.info("Running registry auth commands")
             self.docker_cli.login(registry_name, user=user, password=password, dry_run=self.args.dry_run,
-                                  with_continuous_output=False, omit_printing_output=self.omit_sensible_output())
+                                  output=OutputOptions(omit=self.omit_sensible_output()))
         else:
             logging.info("Skipping authentication, no registry auth credentials provided")
 
+    def _load_build_state(self):
+        if not self.args.skip_unchanged:
+            return None
+        if self.args.dry_run or not self.push():
+            logging.info("Not skipping unchanged builds, images are only known to be unchanged once they are pushed")
+            return None
+        return BuildState(self.args.build_state_file)
+
+    def _run_build(self, build):
+        with Profiler.build(build["name"]), Profiler.phase("build"):
+            return self._run_build_phases(build)
+
+    def _run_build_phases(self, build):
+        self._run_before_build_commands(build)
+        summary_part = self._gather_build_inputs(build)
+        if self.plan.build_state and self._is_unchanged(summary_part):
+            display.info("Skipping build, nothing changed since the push of %s" % summary_part["digest"])
+            self._run_after_build_commands(build)
+            return summary_part
+        if self.plan.push_pipeline:
+            self._run_docker_build_command(build, summary_part)
+            self.plan.push_pipeline.submit(build["name"], self._run_pipelined_push, build, summary_part,
+                                           after=functools.partial(self._run_pipelined_after_build_commands, build))
+            return summary_part
+        self._run_docker_build_and_push_commands(build, summary_part)
+        self._run_after_build_commands(build)
+        return summary_part
+
+    @Profiler.profiled("before-build-commands")
     def _run_before_build_commands(self, build):
         self._run_commands(self.config.get_before_build_commands(build), "before build commands")
+        refresh_git_metadata_if_head_changed()
 
-    def _run_docker_build_and_push_commands(self, build):
+    def _run_docker_build_and_push_commands(self, build, summary_part=None):
+        summary_part = self._run_docker_build_command(build, summary_part)
+        self._run_docker_push_commands(summary_part)
+        return summary_part
+
+    @Profiler.profiled("build-inputs")
+    def _gather_build_inputs(self, build):
         summary_part = build.copy()
+        summary_part["build-args"] = self._gather_build_args(build)
+        summary_part["build-labels"] = self._gather_build_labels(build)
+        summary_part["build-tags"] = self._gather_image_tags(build)
+        summary_part["target"] = self._gather_build_target(build)
+        summary_part["cache-from"] = self._gather_cache_sources(build)
+        summary_part["cache-to"] = self.config.get_build_cache_to(build) + self.args.cache_to
+        return summary_part
 
-        summary_part["build-args"] = build_args = self._gather_build_args(build)
-        summary_part["build-labels"] = build_labels = self._gather_build_labels(build)
-        summary_part["build-tags"] = image_tags = self._gather_image_tags(build)
+    def _gather_cache_sources(self, build):
+        """
+        With --registry-cache, the pushed tags of the build are cache sources. The tag of the git sha1 of the default
+        build is left out, it is new for every commit.
+        """
+        cache_sources = self.config.get_build_cache_from(build) + self.args.cache_from
+        if self.args.registry_cache:
+            cache_sources += [self.config.get_image_name(tag=tag) for tag in self.config.get_build_tags(build)]
+        return list(dict.fromkeys(cache_sources))
+
+    @Profiler.profiled("unchanged-check")
+    def _is_unchanged(self, summary_part):
+        """
+        A build is unchanged if the fingerprint of its inputs was pushed before and all its tags still resolve to the
+        pushed digest in the registry.
+        """
+        try:
+            summary_part["fingerprint"] = fingerprint = self._fingerprint(summary_part)
+        except Exception as exception:  # pylint: disable=broad-except
+            logging.info("Could not fingerprint build, building it: %s", exception)
+            return False
+
+        entry = self.plan.build_state.get(fingerprint)
+        if not entry:
+            logging.info("Build fingerprint %s is unknown", fingerprint)
+            return False
+
+        for tag in summary_part["build-tags"]:
+            remote_digest = self._get_remote_digest(tag)
+            if remote_digest != entry["digest"]:
+                logging.info("Tag %s resolves to %s instead of %s", tag, remote_digest, entry["digest"])
+                return False
+
+        summary_part["digest"] = entry["digest"]
+        return True
+
+    def _fingerprint(self, summary_part):
+        parent_label_prefix = self.args.parent_label_name + "="
+        base_images = self._get_external_base_images(summary_part["build-args"])
+        image_ids = self._get_image_ids(base_images)
+        inputs = dict(
+            build_args=summary_part["build-args"],
+            # the parent label holds the url of the current ci job, the parents are covered by the base images
+            labels=[label for label in summary_part["build-labels"] if not label.startswith(parent_label_prefix)],
+            tags=summary_part["build-tags"],
+            target=summary_part["target"],
+            base_images=[[image, image_ids[image]] for image in base_images],
+        )
+        dockerfile_path = os.path.join(self.args.work_dir, self.args.dockerfile)
+        return BuildFingerprint.compute(self.args.work_dir, dockerfile_path, inputs)
+
+    def _get_image_ids(self, images):
+        if self.pull_on_build():
+            # the build would pull newer base images as well
+            for image in images:
+                self.docker_cli.pull(image)
+            self.image_inspector.forget(images)
+        return self.inspect_images(images, output_format="{{ json .Id }}")
+
+    def _get_remote_digest(self, tag):
+        output, _, return_code = self.docker_cli.manifest_inspect(tag, verbose=True, fail_on_bad_return_code=False)
+        if return_code != 0 or not output:
+            return None
+        manifest = json.loads(output)
+        if not isinstance(manifest, dict):
+            # a manifest list is never pushed by docker-make
+            return None
+        return manifest.get("Descriptor", dict()).get("digest")
+
+    def _run_docker_build_command(self, build, summary_part=None):
+        summary_part = summary_part or self._gather_build_inputs(build)
+        source_image = self.plan.images_of_builds.get(self.plan.duplicate_builds.get(build["name"]))
+        if source_image:
+            self._tag_image(source_image, summary_part)
+            return summary_part
+
+        build_args = summary_part["build-args"]
+        if self.args.registry_cache:
+            # the pushed image carries the cache metadata, later builds use it through --cache-from
+            build_args = build_args + [Constants.INLINE_CACHE_BUILD_ARG]
 
         logging.info("Running docker build command")
-        self.docker_cli.build(
-            self.args.work_dir,
-            build_args=build_args,
-            labels=build_labels,
-            no_cache=self.args.no_cache,
-            target=self.args.target,
-            remove=True,
-            file=os.path.join(self.args.work_dir, self.args.dockerfile),
-            tags=image_tags,
-            pull=self.pull(),
-            dry_run=self.args.dry_run,
-            with_continuous_output=True
-        )
+        with Profiler.phase("docker-build"):
+            self.docker_cli.build(
+                self.args.work_dir,
+                build_args=build_args,
+                labels=summary_part["build-labels"],
+                no_cache=self.args.no_cache,
+                target=summary_part["target"],
+                remove=True,
+                file=os.path.join(self.args.work_dir, self.args.dockerfile),
+                tags=summary_part["build-tags"],
+                pull=self.pull_on_build() and not self._uses_images_built_here(summary_part["build-args"]),
+                cache_from=summary_part["cache-from"],
+                cache_to=summary_part["cache-to"],
+                dry_run=self.args.dry_run,
+                output=OutputOptions(continuous=True)
+            )
+        self.image_inspector.forget(summary_part["build-tags"])
+        if summary_part["build-tags"]:
+            self.plan.images_of_builds[build["name"]] = summary_part["build-tags"][0]
 
-        if self.push():
-            registry_name = self.config.get_registry_host()
-            self.registries.check_allowed_to_push(registry_name)
-            if image_tags:
-                logging.info("Running docker push commands")
-                for tag in image_tags:
-                    self.docker_cli.push(tag, dry_run=self.args.dry_run, with_continuous_output=True)
-
-                logging.debug("Inspecting image for summary")
-                inspect_output = self.inspect_image(image_tags[0], output_format="{{ json . }}")
-                for repo_digest in inspect_output.get("RepoDigests", []):
-                    summary_part["digest"] = repo_digest.split("@")[-1]
-                    break
-                props = dict(RepoDigests=inspect_output.get("RepoDigests"),
-                             RepoTags=inspect_output.get("RepoTags"),
-                             Size="%.2f MB" % (inspect_output.get("Size", 0) / 1024.0 / 1024.0),
-                             ID=inspect_output.get("Id"),
-                             Created=inspect_output.get("Created"))
-                summary_part["image-properties"] = props
+        return summary_part
 
-            else:
-                logging.info("No images to push")
-        else:
+    @Profiler.profiled("docker-tag")
+    def _tag_image(self, source_image, summary_part):
+        display.info("Same inputs as the build of %s, tagging its image instead of building" % source_image)
+        for tag in summary_part["build-tags"]:
+            self.docker_cli.tag(source_image, tag, dry_run=self.args.dry_run, output=OutputOptions(continuous=True))
+        self.image_inspector.forget(summary_part["build-tags"])
+        summary_part["tagged-from"] = source_image
+
+    def _run_docker_push_commands(self, summary_part):
+        if not self.push():
             logging.info("Skipping docker push command due to --no-push option")
+            return
 
-        return summary_part
+        registry_name = self.config.get_registry_host()
+        self.registries.check_allowed_to_push(registry_name)
+
+        image_tags = summary_part["build-tags"]
+        if not image_tags:
+            logging.info("No images to push")
+            return
+
+        logging.info("Running docker push commands")
+        summary_part["push-durations"] = self._push_tags(image_tags, registry_name)
+        # a tag inspected before the push, e.g. as parent of another build, has no repo digest yet
+        self.image_inspector.forget(image_tags)
+
+        logging.debug("Inspecting image for summary")
+        inspect_output = self.inspect_image(image_tags[0], output_format="{{ json . }}")
+        for repo_digest in inspect_output.get("RepoDigests", []):
+            summary_part["digest"] = repo_digest.split("@")[-1]
+            break
+        props = dict(RepoDigests=inspect_output.get("RepoDigests"),
+                     RepoTags=inspect_output.get("RepoTags"),
+                     Size="%.2f MB" % (inspect_output.get("Size", 0) / 1024.0 / 1024.0),
+                     ID=inspect_output.get("Id"),
+                     Created=inspect_output.get("Created"))
+        summary_part["image-properties"] = props
+
+        if self.plan.build_state and summary_part.get("fingerprint") and summary_part.get("digest"):
+            self.plan.build_state.put(summary_part["fingerprint"], summary_part["digest"], image_tags)
+
+    def _push_tags(self, image_tags, registry_name):
+        """
+        The first tag is pushed alone because it uploads the layers. All other tags share these layers, mostly
+        upload manifests and are therefore pushed concurrently. Returns the push duration of every tag.
+        """
+        limiter = self.registries.get_push_limiter(registry_name)
+        durations = dict()
+        # the tags are pushed by other threads, which do not know the build and its output
+        build = Profiler.current_build()
+        output = display.current_context()
+
+        def push(tag):
+            with limiter, display.inherited(output), Profiler.phase("docker-push", build=build, tag=tag):
+                start = time.time()
+                self.docker_cli.push(tag, dry_run=self.args.dry_run, output=OutputOptions(continuous=True))
+                durations[tag] = time.time() - start
+
+        push(image_tags[0])
+        remaining_tags = image_tags[1:]
+        if self.args.push_jobs > 1 and len(remaining_tags) > 1:
+            with ThreadPoolExecutor(max_workers=self.args.push_jobs) as executor:
+                # consuming the results raises the first push failure
+                list(executor.map(push, remaining_tags))
+        else:
+            for tag in remaining_tags:
+                push(tag)
+
+        return [[tag, "%.2f s" % durations[tag]] for tag in image_tags]
 
+    def _run_pipelined_push(self, build, summary_part):
+        with Profiler.build(build["name"]), Profiler.phase("push-pipeline"):
+            self._run_docker_push_commands(summary_part)
+
+    def _run_pipelined_after_build_commands(self, build):
+        with Profiler.build(build["name"]):
+            self._run_after_build_commands(build)
+
+    @Profiler.profiled("after-build-commands")
     def _run_after_build_commands(self, build):
         self._run_commands(self.config.get_after_build_commands(build), "after build commands")
 
+    def _get_build_dependencies(self, builds):
+        """
+        A build depends on the builds whose tags it uses as base image of one of its stages. Returns the indices of
+        the builds every build depends on and remembers the names of the builds every build depends on.
+        """
+        producers = dict()
+        for index, build in enumerate(builds):
+            for tag in self._gather_image_tags(build):
+                producers.setdefault(self._normalize_image(tag), index)
+
+        dependencies = list()
+        self.plan.built_images = set(producers)
+        self.plan.build_dependencies = dict()
+        for index, build in enumerate(builds):
+            parents = set()
+            for image in self._get_external_base_images(self._gather_build_args(build)):
+                parent = producers.get(self._normalize_image(image))
+                if parent is not None and parent != index:
+                    parents.add(parent)
+            dependencies.append(parents)
+            if parents:
+                self.plan.build_dependencies[build["name"]] = [builds[parent]["name"] for parent in sorted(parents)]
+                logging.info("Build %s depends on %s", build["name"].strip(),
+                             ", ".join(name.strip() for name in self.plan.build_dependencies[build["name"]]))
+        return dependencies
+
+    def _get_duplicate_builds(self, builds, dependencies):
+        """
+        Builds with the same resolved inputs only differ in their tags. The first of them is built, the others wait
+        for it and tag its image. Builds with before build commands are always built, the commands may change the
+        build context. Remembers the name of the build every duplicate build tags the image of.
+        """
+        first_builds = dict()
+        for index, build in enumerate(builds):
+            if self.config.get_before_build_commands(build):
+                continue
+            first = first_builds.setdefault(self._build_key(build), index)
+            # a build using its own image as base image is not tagged from a build depending on it
+            if first != index and index not in dependencies[first]:
+                dependencies[index].add(first)
+                self.plan.duplicate_builds[build["name"]] = builds[first]["name"]
+                logging.info("Build %s has the same inputs as %s", build["name"].strip(), builds[first]["name"].strip())
+        return self.plan.duplicate_builds
+
+    def _build_key(self, build):
+        """
+        The inputs of a build that are not the same for all builds. The labels derived from the base image follow from
+        the build args, the cache sources do not change the image.
+        """
+        return json.dumps(dict(
+            build_args=self._gather_build_args(build),
+            labels=sorted(self.config.get_merged_build_labels(build)),
+            target=self._gather_build_target(build),
+            cache_to=self.config.get_build_cache_to(build),
+        ), sort_keys=True)
+
+    @Profiler.profiled("prebuild-shared-stages")
+    def _prebuild_shared_stages(self, builds):
+        """
+        Builds the stages several builds need once before the builds, e.g. a builder stage of a runtime and a debug
+        target. The concurrent builds then find these stages in the layer cache instead of each building them.
+        """
+        for stage, build_args, cache_sources in self._get_shared_stages(builds):
+            display.info("Prebuilding stage %s shared by several builds" % stage)
+            with Profiler.phase("docker-build", stage=stage):
+                self.docker_cli.build(
+                    self.args.work_dir,
+                    build_args=build_args,
+                    target=stage,
+                    remove=True,
+                    file=os.path.join(self.args.work_dir, self.args.dockerfile),
+                    pull=self.pull_on_build() and not self._uses_images_built_here(build_args),
+                    cache_from=cache_sources,
+                    dry_run=self.args.dry_run,
+                    output=OutputOptions(continuous=True)
+                )
+
+    def _get_shared_stages(self, builds):
+        """
+        The named stages needed by several builds with the same build args, which are part of the cache key. Of the
+        stages needed by the same builds, only the last one is returned, it builds the others as well. Duplicate
+        builds and builds with before build commands, which may change the build context, are left out.
+        """
+        builds_of_stages = dict()
+        for build in builds:
+            if build["name"] in self.plan.duplicate_builds or self.config.get_before_build_commands(build):
+                continue
+            build_args = self._gather_build_args(build)
+            for stage in self.dockerfile.get_required_stages(self._gather_build_target(build)):
+                if isinstance(stage, str):
+                    builds_of_stages.setdefault((json.dumps(build_args), stage), list()).append(build)
+
+        shared = [key for key, stage_builds in builds_of_stages.items() if len(stage_builds) > 1]
+        shared_stages = list()
+        for build_args, stage in shared:
+            covered = any(other_build_args == build_args and other_stage != stage and
+                          stage in self.dockerfile.get_required_stages(other_stage) and
+                          len(builds_of_stages[(other_build_args, other_stage)]) ==
+                          len(builds_of_stages[(build_args, stage)])
+                          for other_build_args, other_stage in shared)
+            if not covered:
+                cache_sources = list()
+                for build in builds_of_stages[(build_args, stage)]:
+                    cache_sources += self._gather_cache_sources(build)
+                shared_stages.append((stage, json.loads(build_args), list(dict.fromkeys(cache_sources))))
+        return shared_stages
+
+    def _is_built_here(self, image):
+        """images built by a build of the config or by an upstream project are neither pulled nor prefetched"""
+        return self._normalize_image(image) in self.plan.built_images or \
+            self.repository_of(image) in self.plan.upstream_repositories
+
+    def _uses_images_built_here(self, build_args):
+        return any(self._is_built_here(image) for image in self._get_external_base_images(build_args))
+
+    @staticmethod
+    def repository_of(image):
+        """the image without tag and digest"""
+        image = image.split("@", 1)[0]
+        name, _, tag = image.rpartition(":")
+        if name and "/" not in tag:
+            return name
+        return image
+
+    @staticmethod
+    def _normalize_image(image):
+        if "@" not in image and ":" not in image.rsplit("/", 1)[-1]:
+            return image + ":latest"
+        return image
+
     def _gather_build_args(self, build):
         return self.config.get_merged_build_args(build)
 
+    def _gather_build_target(self, build):
+        """the target of the build in the docker-make.yaml takes precedence over --target"""
+        return self.config.get_build_target(build) or self.args.target
+
     def _gather_build_labels(self, build):
         build_labels = self.config.get_merged_build_labels(build)
         build_labels += self.create_git_labels()
         build_labels += self.args.labels
 
         try:
-            base_image = self._get_base_image(self._gather_build_args(build))
+            base_image = self._get_base_image(self._gather_build_args(build), self._gather_build_target(build))
         except Exception as exception:
             raise Exception("Error determining base image", exception)
 
@@ -229,6 +635,10 @@ class Make:
     def pull(self):
         return not self.args.no_pull
 
+    def pull_on_build(self):
+        """prepulled base images are not checked again by every build"""
+        return self.pull() and not self.args.prepull
+
     def push(self):
         return not self.args.no_push
 
@@ -284,14 +694,96 @@ class Make:
 
         return [self.args.parent_label_name + "=" + json.dumps(parent_urls)]
 
-    def _get_base_image(self, build_args):
+    def _get_base_image(self, build_args, target=None):
+        """the base image of the target stage, the last stage by default"""
         base_image = self.dockerfile.get_first_instruction_of_type(
-            Keywords.FROM, stage=self.dockerfile.get_last_stage()
+            Keywords.FROM, stage=self.dockerfile.get_last_stage() if target is None else target
         ).full_image_name
 
         if not base_image:
             raise Exception("Error: No FROM instruction in Dockerfile defined")
 
+        return self._render_global_args(base_image, build_args)
+
+    @Profiler.profiled("prefetch-base-images")
+    def _prefetch_base_images(self, builds):
+        """inspects the base images of all builds before the first build starts, missing ones are pulled in parallel"""
+        base_images = list()
+        for build in builds:
+            build_args = self._gather_build_args(build)
+            base_image = self._get_base_image(build_args, self._gather_build_target(build))
+            if base_image not in base_images and base_image in self._get_external_base_images(build_args) \
+                    and not self._is_built_here(base_image):
+                base_images.append(base_image)
+        if not base_images:
+            return
+
+        inspect_outputs = self.image_inspector.inspect(base_images)
+        missing_images = [image for image in base_images if inspect_outputs[image] is None]
+        if not missing_images or not self.pull():
+            return
+
+        for image, exception in self._pull_images(missing_images).items():
+            # the build that needs the image reports the failure
+            logging.warning("Prefetching base image %s failed: %s", image, exception)
+        self.image_inspector.inspect(missing_images)
+
+    @Profiler.profiled("prepull-base-images")
+    def _prepull_base_images(self, builds):
+        """pulls the images of all stages of all builds once and concurrently, instead of every build pulling them"""
+        base_images = [image for image in self.get_base_images(builds) if not self._is_built_here(image)]
+        if not base_images:
+            return
+
+        failures = self._pull_images(base_images)
+        if failures:
+            raise Exception("Pulling base images failed: %s" % ", ".join(
+                "%s (%s)" % (image, exception) for image, exception in failures.items()))
+
+    def _pull_images(self, images):
+        """pulls the images concurrently and returns the exceptions of failed pulls by image"""
+        failures = dict()
+        output = display.current_context()
+
+        def pull(image):
+            with display.inherited(output):
+                try:
+                    with Profiler.phase("docker-pull", image=image):
+                        self.docker_cli.pull(image, dry_run=self.args.dry_run)
+                    display.info("Pulled image %s" % image)
+                except Exception as exception:  # pylint: disable=broad-except
+                    failures[image] = exception
+
+        logging.info("Pulling images: %s", ", ".join(images))
+        with ThreadPoolExecutor(max_workers=len(images)) as executor:
+            list(executor.map(pull, images))
+        self.image_inspector.forget(images)
+        return failures
+
+    def get_base_images(self, builds=None):
+        """the images of all stages of all builds that do not refer to an earlier stage"""
+        base_images = list()
+        for build in self.config.get_builds() if builds is None else builds:
+            for image in self._get_external_base_images(self._gather_build_args(build)):
+                if image not in base_images:
+                    base_images.append(image)
+        return base_images
+
+    def _get_external_base_images(self, build_args):
+        """the images of all stages that do not refer to an earlier stage"""
+        images = list()
+        stage_names = set()
+        for instruction in self.dockerfile.get_instructions_of_type(Keywords.FROM):
+            if not instruction.full_image_name:
+                continue
+            image = self._render_global_args(instruction.full_image_name, build_args)
+            if image not in stage_names and image != "scratch" and image not in images:
+                images.append(image)
+            if instruction.stage_name:
+                stage_names.add(instruction.stage_name)
+        return images
+
+    def _render_global_args(self, base_image, build_args):
         # maybe ARG is used before the FROM instruction, we need to render the variables into the base image
         arg_instructions = []
         for instruction in self.dockerfile.get_instructions():
@@ -314,17 +806,33 @@ class Make:
                     continue
                 replacement_dict[arg_instruction.name] = replacement_value
 
-            with patch.dict(os.environ, replacement_dict):
-                base_image = os.path.expandvars(base_image)
+            base_image = self._expand_variables(base_image, replacement_dict)
 
         return base_image
 
+    @staticmethod
+    def _expand_variables(string, replacement_dict):
+        """
+        Behaves like os.path.expandvars but takes the values from the given dictionary instead of the environment,
+        which must not be patched while builds run concurrently. Unknown variables are left unchanged.
+        """
+        def replace(match):
+            name = match.group(1) or match.group(2)
+            return replacement_dict.get(name, match.group(0))
+
+        return re.sub(r'\$(?:(\w+)|\{([^}]*)\})', replace, string)
+
     def inspect_image(self, image, output_format):
-        output, _, return_code = self.docker_cli.inspect(image, output_format=output_format,
-                                                         dry_run=self.args.dry_run, fail_on_bad_return_code=False)
-        if return_code != 0:
-            logging.info(
-                "Attempt to pull image %s from the registry to run inspect command")
+        return self.inspect_images([image], output_format)[image]
+
+    def inspect_images(self, images, output_format):
+        """inspects all images with a single docker inspect, images that are reused across builds are cached"""
+        with Profiler.phase("docker-inspect", images=len(images)):
+            inspect_outputs = self.image_inspector.inspect(images)
+        for image in images:
+            if inspect_outputs[image] is not None:
+                continue
+            logging.info("Attempt to pull image %s from the registry to run inspect command", image)
             try:
                 self._pull_docker_image(image)
             except Exception as exception:
@@ -332,13 +840,21 @@ class Make:
                 display.warn("Please make sure you do not modify the Dockerfile's FROM instruction "
                              "in before and after commands, use ARG before FROM instead")
                 raise exception
-            output, _, _ = self.docker_cli.inspect(image, output_format=output_format)
+            inspect_outputs[image] = self.image_inspector.get(image)
+            if inspect_outputs[image] is None:
+                raise Exception("Image could not be inspected: %s" % image)
 
-        return json.loads(output) if output else dict()
+        formatted_outputs = dict()
+        for image in images:
+            output = GoTemplate.render(output_format, inspect_outputs[image])
+            formatted_outputs[image] = json.loads(output) if output else dict()
+        return formatted_outputs
 
     def _pull_docker_image(self, image):
         if self.pull():
             logging.info("Pulling image")
-            self.docker_cli.pull(image, dry_run=self.args.dry_run, with_continuous_output=True)
+            with Profiler.phase("docker-pull", image=image):
+                self.docker_cli.pull(image, dry_run=self.args.dry_run, output=OutputOptions(continuous=True))
+            self.image_inspector.forget([image])
         else:
             logging.info("Skipping image pull due to no pull")
@@ -0,0 +1,179 @@
+from collections import namedtuple
+import copy
+import logging
+import os
+
+from dockermake.constants import Constants
+from dockermake.git import check_if_git_is_installed
+from dockermake.git.git import get_changed_files
+from dockermake.lint.batch_lint import BatchLint
+from dockermake.lint.lint_cache import LintCache
+from dockermake.make import Make
+from dockermake.utils.profiler import Profiler
+from dockermake.utils.scheduler import BuildScheduler
+from dockermake.utils import display
+
+
+Project = namedtuple("Project", ["name", "path", "make"])
+
+
+class Monorepo:
+    """
+    Builds all docker-make projects below the working directory as one graph. A project is a directory with a
+    docker-make.yaml. A project depends on the projects whose image it uses as base image of one of its stages.
+    The projects are built in waves, the projects of a wave only depend on projects of earlier waves and are built
+    concurrently. With --changed-since, only the projects with changed files and the projects depending on them are
+    built.
+    """
+
+    def __init__(self, args):
+        self.args = args
+        self.root = os.path.abspath(args.work_dir)
+
+    def run(self):
+        if self.args.show_linting_rules or self.args.lint_files:
+            # neither depends on the projects
+            Make(self.args).run()
+            return
+
+        if self.args.profile_out:
+            Profiler.reset(enabled=True)
+        try:
+            self._run()
+        finally:
+            if self.args.profile_out:
+                # the profile of a failed run shows where it failed
+                Profiler.write(self.args.profile_out, self.args.profile_format)
+                logging.info("Wrote profile to %s", self.args.profile_out)
+
+    def _run(self):
+        if self.args.only_lint:
+            self.lint(self.discover())
+            return
+
+        check_if_git_is_installed()
+        projects = self.load(self.discover())
+        dependencies = self.get_dependencies(projects)
+
+        if self.args.changed_since:
+            changed_files = get_changed_files(self.args.changed_since, self.root)
+            selected = self.get_affected(projects, dependencies, changed_files)
+            display.info("%d of %d projects are affected by the changes since %s" % (
+                len(selected), len(projects), self.args.changed_since))
+            projects, dependencies = self._select(projects, dependencies, selected)
+        if not projects:
+            display.info("Nothing to build")
+            return
+
+        if self.args.show_builds:
+            self.print_waves(projects, dependencies)
+            return
+
+        scheduler = BuildScheduler(jobs=self.args.jobs, fail_fast=not self.args.keep_going, always_prefix=True)
+        scheduler.run(projects, lambda project: project.make.build_all(), name_of=lambda project: project.name,
+                      dependencies=dependencies)
+
+    def discover(self):
+        """the directories with a docker-make.yaml below the root, hidden directories are skipped"""
+        names = [self.args.file] if self.args.file else \
+            [Constants.DOCKER_MAKE_BASE_NAME + extension for extension in Constants.YAML_ALLOWED_EXTENSIONS]
+        paths = list()
+        for path, directories, files in os.walk(self.root):
+            directories[:] = sorted(directory for directory in directories if not directory.startswith("."))
+            if any(name in files for name in names):
+                paths.append(path)
+        if not paths:
+            raise Exception("No %s found below %s" % (Constants.DOCKER_MAKE_YAML, self.root))
+        logging.info("Found %d projects below %s", len(paths), self.root)
+        return paths
+
+    @Profiler.profiled("lint")
+    def lint(self, paths):
+        """lints the Dockerfiles of all projects in parallel and reports them at once"""
+        cache = None if self.args.no_lint_cache else LintCache()
+        batch_lint = BatchLint(exclude=self.args.exclude_linting_rules, cache=cache, jobs=self.args.lint_jobs)
+        batch_lint.lint([os.path.join(path, self.args.dockerfile) for path in paths])
+
+    def load(self, paths):
+        projects = list()
+        for path in paths:
+            name = os.path.relpath(path, self.root)
+            project_args = copy.copy(self.args)
+            project_args.work_dir = path
+            # the projects run concurrently, the builds of a project one after another
+            project_args.jobs = 1
+            # the profile of the whole run is enabled and written by the monorepo
+            project_args.profile_out = None
+            make = Make(project_args)
+            try:
+                make.load_dockerfile()
+                make.load()
+                if self.args.build_only_names:
+                    make.config.narrow_down_builds_by_names(self.args.build_only_names)
+            except Exception as exception:
+                raise Exception("Loading project %s failed: %s" % (name, exception)) from exception
+            projects.append(Project(name, path, make))
+        return projects
+
+    @staticmethod
+    def get_dependencies(projects):
+        """
+        Returns the indices of the projects every project depends on. The images of the projects a project depends
+        on are not pulled by its builds.
+        """
+        producers = dict()
+        for index, project in enumerate(projects):
+            producers.setdefault(Make.repository_of(project.make.config.get_image_name()), index)
+
+        dependencies = list()
+        for index, project in enumerate(projects):
+            parents = set()
+            for image in project.make.get_base_images():
+                parent = producers.get(Make.repository_of(image))
+                if parent is not None and parent != index:
+                    parents.add(parent)
+            if parents:
+                logging.info("Project %s depends on %s", project.name,
+                             ", ".join(projects[parent].name for parent in sorted(parents)))
+            project.make.plan.upstream_repositories = set(
+                Make.repository_of(projects[parent].make.config.get_image_name()) for parent in parents)
+            dependencies.append(parents)
+        return dependencies
+
+    @staticmethod
+    def get_affected(projects, dependencies, changed_files):
+        """
+        The indices of the projects containing a changed file and of all projects depending on them. A file belongs
+        to the innermost project containing it.
+        """
+        affected = set()
+        for changed_file in changed_files:
+            owners = [index for index, project in enumerate(projects)
+                      if project.name == "." or changed_file.startswith(project.name + "/")]
+            if owners:
+                affected.add(max(owners, key=lambda index: len(projects[index].name)))
+
+        dependents = dict()
+        for index, parents in enumerate(dependencies):
+            for parent in parents:
+                dependents.setdefault(parent, set()).add(index)
+        pending = list(affected)
+        while pending:
+            for dependent in dependents.get(pending.pop(), set()):
+                if dependent not in affected:
+                    affected.add(dependent)
+                    pending.append(dependent)
+        return sorted(affected)
+
+    @staticmethod
+    def print_waves(projects, dependencies):
+        waves = BuildScheduler.waves(projects, dependencies, name_of=lambda project: project.name)
+        for number, wave in enumerate(waves, 1):
+            display.info("Wave %d: %s" % (number, ", ".join(projects[index].name for index in wave)))
+
+    @staticmethod
+    def _select(projects, dependencies, selected):
+        """the selected projects, dependencies on projects that are not selected are dropped"""
+        positions = {index: position for position, index in enumerate(selected)}
+        return [projects[index] for index in selected], \
+            [set(positions[parent] for parent in dependencies[index] if parent in positions) for index in selected]
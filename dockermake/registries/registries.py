@@ -1,9 +1,10 @@
+from contextlib import nullcontext
 import logging
 import os
-import jsonschema
+import threading
 
 from dockermake.constants import Constants
-from dockermake.git.git import extract_git_repository, get_git_remote_origin_url
+from dockermake.git.git import get_git_repository, get_git_remote_origin_url
 from dockermake.utils.helpers import load_json
 from dockermake.utils.yaml_loader import YamlLoader
 
@@ -22,6 +23,8 @@ class Registries:
             self.registries = dict()
             self.push_only_to_defined_registries = Constants.DEFAULT_PUSH_ONLY_TO_DEFINED_REGISTRIES
             self.push_only_to_specific_projects = Constants.DEFAULT_PUSH_ONLY_TO_SPECIFIC_GIT_PROJECTS
+            self.push_limiters = dict()
+            self.push_limiters_lock = threading.Lock()
 
         def load(self, args):
             if not os.path.isfile(args.registries_file):
@@ -31,6 +34,7 @@ class Registries:
             registries = YamlLoader.safe_load_yaml(args.registries_file)
             schema_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "schemas", self.JSON_SCHEMA)
             schema = load_json(schema_path)
+            import jsonschema  # pylint: disable=import-outside-toplevel
             try:
                 jsonschema.validate(registries, schema)
             except Exception as exception:
@@ -58,7 +62,7 @@ class Registries:
                 raise Exception("Not allowed to push: by configuration only allowed to push from "
                                 "a git repository folder")
             repos = registry.get("repositories", [])
-            git_repository = extract_git_repository(remote_url)
+            git_repository = get_git_repository()
             if git_repository not in repos:
                 raise Exception(
                     "Not allowed to push to %s: Repository %s (extracted from git remote url) not defined "
@@ -69,6 +73,19 @@ class Registries:
                 return self.registries[registry_name]
             return None
 
+        def get_push_limiter(self, registry_name):
+            """
+            Returns a semaphore that bounds the concurrent pushes to the registry to its max-concurrent-pushes. The
+            semaphore is shared by all builds of this run, without a limit, a context without any effect is returned.
+            """
+            registry = self._find_registry_by_name_in_site_registries(registry_name)
+            if not registry or not registry.get("max-concurrent-pushes"):
+                return nullcontext()
+            with self.push_limiters_lock:
+                if registry_name not in self.push_limiters:
+                    self.push_limiters[registry_name] = threading.BoundedSemaphore(registry["max-concurrent-pushes"])
+                return self.push_limiters[registry_name]
+
         def get_registry_authentication(self, registry_name):
             registry = self._find_registry_by_name_in_site_registries(registry_name)
             user = Constants.REGISTRY_LOGIN_USER
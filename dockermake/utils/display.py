@@ -1,30 +1,122 @@
+from collections import namedtuple
+from contextlib import contextmanager
+from functools import lru_cache
+import sys
+import threading
 
+_thread_local = threading.local()
+_print_lock = threading.Lock()
 
-try:
-    from termcolor import colored
+# the output of a thread: the prefix of its lines and, while it is captured, the buffer collecting them
+OutputContext = namedtuple("OutputContext", ["prefix", "buffer"])
 
-    HAS_TERMCOLOR = True
-except ImportError:
-    HAS_TERMCOLOR = False
 
-
-def info(msg, color="white", end="\n"):
-    print(_try_color(msg, color), end=end)
+def info(msg, color="white", end="\n", to_stderr=False):
+    _print(_try_color(_prefix(msg), color) + end, to_stderr)
 
 
 def warn(msg):
-    print(_try_color(msg, "yellow"))
+    _print(_try_color(_prefix(msg), "yellow") + "\n")
 
 
 def error(msg):
-    print(_try_color(msg, "red"))
+    _print(_try_color(_prefix(msg), "red") + "\n")
 
 
 def banner(color="white"):
-    print(_try_color(80 * "*", color))
+    _print(_try_color(_prefix(80 * "*"), color) + "\n")
+
+
+@contextmanager
+def prefixed(prefix):
+    """
+    Prefixes every line printed by the current thread, used to tell apart the output of concurrent builds. Nested
+    prefixes are joined, e.g. for the builds of a project of a monorepo.
+    """
+    previous = current_context()
+    _thread_local.prefix = (previous.prefix or "") + prefix if prefix else previous.prefix
+    try:
+        yield
+    finally:
+        _thread_local.prefix = previous.prefix
+
+
+@contextmanager
+def captured():
+    """
+    Collects the output of the current thread and prints it at once at the end, so that the output of concurrent
+    builds is not interleaved. Nested captures are handed to the enclosing capture.
+    """
+    previous = current_context()
+    buffer = list()
+    _thread_local.buffer = buffer
+    try:
+        yield
+    finally:
+        _thread_local.buffer = previous.buffer
+        if previous.buffer is not None:
+            previous.buffer.extend(buffer)
+        else:
+            with _print_lock:
+                for text, to_stderr in buffer:
+                    _write(text, to_stderr)
+
+
+@contextmanager
+def inherited(context):
+    """continues the output of another thread in the current thread, e.g. in the workers of a build"""
+    previous = current_context()
+    _thread_local.prefix, _thread_local.buffer = context
+    try:
+        yield
+    finally:
+        _thread_local.prefix, _thread_local.buffer = previous
+
+
+def current_context():
+    return OutputContext(getattr(_thread_local, "prefix", None), getattr(_thread_local, "buffer", None))
+
+
+def current_prefix():
+    return current_context().prefix
+
+
+def _print(text, to_stderr=False):
+    # the text includes the line end, so that lines printed by concurrent builds are not interleaved
+    buffer = getattr(_thread_local, "buffer", None)
+    if buffer is not None:
+        buffer.append((text, to_stderr))
+        return
+    with _print_lock:
+        _write(text, to_stderr)
+
+
+def _write(text, to_stderr):
+    # the streams are looked up on every call, they may be replaced, e.g. by tests
+    stream = sys.stderr if to_stderr else sys.stdout
+    stream.write(text)
+    stream.flush()
+
+
+def _prefix(msg):
+    prefix = getattr(_thread_local, "prefix", None)
+    if not prefix:
+        return msg
+    return "\n".join(prefix + line for line in str(msg).split("\n"))
+
+
+@lru_cache(maxsize=None)
+def _termcolor():
+    """termcolor is imported with the first output, not with the module"""
+    try:
+        import termcolor  # pylint: disable=import-outside-toplevel
+        return termcolor
+    except ImportError:
+        return None
 
 
 def _try_color(msg, color):
-    if HAS_TERMCOLOR:
-        return colored(msg, color)
+    termcolor = _termcolor()
+    if termcolor:
+        return termcolor.colored(msg, color)
     return msg
@@ -0,0 +1,117 @@
+import os
+import re
+
+
+class DockerIgnore:
+    """
+    Matches paths of a build context against the patterns of a .dockerignore file the way docker does: the last
+    matching pattern wins, patterns starting with "!" re-include paths and a pattern also matches everything below
+    a matching directory.
+    """
+
+    FILE_NAME = ".dockerignore"
+
+    def __init__(self, patterns=None):
+        self.patterns = list()
+        for pattern in patterns or list():
+            self._add(pattern)
+
+    @classmethod
+    def load(cls, context_directory, dockerfile_path=None):
+        """a <Dockerfile>.dockerignore next to the Dockerfile takes precedence, as it does for BuildKit"""
+        candidates = [os.path.join(context_directory, cls.FILE_NAME)]
+        if dockerfile_path:
+            candidates.insert(0, dockerfile_path + cls.FILE_NAME)
+        for candidate in candidates:
+            if os.path.isfile(candidate):
+                with open(candidate, "r", encoding="UTF-8") as dockerignore:
+                    return cls(dockerignore.read().splitlines()), candidate
+        return cls(), None
+
+    @property
+    def has_exceptions(self):
+        return any(exception for _, exception in self.patterns)
+
+    def walk(self, context_directory, included=None):
+        """
+        yields the relative and the full paths of all files and directories of the context in a stable order, the
+        included paths are never excluded, as the docker CLI always sends the Dockerfile and the .dockerignore
+        """
+        included = {path.replace(os.sep, "/") for path in included or list()}
+        included_parents = {"/".join(path.split("/")[:index]) for path in included
+                            for index in range(1, path.count("/") + 1)}
+        prune = not self.has_exceptions
+        for directory, directories, files in os.walk(context_directory):
+            relative_directory = os.path.relpath(directory, context_directory)
+            relative_directory = "" if relative_directory == "." else relative_directory
+
+            names = sorted(directories + files)
+            directories.sort()
+            for name in names:
+                relative_path = os.path.join(relative_directory, name).replace(os.sep, "/")
+                excluded = relative_path not in included and self.is_excluded(relative_path)
+                if excluded and prune and name in directories and relative_path not in included_parents:
+                    # nothing below an excluded directory can be re-included
+                    directories.remove(name)
+                if not excluded:
+                    yield relative_path, os.path.join(directory, name)
+
+    def is_excluded(self, relative_path):
+        relative_path = relative_path.replace(os.sep, "/")
+        parents = relative_path.split("/")[:-1]
+        parent_paths = ["/".join(parents[:index + 1]) for index in range(len(parents))]
+
+        excluded = False
+        for regex, exception in self.patterns:
+            if exception != excluded:
+                # the pattern cannot change the result
+                continue
+            if regex.match(relative_path) or any(regex.match(parent) for parent in parent_paths):
+                excluded = not exception
+        return excluded
+
+    def _add(self, pattern):
+        pattern = pattern.strip()
+        if not pattern or pattern.startswith("#"):
+            return
+        exception = pattern.startswith("!")
+        if exception:
+            pattern = pattern[1:].strip()
+        pattern = os.path.normpath(pattern).replace(os.sep, "/").lstrip("/")
+        if pattern in ("", "."):
+            return
+        self.patterns.append((re.compile(self._translate(pattern)), exception))
+
+    @staticmethod
+    def _translate(pattern):
+        regex = "^"
+        index = 0
+        while index < len(pattern):
+            character = pattern[index]
+            index += 1
+            if character == "*":
+                if pattern[index:index + 1] == "*":
+                    index += 1
+                    if pattern[index:index + 1] == "/":
+                        index += 1
+                    regex += ".*" if index >= len(pattern) else "(.*/)?"
+                else:
+                    regex += "[^/]*"
+            elif character == "?":
+                regex += "[^/]"
+            elif character == "\\" and index < len(pattern):
+                regex += re.escape(pattern[index])
+                index += 1
+            elif character == "[":
+                end = pattern.find("]", index)
+                if end == -1:
+                    regex += re.escape(character)
+                else:
+                    content = pattern[index:end]
+                    if content.startswith("^") or content.startswith("!"):
+                        content = "^" + content[1:]
+                    regex += "[" + content.replace("\\", "\\\\") + "]"
+                    index = end + 1
+            else:
+                regex += re.escape(character)
+        return regex + "$"
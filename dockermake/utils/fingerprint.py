@@ -0,0 +1,93 @@
+import hashlib
+import json
+import logging
+import os
+import stat
+import tempfile
+import threading
+import time
+
+from dockermake.constants import Constants
+from dockermake.utils.docker_ignore import DockerIgnore
+
+
+class BuildFingerprint:
+    """
+    Hashes everything a docker build depends on: the files of the build context that are not excluded by the
+    .dockerignore, the Dockerfile and the resolved build inputs (build args, labels, tags, target, base images).
+    """
+
+    CHUNK_SIZE = 1024 * 1024
+
+    @classmethod
+    def compute(cls, context_directory, dockerfile_path, inputs):
+        digest = hashlib.sha256()
+        digest.update(json.dumps(inputs, sort_keys=True).encode("UTF-8"))
+        cls._update_with_file(digest, "Dockerfile", dockerfile_path)
+
+        dockerignore, dockerignore_path = DockerIgnore.load(context_directory, dockerfile_path)
+        if dockerignore_path:
+            cls._update_with_file(digest, DockerIgnore.FILE_NAME, dockerignore_path)
+
+        for relative_path, path in dockerignore.walk(context_directory):
+            cls._update_with_file(digest, relative_path, path)
+
+        return digest.hexdigest()
+
+    @classmethod
+    def _update_with_file(cls, digest, name, path):
+        status = os.lstat(path)
+        digest.update(("\0%s\0%o\0" % (name, stat.S_IMODE(status.st_mode))).encode("UTF-8"))
+        if stat.S_ISLNK(status.st_mode):
+            digest.update(("link:" + os.readlink(path)).encode("UTF-8"))
+        elif stat.S_ISDIR(status.st_mode):
+            digest.update(b"directory")
+        elif stat.S_ISREG(status.st_mode):
+            with open(path, "rb") as file:
+                for chunk in iter(lambda: file.read(cls.CHUNK_SIZE), b""):
+                    digest.update(chunk)
+
+
+class BuildState:
+    """
+    Remembers the digest that was pushed for a build fingerprint in a local state file. The file is merged with
+    the entries of concurrent runs when it is written, the oldest entries are dropped beyond the maximum.
+    """
+
+    MAX_ENTRIES = 1000
+
+    def __init__(self, path=None):
+        self.path = path or Constants.DEFAULT_BUILD_STATE_FILE
+        self.lock = threading.Lock()
+
+    def get(self, fingerprint):
+        with self.lock:
+            return self._read().get(fingerprint)
+
+    def put(self, fingerprint, digest, tags):
+        with self.lock:
+            entries = self._read()
+            entries[fingerprint] = dict(digest=digest, tags=tags, time=time.time())
+            if len(entries) > self.MAX_ENTRIES:
+                newest = sorted(entries.items(), key=lambda entry: entry[1].get("time", 0))[-self.MAX_ENTRIES:]
+                entries = dict(newest)
+            self._write(entries)
+
+    def _read(self):
+        try:
+            with open(self.path, "r", encoding="UTF-8") as state_file:
+                return json.load(state_file)
+        except (IOError, OSError, ValueError) as exception:
+            logging.debug("No build state read from %s: %s", self.path, exception)
+            return dict()
+
+    def _write(self, entries):
+        try:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            descriptor, temporary_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(descriptor, "w", encoding="UTF-8") as state_file:
+                json.dump(entries, state_file, indent=2, sort_keys=True)
+            os.replace(temporary_path, self.path)
+        except (IOError, OSError) as exception:
+            logging.warning("Could not write build state to %s: %s", self.path, exception)
@@ -1,14 +1,23 @@
+from collections import deque, namedtuple
+from contextlib import nullcontext
+import codecs
 import json
 import logging
-import io
 import os
 import subprocess
+import threading
 
 from dockermake.utils import display
 
+# how the output of a command is handled: streamed to the console while it runs, captured completely rather than
+# only its last lines, and whether the command is hidden as it contains sensible information
+OutputOptions = namedtuple("OutputOptions", ["continuous", "capture", "omit"], defaults=(False, False, False))
+
 
 class System:
     OMITTED_CMD = "*** command hidden as sensible information are contained ***"
+    # the continuous output of all commands is appended to this file, if set
+    output_log_file = None
 
     @classmethod
     def run_commands(cls, cmds, **kwargs):
@@ -17,17 +26,21 @@ class System:
 
     @staticmethod
     # pylint: disable-msg=R0913
-    def run_command(cmd, shell=False, dry_run=False, cwd=None, fail_on_bad_return_code=True,
-                    with_continuous_output=False, omit_printing_output=False, stdin_feed=None):
+    def run_command(cmd, shell=False, dry_run=False, cwd=None, fail_on_bad_return_code=True, stdin_feed=None,
+                    output=OutputOptions()):
+        """
+        Returns the stdout, the stderr and the return code of the command. With continuous output, the output is
+        streamed to the console and only the last lines of stdout and stderr are returned, unless it is captured.
+        """
 
-        cmd_for_printing = System._get_cmd_for_printing(cmd, omit_printing_output)
+        cmd_for_printing = System._get_cmd_for_printing(cmd, output.omit)
 
         if dry_run:
             display.info("[DRY] Would execute command: %s" % cmd_for_printing)
             return "", "", 0
 
         logging.debug("Executing command: %s", cmd_for_printing)
-        out, err, return_code = System._run_command(cmd, shell, cwd, with_continuous_output, stdin_feed)
+        out, err, return_code = System._run_command(cmd, shell, cwd, stdin_feed, output)
 
         if fail_on_bad_return_code and return_code != 0:
             if err:
@@ -45,24 +58,30 @@ class System:
         return cmd_for_printing
 
     @staticmethod
-    def _run_command(cmd, shell, cwd, with_continuous_output, stdin_feed):
-        if with_continuous_output:
-            return System._with_continuous_output(cmd, shell=shell, cwd=cwd)
+    def _run_command(cmd, shell, cwd, stdin_feed, output):
+        if output.continuous:
+            return System._with_continuous_output(cmd, shell=shell, cwd=cwd, capture_output=output.capture)
         return System._without_continuous_output(cmd, shell=shell, cwd=cwd, stdin_feed=stdin_feed)
 
     @staticmethod
-    def _with_continuous_output(cmd, shell, cwd):
-        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, shell=shell, cwd=cwd, env=System._get_exec_env())
-        err = None
-        out = ""
-        for line in io.TextIOWrapper(process.stdout, encoding="utf-8"):
-            out += line
-            try:
-                display.info(line.rstrip())
-            except UnicodeEncodeError as exception:
-                logging.error("error displaying parts of the output: %s", exception)
+    def _with_continuous_output(cmd, shell, cwd, capture_output=False):
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=shell, cwd=cwd,
+                                   env=System._get_exec_env())
+        log_file = System.output_log_file
+        with open(log_file, "a", encoding="UTF-8") if log_file else nullcontext() as log:
+            out = OutputStream(capture_output=capture_output, log=log)
+            err = OutputStream(capture_output=capture_output, log=log, to_stderr=True)
+
+            # stdout and stderr are read concurrently, a full pipe would block the process otherwise
+            readers = [threading.Thread(target=stream.pump, args=(pipe, display.current_context()))
+                       for stream, pipe in ((out, process.stdout), (err, process.stderr))]
+            for reader in readers:
+                reader.start()
+            for reader in readers:
+                reader.join()
         return_code = process.wait()
-        out, err = System._clean_outputs(out, err)
+
+        out, err = System._clean_outputs(out.value(), err.value())
         return out, err, return_code
 
     @staticmethod
@@ -97,6 +116,62 @@ class System:
         return out, err
 
 
+class OutputStream:
+    """
+    Streams the output of a process to the console line by line without accumulating it. Only the last lines are
+    kept in a ring buffer for error messages, the whole output only if it is captured explicitly.
+    """
+
+    CHUNK_SIZE = 64 * 1024
+    TAIL_LINES = 50
+    __log_file_lock = threading.Lock()
+
+    def __init__(self, capture_output=False, log=None, to_stderr=False):
+        self.tail = deque(maxlen=self.TAIL_LINES)
+        self.captured = list() if capture_output else None
+        self.log = log
+        self.to_stderr = to_stderr
+
+    def pump(self, pipe, context=None):
+        """reads the pipe in chunks until it is closed, run in a thread of its own with the output of the command"""
+        context = context or display.OutputContext(None, None)
+        with display.inherited(context):
+            decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+            pending = ""
+            try:
+                while True:
+                    chunk = pipe.read1(self.CHUNK_SIZE)
+                    text = pending + decoder.decode(chunk, final=not chunk)
+                    lines = text.split("\n")
+                    pending = lines.pop()
+                    self._add_lines(lines, context.prefix)
+                    if not chunk:
+                        break
+                if pending:
+                    self._add_lines([pending], context.prefix)
+            finally:
+                pipe.close()
+
+    def _add_lines(self, lines, prefix):
+        for line in lines:
+            line = line.rstrip("\r")
+            self.tail.append(line)
+            if self.captured is not None:
+                self.captured.append(line)
+            try:
+                display.info(line.rstrip(), to_stderr=self.to_stderr)
+            except UnicodeEncodeError as exception:
+                logging.error("error displaying parts of the output: %s", exception)
+        if self.log and lines:
+            # stdout and stderr of a command share the log file, as do concurrent commands
+            with OutputStream.__log_file_lock:
+                self.log.write("".join((prefix or "") + line.rstrip("\r") + "\n" for line in lines))
+                self.log.flush()
+
+    def value(self):
+        return "\n".join(self.captured if self.captured is not None else self.tail)
+
+
 def dockerfile_keyword(**enums):
     reverse = dict((value, key) for key, value in list(enums.items()))
     enums["list"] = sorted(enums.keys())
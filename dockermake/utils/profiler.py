@@ -0,0 +1,147 @@
+from contextlib import contextmanager
+from functools import wraps
+import json
+import os
+import tempfile
+import threading
+import time
+
+from dockermake.constants import Constants
+
+
+class Profiler:
+    """
+    Records the durations of the phases of a run, e.g. loading the config, linting, git probes, the docker build and
+    push of every build. A phase belongs to the build the current thread works on. The phases are written as JSON
+    report or as Chrome trace (chrome://tracing, Perfetto) with --profile-out.
+
+    Recording is disabled by default and costs nothing then.
+    """
+
+    JSON_FORMAT = "json"
+    CHROME_FORMAT = "chrome"
+    FORMATS = Constants.PROFILE_FORMATS
+
+    enabled = False
+    __events = list()
+    __lock = threading.Lock()
+    __local = threading.local()
+    __start = time.perf_counter()
+    __threads = dict()
+
+    @classmethod
+    def reset(cls, enabled=False):
+        with cls.__lock:
+            cls.enabled = enabled
+            cls.__events = list()
+            cls.__threads = dict()
+            cls.__start = time.perf_counter()
+
+    @classmethod
+    @contextmanager
+    def build(cls, name):
+        """attributes the phases recorded by the current thread to the build"""
+        previous = getattr(cls.__local, "build", None)
+        cls.__local.build = name.strip()
+        try:
+            yield
+        finally:
+            cls.__local.build = previous
+
+    @classmethod
+    def current_build(cls):
+        return getattr(cls.__local, "build", None)
+
+    @classmethod
+    @contextmanager
+    def phase(cls, name, build=None, **details):
+        if not cls.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        failed = False
+        try:
+            yield
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            cls._record(name, build or cls.current_build(), start, time.perf_counter(), failed, details)
+
+    @classmethod
+    def profiled(cls, name):
+        """decorates a function to be recorded as phase"""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with cls.phase(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    @classmethod
+    def events(cls):
+        with cls.__lock:
+            return list(cls.__events)
+
+    @classmethod
+    def report(cls):
+        """the phases in the order they were started along with the total duration per build and phase"""
+        events = sorted(cls.events(), key=lambda event: event["start"])
+        builds = dict()
+        totals = dict()
+        for event in events:
+            if event["build"]:
+                phases = builds.setdefault(event["build"], dict())
+                phases[event["name"]] = round(phases.get(event["name"], 0) + event["duration"], 6)
+            totals[event["name"]] = round(totals.get(event["name"], 0) + event["duration"], 6)
+        return dict(
+            duration=round(time.perf_counter() - cls.__start, 6),
+            phases=events,
+            builds=builds,
+            totals=totals,
+        )
+
+    @classmethod
+    def chrome_trace(cls):
+        """the phases as complete events of the trace event format, one track per thread"""
+        trace_events = list()
+        with cls.__lock:
+            threads = sorted(cls.__threads.values())
+        for thread_id, thread_name in threads:
+            trace_events.append(dict(name="thread_name", ph="M", pid=1, tid=thread_id, args=dict(name=thread_name)))
+        for event in cls.events():
+            args = dict(event["details"])
+            if event["build"]:
+                args["build"] = event["build"]
+            if event["failed"]:
+                args["failed"] = True
+            trace_events.append(dict(name=event["name"], cat=event["build"] or "docker-make", ph="X", pid=1,
+                                     tid=event["thread"], ts=round(event["start"] * 1000000),
+                                     dur=round(event["duration"] * 1000000), args=args))
+        return dict(traceEvents=trace_events, displayTimeUnit="ms")
+
+    @classmethod
+    def write(cls, path, output_format=JSON_FORMAT):
+        if output_format not in cls.FORMATS:
+            raise Exception("Unknown profile format: %s" % output_format)
+        profile = cls.chrome_trace() if output_format == cls.CHROME_FORMAT else cls.report()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        descriptor, temporary_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(descriptor, "w", encoding="UTF-8") as profile_file:
+            json.dump(profile, profile_file, indent=2)
+        os.replace(temporary_path, path)
+
+    @classmethod
+    def _record(cls, name, build, start, end, failed, details):
+        thread = threading.current_thread()
+        with cls.__lock:
+            if thread.ident not in cls.__threads:
+                # small, stable thread numbers in the order the threads recorded their first phase
+                cls.__threads[thread.ident] = (len(cls.__threads) + 1, thread.name)
+            thread_id, _ = cls.__threads[thread.ident]
+            cls.__events.append(dict(name=name, build=build, start=round(start - cls.__start, 6),
+                                     duration=round(end - start, 6), thread=thread_id, failed=failed,
+                                     details=details))
@@ -0,0 +1,210 @@
+from concurrent.futures import ThreadPoolExecutor, FIRST_EXCEPTION, wait
+import logging
+
+from dockermake.utils import display
+
+
+def run_prefixed(name, func, *args):
+    with display.prefixed("[%s] " % name.strip()):
+        return func(*args)
+
+
+def run_captured(name, func, *args):
+    """runs a build concurrently to others, its output is printed at once when it is done"""
+    with display.captured():
+        return run_prefixed(name, func, *args)
+
+
+class BuildFailedException(Exception):
+    def __init__(self, failures):
+        self.failures = failures
+        names = ", ".join(name for name, _ in failures)
+        super(BuildFailedException, self).__init__("%d build(s) failed: %s" % (len(failures), names))
+
+
+class PushFailedException(Exception):
+    def __init__(self, name, exception):
+        self.name = name
+        self.exception = exception
+        super(PushFailedException, self).__init__("Pushing build \"%s\" failed: %s" % (name, exception))
+
+
+class BuildScheduler:
+    """
+    Runs a function for every given build through a bounded worker pool.
+
+    The results are returned in the order of the given builds, regardless of the order in which the builds
+    finished. With fail_fast, builds that have not been started yet are cancelled after the first failure and the
+    failure is raised as it is. Otherwise all builds are run and the failures are raised together afterwards.
+
+    Builds that depend on other builds are run in waves: a build starts once all builds it depends on have finished,
+    independent builds of a wave run concurrently. A build whose dependency failed is not run and counts as failed.
+    """
+
+    def __init__(self, jobs=1, fail_fast=True, always_prefix=False):
+        self.jobs = max(1, jobs or 1)
+        self.fail_fast = fail_fast
+        # the output is prefixed with the build name when builds run concurrently, or always
+        self.always_prefix = always_prefix
+
+    def run(self, builds, func, name_of=lambda build: build["name"], dependencies=None):
+        """dependencies holds the indices of the builds every build depends on"""
+        dependencies = dependencies or [set() for _ in builds]
+        waves = self.waves(builds, dependencies, name_of)
+        results = [None] * len(builds)
+        failures = dict()
+        for number, wave in enumerate(waves, 1):
+            runnable = list()
+            for index in wave:
+                failed_dependencies = [name_of(builds[parent]).strip() for parent in sorted(dependencies[index])
+                                       if parent in failures]
+                if failed_dependencies:
+                    failures[index] = Exception("Skipped, depends on the failed build(s) %s" %
+                                                ", ".join(failed_dependencies))
+                    display.error("Build \"%s\" failed: %s" % (name_of(builds[index]).strip(), failures[index]))
+                else:
+                    runnable.append(index)
+            if len(waves) > 1:
+                logging.info("Running wave %d of %d: %s", number, len(waves),
+                             ", ".join(name_of(builds[index]).strip() for index in runnable))
+            if self.jobs == 1 or len(runnable) <= 1:
+                self._run_serially(builds, runnable, func, name_of, results, failures)
+            else:
+                self._run_concurrently(builds, runnable, func, name_of, results, failures)
+
+        if failures:
+            raise BuildFailedException([(name_of(builds[index]).strip(), failures[index])
+                                        for index in sorted(failures)])
+        return results
+
+    @staticmethod
+    def waves(builds, dependencies, name_of=lambda build: build["name"]):
+        """groups the indices of the builds into waves, a build only depends on builds of earlier waves"""
+        waves = list()
+        scheduled = set()
+        remaining = list(range(len(builds)))
+        while remaining:
+            wave = [index for index in remaining if dependencies[index] <= scheduled]
+            if not wave:
+                raise Exception("Builds depend on each other: %s" % ", ".join(
+                    name_of(builds[index]).strip() for index in remaining))
+            waves.append(wave)
+            scheduled.update(wave)
+            remaining = [index for index in remaining if index not in scheduled]
+        return waves
+
+    def _run_serially(self, builds, indices, func, name_of, results, failures):
+        for index in indices:
+            try:
+                if self.always_prefix:
+                    results[index] = run_prefixed(name_of(builds[index]), func, builds[index])
+                else:
+                    results[index] = func(builds[index])
+            except Exception as exception:  # pylint: disable=broad-except
+                if self.fail_fast:
+                    raise
+                display.error("Build \"%s\" failed: %s" % (name_of(builds[index]).strip(), exception))
+                failures[index] = exception
+
+    def _run_concurrently(self, builds, indices, func, name_of, results, failures):
+        logging.info("Running %d builds with %d jobs", len(indices), self.jobs)
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            futures = [executor.submit(run_captured, name_of(builds[index]), func, builds[index])
+                       for index in indices]
+
+            if self.fail_fast:
+                done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+                failed = [future for future in done if future.exception() is not None]
+                if failed:
+                    for future in futures:
+                        future.cancel()
+                    wait(futures)
+                    raise self._first_failure(futures)
+            else:
+                wait(futures)
+
+        for index, future in zip(indices, futures):
+            if future.exception() is not None:
+                display.error("Build \"%s\" failed: %s" % (name_of(builds[index]).strip(), future.exception()))
+                failures[index] = future.exception()
+            else:
+                results[index] = future.result()
+
+    @staticmethod
+    def _first_failure(futures):
+        """the failure of the build that comes first in the config, cancelled builds have no exception"""
+        for future in futures:
+            if not future.cancelled() and future.exception() is not None:
+                return future.exception()
+        return None
+
+
+class PushPipeline:
+    """
+    Pushes the images of finished builds on a background worker, so that the next build can already run while the
+    images of the previous build are uploaded. The pushes are run in the order they were submitted.
+
+    The after functions of the builds, e.g. their after build commands, are not run by the worker. They are run by
+    the thread waiting for the pushes in the order of the builds, once all pushes are done, so that they do not
+    run concurrently with the before build commands of the next build.
+    """
+
+    def __init__(self, fail_fast=True):
+        self.fail_fast = fail_fast
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.pushes = list()
+
+    def submit(self, name, func, *args, after=None):
+        """queues the push of a build, after is run by wait() if the push succeeded"""
+        if self.fail_fast:
+            self._raise_first_failure()
+        logging.info("Queueing docker push commands of build %s", name.strip())
+        future = self.executor.submit(run_captured, name, func, *args)
+        self.pushes.append((name.strip(), future, after))
+
+    def wait(self, raise_failures=True):
+        """
+        The barrier after all builds, waits until all queued pushes are done and runs the after functions of the
+        builds whose push succeeded. Without raise_failures, e.g. if a build failed, the failures are only reported.
+        """
+        logging.info("Waiting for %d queued docker push commands",
+                     len([future for _, future, _ in self.pushes if not future.done()]))
+        self.executor.shutdown(wait=True)
+        failures = list()
+        for name, future, after in self.pushes:
+            exception = future.exception()
+            if exception is None and after is not None:
+                try:
+                    run_prefixed(name, after)
+                except Exception as after_exception:  # pylint: disable=broad-except
+                    exception = after_exception
+            if exception is None:
+                continue
+            if self.fail_fast and raise_failures:
+                raise PushFailedException(name, exception)
+            display.error("Build \"%s\" failed after the build: %s" % (name, exception))
+            failures.append((name, exception))
+        if failures and raise_failures:
+            raise BuildFailedException(failures)
+
+    def _raise_first_failure(self):
+        """a failed push fails the run, it is raised under the name of its own build"""
+        for name, future, _ in self.pushes:
+            if future.done() and future.exception() is not None:
+                raise PushFailedException(name, future.exception())
+
+
+class BuildPlan:
+    """
+    The state of the builds of a run: the builds every build depends on, the images built by the run or by upstream
+    projects, the duplicate builds along with the images they are tagged from, the push pipeline and the build state.
+    """
+
+    def __init__(self):
+        self.build_dependencies = dict()
+        self.built_images = set()
+        self.upstream_repositories = set()
+        self.duplicate_builds = dict()
+        self.images_of_builds = dict()
+        self.push_pipeline = None
+        self.build_state = None
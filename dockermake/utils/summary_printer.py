@@ -1,5 +1,4 @@
 import json
-import tabulate
 
 from dockermake.lint.linter import DockerfileLint
 from dockermake.lint.rules.general import GeneralRules
@@ -8,20 +7,26 @@ from dockermake.lint.rules.builder_stages import BuilderStagesRules
 from dockermake.lint.rules.last_stage import LastStageRules
 from dockermake.utils import display
 
-# Until now, tabulate (0.8.2) did not release github flavored table styles... as long as we are waiting, here is
-# the workaround
-# pylint: disable=protected-access
-tabulate._table_formats.update({
-    "github":
-        tabulate.TableFormat(lineabove=tabulate.Line("|", "-", "|", "|"),
-                             linebelowheader=tabulate.Line("|", "-", "|", "|"),
-                             linebetweenrows=None,
-                             linebelow=None,
-                             headerrow=tabulate.DataRow("|", "|", "|"),
-                             datarow=tabulate.DataRow("|", "|", "|"),
-                             padding=1,
-                             with_header_hide=["lineabove"]),
-})
+
+def _tabulate(table, headers):
+    """tabulate is only imported for the summaries, it takes long to import"""
+    import tabulate  # pylint: disable=import-outside-toplevel
+
+    # Until now, tabulate (0.8.2) did not release github flavored table styles... as long as we are waiting, here is
+    # the workaround
+    # pylint: disable=protected-access
+    tabulate._table_formats.update({
+        "github":
+            tabulate.TableFormat(lineabove=tabulate.Line("|", "-", "|", "|"),
+                                 linebelowheader=tabulate.Line("|", "-", "|", "|"),
+                                 linebetweenrows=None,
+                                 linebelow=None,
+                                 headerrow=tabulate.DataRow("|", "|", "|"),
+                                 datarow=tabulate.DataRow("|", "|", "|"),
+                                 padding=1,
+                                 with_header_hide=["lineabove"]),
+    })
+    return tabulate.tabulate(table, headers, tablefmt="github")
 
 
 class SummaryPrinter:
@@ -46,6 +51,7 @@ class SummaryPrinter:
             cls._print_build_args(build.get("build-args"))
             cls._print_build_labels(build.get("build-labels"))
             cls._print_build_tags(build.get("build-tags"))
+            cls._print_build_push_durations(build.get("push-durations"))
             cls._print_build_image_properties(build.get("image-properties"))
             cls._print_build_digests(build.get("digest"))
 
@@ -69,7 +75,7 @@ class SummaryPrinter:
         display.info("")
         if build_args:
             table = [build_arg.split("=") for build_arg in build_args]
-            display.info(tabulate.tabulate(table, ["Key", "Value"], tablefmt="github"))
+            display.info(_tabulate(table, ["Key", "Value"]))
         else:
             display.info("None")
         display.info("")
@@ -96,6 +102,16 @@ class SummaryPrinter:
             display.info("None")
         display.info("")
 
+    @staticmethod
+    def _print_build_push_durations(push_durations):
+        display.info("### Push Durations")
+        display.info("")
+        if push_durations:
+            display.info(_tabulate(push_durations, ["Tag", "Duration"]))
+        else:
+            display.info("None")
+        display.info("")
+
     @staticmethod
     def _print_build_image_properties(image_properties):
         display.info("### Image Properties")
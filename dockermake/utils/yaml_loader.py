@@ -1,9 +1,8 @@
-import yaml
-
-
 class YamlLoader:
     @staticmethod
     def safe_load_yaml(yaml_path):
+        import yaml  # pylint: disable=import-outside-toplevel
+
         with open(yaml_path, "r", encoding='UTF-8') as yaml_file:
             try:
                 return yaml.safe_load(yaml_file.read())
@@ -4,5 +4,6 @@ import os
 datas = collect_data_files('dockermake', subdir=os.path.join('registries', 'schemas'))
 datas += collect_data_files('dockermake', subdir=os.path.join('config', 'validators', 'schemas'))
 
+# the instruction modules are imported by name, see INSTRUCTIONS in dockermake.dockerfile.instructions
 hiddenimports = collect_submodules("dockermake.dockerfile.instructions")
 
@@ -31,7 +31,6 @@ setup(
     package_data=dict(dockermake=["config/validators/schemas/*.json", "registries/schemas/*.json"]),
     install_requires=[
         "ConfigArgParse",
-        "mock",
         "jsonschema>=2.6.0,<3",
         "PyYAML>=5.3.1,<6",
         "pyparsing==2.3.0",
@@ -42,6 +41,7 @@ setup(
         dev=[
             "nose",
             "coverage",
+            "mock",
             "testfixtures",
             "setuptools-lint"
         ]
@@ -0,0 +1,59 @@
+import argparse
+import logging
+import sys
+
+from tabulate import tabulate
+
+from test.benchmark import suite
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(prog="python -m test.benchmark",
+                                     description="Benchmarks the parser, the linter and the config expansion and "
+                                                 "validation and compares the results with a baseline.")
+    parser.add_argument("-k", "--filter", default=None, help="only run the benchmarks whose name contains the string")
+    parser.add_argument("--repeat", type=int, default=3, help="the number of rounds, the best one counts")
+    parser.add_argument("--max-size", type=int, default=None, help="skip the larger inputs, e.g. for a quick run")
+    parser.add_argument("--baseline", default=suite.BASELINE_FILE, help="the baseline to compare with")
+    parser.add_argument("--save-baseline", action="store_true", default=False,
+                        help="store the results as new baseline instead of comparing with it")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="the relative slowdown against the baseline that is reported as regression")
+    parsed_args = parser.parse_args(args)
+    # the generated inputs are not meant to be free of warnings
+    logging.disable(logging.WARNING)
+
+    benchmarks = [benchmark for benchmark in suite.BENCHMARKS
+                  if not parsed_args.filter or parsed_args.filter in benchmark.name]
+    results = suite.run(benchmarks, repeat=parsed_args.repeat, max_size=parsed_args.max_size,
+                        progress=lambda name, size, seconds: print("%s (%d): %.6f s" % (name, size, seconds),
+                                                                   file=sys.stderr))
+
+    if parsed_args.save_baseline:
+        suite.save_baseline(results, parsed_args.baseline)
+        print("Saved baseline to %s" % parsed_args.baseline)
+        return 0
+
+    try:
+        baseline = suite.load_baseline(parsed_args.baseline)
+    except (IOError, OSError):
+        baseline = dict()
+
+    rows = list()
+    for name, timings in results.items():
+        scaling = suite.scaling(timings)
+        for size, seconds in sorted(timings.items(), key=lambda item: int(item[0])):
+            expected = baseline.get(name, dict()).get(size)
+            rows.append([name, size, "%.3f ms" % (seconds * 1000), "%.3f us" % (seconds * 1000000 / int(size)),
+                         "%.2fx" % (seconds / expected) if expected else "-",
+                         "%.2f" % scaling if scaling is not None else "-"])
+    print(tabulate(rows, headers=["Benchmark", "Size", "Time", "Time per item", "vs. baseline", "Scaling"]))
+
+    regressions = suite.compare(results, baseline, parsed_args.tolerance)
+    for name, size, expected, seconds in regressions:
+        print("Regression: %s (%d) took %.3f ms, baseline %.3f ms" % (name, size, seconds * 1000, expected * 1000))
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+import unittest
+
+from dockermake.config.config_factory import ConfigFactory
+from dockermake.config.validators.config_1_0_validator import Config10Validator
+from dockermake.dockerfile.dockerfile import Dockerfile
+from dockermake.dockerfile.instructions import Keywords
+from dockermake.dockerfile.logical_line_extractor import LogicalLineExtractor
+from test.benchmark import suite
+from test.benchmark.generators import generate_config, generate_dockerfile
+
+
+class GeneratorsTest(unittest.TestCase):
+    def test_generate_dockerfile(self):
+        context = generate_dockerfile(1000, stages=10, continuation_depth=5)
+        dockerfile = Dockerfile._parse(context)
+
+        self.assertAlmostEqual(1000, dockerfile.get_instruction_count(), delta=50)
+        self.assertEqual(10, len(dockerfile.get_instructions_of_type(Keywords.FROM)))
+        self.assertIn("\\\n", context)
+
+    def test_generate_dockerfile_is_parsed_alike_by_all_backends(self):
+        context = generate_dockerfile(100, stages=2, continuation_depth=3)
+        self.assertEqual(LogicalLineExtractor.parse_dockerfile(context, backend="pyparsing"),
+                         LogicalLineExtractor.parse_dockerfile(context, backend="scanner"))
+
+    def test_generate_config_is_valid(self):
+        config = ConfigFactory.create_by_version("1", dict(generate_config(20, args=5), version="1"))
+        validator = Config10Validator(config)
+        validator.validate(Dockerfile._parse(generate_dockerfile(100, args=5)))
+
+        self.assertEqual([], validator.errors)
+        self.assertEqual(20, len(config.config["builds"]))
+
+
+class SuiteTest(unittest.TestCase):
+    def test_run(self):
+        benchmark = suite.Benchmark("sum", [10, 100, 1000], lambda size: lambda: sum(range(size)))
+        results = suite.run([benchmark], repeat=1, max_size=100)
+
+        self.assertEqual(["10", "100"], list(results["sum"]))
+        self.assertTrue(all(seconds > 0 for seconds in results["sum"].values()))
+
+    def test_scaling(self):
+        self.assertAlmostEqual(1.0, suite.scaling({"10": 0.001, "1000": 0.1}))
+        self.assertAlmostEqual(2.0, suite.scaling({"10": 0.001, "100": 0.02, "1000": 10.0}))
+        self.assertIsNone(suite.scaling({"10": 0.001}))
+
+    def test_compare(self):
+        baseline = {"parse": {"10": 0.010, "100": 0.100}, "lint": {"10": 0.010}}
+        results = {"parse": {"10": 0.011, "100": 0.200}, "lint": {"10": 0.020}, "new": {"10": 1.0}}
+
+        self.assertEqual([("lint", 10, 0.010, 0.020), ("parse", 100, 0.100, 0.200)],
+                         suite.compare(results, baseline, tolerance=0.25))
+
+    def test_baseline_covers_all_benchmarks(self):
+        baseline = suite.load_baseline()
+        for benchmark in suite.BENCHMARKS:
+            self.assertEqual([str(size) for size in benchmark.sizes], list(baseline[benchmark.name]))
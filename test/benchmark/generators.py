@@ -0,0 +1,56 @@
+"""Synthetic Dockerfiles and docker-make.yaml configs of a given size for the benchmarks."""
+
+
+def generate_dockerfile(instructions, stages=1, continuation_depth=1, args=0):
+    """
+    A Dockerfile with about the given number of instructions, spread over the stages. Every stage but the last is a
+    builder stage copied from by the next one, every RUN instruction spans continuation_depth physical lines.
+    """
+    lines = ["# syntax=docker/dockerfile:1", "ARG BASE_VERSION=3.12"]
+    lines += ["ARG ARG_%d" % index for index in range(args)]
+    per_stage = max(1, (instructions - len(lines)) // stages)
+    for stage in range(stages):
+        lines.append("FROM alpine:${BASE_VERSION} AS stage-%d" % stage)
+        lines.append("LABEL maintainer=\"stage-%d@example.com\"" % stage)
+        if stage > 0:
+            lines.append("COPY --from=stage-%d /out /in" % (stage - 1))
+        for index in range(per_stage - 3):
+            lines += _instruction(index, continuation_depth)
+        lines.append("USER nobody")
+    lines.append("ENTRYPOINT [\"/bin/sh\"]")
+    return "\n".join(lines) + "\n"
+
+
+def _instruction(index, continuation_depth):
+    kind = index % 5
+    if kind == 0:
+        commands = ["echo %d-%d" % (index, line) for line in range(continuation_depth)]
+        return ["RUN " + " && \\\n    ".join(commands)]
+    if kind == 1:
+        return ["ENV VARIABLE_%d=value-%d" % (index, index)]
+    if kind == 2:
+        return ["COPY files/%d /opt/files/%d" % (index, index)]
+    if kind == 3:
+        return ["# comment %d" % index, "WORKDIR /opt/%d" % index]
+    return ["EXPOSE %d" % (1024 + index % 60000)]
+
+
+def generate_config(builds, args=10, labels=5):
+    """A docker-make.yaml config with the given number of builds, each with build args referencing variables"""
+    config = {
+        "name": "benchmark",
+        "username": "acme",
+        "registry-host": "registry.example.com",
+        "default-build-name": "build-0",
+        "default-build-args": ["ARG_%d=${BENCHMARK_VARIABLE_%d:-default-%d}" % (index, index, index)
+                               for index in range(args)],
+        "builds": list(),
+    }
+    for build in range(builds):
+        config["builds"].append({
+            "name": "build-%d" % build,
+            "tags": ["${BENCHMARK_TAG:-tag}-%d" % build, "build-%d-${ARG_0}" % build],
+            "build-args": ["ARG_%d=build-%d-${ARG_%d:+set}" % (index, build, index) for index in range(args)],
+            "labels": ["label-%d=${ARG_%d}" % (index, index % max(args, 1)) for index in range(labels)],
+        })
+    return config
@@ -0,0 +1,148 @@
+"""
+Benchmarks of the parser, the linter and the config expansion and validation on synthetic inputs of increasing size.
+Run with python -m test.benchmark, see --help.
+"""
+import json
+import math
+import os
+import platform
+import timeit
+
+from dockermake.config.config_factory import ConfigFactory
+from dockermake.config.interpolation import PosixStyleExpander
+from dockermake.config.validators.config_1_0_validator import Config10Validator
+from dockermake.dockerfile.dockerfile import Dockerfile
+from dockermake.dockerfile.logical_line_extractor import LogicalLineExtractor
+from dockermake.lint.linter import DockerfileLint
+from test.benchmark.generators import generate_config, generate_dockerfile
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DOCKERFILE_SIZES = [100, 1000, 10000]
+# the pyparsing backend takes more than a millisecond per instruction
+PYPARSING_SIZES = [100, 1000]
+CONFIG_SIZES = [10, 100, 1000]
+CONFIG_ARGS = 10
+
+
+class Benchmark:
+    """A function timed on inputs of increasing size, setup(size) returns the function to time."""
+
+    def __init__(self, name, sizes, setup):
+        self.name = name
+        self.sizes = sizes
+        self.setup = setup
+
+    def run(self, size, repeat):
+        """the best time of a single call out of repeat rounds, in seconds"""
+        function = self.setup(size)
+        timer = timeit.Timer(function)
+        number, _ = timer.autorange()
+        return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def _parse_logical_lines(backend, **dockerfile_options):
+    def setup(size):
+        context = generate_dockerfile(size, **dockerfile_options)
+        return lambda: LogicalLineExtractor.parse_dockerfile(context, backend=backend)
+    return setup
+
+
+def _parse_dockerfile(backend, stage_size=None):
+    def setup(size):
+        context = generate_dockerfile(size, stages=size // stage_size if stage_size else 1)
+
+        def parse():
+            default_backend = LogicalLineExtractor.backend
+            LogicalLineExtractor.backend = backend
+            try:
+                Dockerfile._parse(context)  # pylint: disable=protected-access
+            finally:
+                LogicalLineExtractor.backend = default_backend
+        return parse
+    return setup
+
+
+def _lint(size):
+    context = generate_dockerfile(size, stages=max(1, size // 100))
+    dockerfile = Dockerfile._parse(context)  # pylint: disable=protected-access
+    # validate runs all rules like lint does, without printing the findings
+    return lambda: DockerfileLint(dockerfile, exit_on_errors=False).validate()
+
+
+def _expand(size):
+    config = generate_config(size, args=CONFIG_ARGS)
+    replacement_dict = dict(BENCHMARK_TAG="v1", BENCHMARK_VARIABLE_0="set")
+    replacement_dict.update(("ARG_%d" % index, "value") for index in range(CONFIG_ARGS))
+    return lambda: PosixStyleExpander.expand(config, replacement_dict)
+
+
+def _validate(size):
+    config = ConfigFactory.create_by_version("1", dict(generate_config(size, args=CONFIG_ARGS), version="1"))
+    dockerfile = Dockerfile._parse(generate_dockerfile(100, args=CONFIG_ARGS))  # pylint: disable=protected-access
+    return lambda: Config10Validator(config).validate(dockerfile)
+
+
+BENCHMARKS = [
+    Benchmark("parse_dockerfile[pyparsing]", PYPARSING_SIZES, _parse_logical_lines("pyparsing")),
+    Benchmark("parse_dockerfile[scanner]", DOCKERFILE_SIZES, _parse_logical_lines("scanner")),
+    Benchmark("parse_dockerfile[scanner,continuations]", DOCKERFILE_SIZES,
+              _parse_logical_lines("scanner", continuation_depth=20)),
+    Benchmark("Dockerfile._parse[pyparsing]", PYPARSING_SIZES, _parse_dockerfile("pyparsing")),
+    Benchmark("Dockerfile._parse[scanner]", DOCKERFILE_SIZES, _parse_dockerfile("scanner")),
+    Benchmark("Dockerfile._parse[scanner,stages]", DOCKERFILE_SIZES, _parse_dockerfile("scanner", stage_size=10)),
+    Benchmark("DockerfileLint.lint", DOCKERFILE_SIZES, _lint),
+    Benchmark("PosixStyleExpander.expand", CONFIG_SIZES, _expand),
+    Benchmark("Config10Validator.validate", CONFIG_SIZES, _validate),
+]
+
+
+def run(benchmarks=None, repeat=3, max_size=None, progress=None):
+    """returns the results as {benchmark name: {size: seconds}}"""
+    results = dict()
+    for benchmark in benchmarks or BENCHMARKS:
+        timings = dict()
+        for size in benchmark.sizes:
+            if max_size and size > max_size:
+                continue
+            timings[str(size)] = benchmark.run(size, repeat)
+            if progress:
+                progress(benchmark.name, size, timings[str(size)])
+        results[benchmark.name] = timings
+    return results
+
+
+def scaling(timings):
+    """
+    The exponent of the growth of the time between the smallest and the largest size: 1 is linear, 2 quadratic.
+    None if there are less than two sizes.
+    """
+    sizes = sorted(timings, key=int)
+    if len(sizes) < 2 or not timings[sizes[0]] or not timings[sizes[-1]]:
+        return None
+    return math.log(timings[sizes[-1]] / timings[sizes[0]]) / math.log(int(sizes[-1]) / int(sizes[0]))
+
+
+def compare(results, baseline, tolerance):
+    """
+    returns the (benchmark, size, baseline seconds, seconds) of the benchmarks that are slower than the baseline by more
+    than the tolerance
+    """
+    regressions = list()
+    for name, timings in sorted(results.items()):
+        for size, seconds in sorted(timings.items(), key=lambda item: int(item[0])):
+            expected = baseline.get(name, dict()).get(size)
+            if expected and seconds > expected * (1 + tolerance):
+                regressions.append((name, int(size), expected, seconds))
+    return regressions
+
+
+def load_baseline(path=BASELINE_FILE):
+    with open(path, "r", encoding="UTF-8") as baseline_file:
+        return json.load(baseline_file)["results"]
+
+
+def save_baseline(results, path=BASELINE_FILE):
+    baseline = dict(python=platform.python_version(), machine=platform.machine(), results=results)
+    with open(path, "w", encoding="UTF-8") as baseline_file:
+        json.dump(baseline, baseline_file, indent=2, sort_keys=True)
+        baseline_file.write("\n")
@@ -1,9 +1,17 @@
+import os
+import subprocess
+import sys
 import unittest
 
+from mock import patch
+
 import dockermake.cli
 
 
 class CliTest(unittest.TestCase):
+    # the cumulative import time of the entry module in microseconds, including configargparse
+    STARTUP_BUDGET_US = 300000
+
     def test_parse_no_push(self):
         _, args = dockermake.cli.parse(['-n'])
         self.assertTrue(args.no_push)
@@ -50,3 +58,55 @@ class CliTest(unittest.TestCase):
         self.assertEqual(len(args.docker_build_args), 2)
         self.assertEqual(args.docker_build_args[0], 'A=42')
         self.assertEqual(args.docker_build_args[1], 'B=43')
+
+    def test_parse_jobs(self):
+        _, args = dockermake.cli.parse([])
+        self.assertEqual(args.jobs, 1)
+        self.assertFalse(args.keep_going)
+
+        _, args = dockermake.cli.parse(['-j', '4', '--keep-going'])
+        self.assertEqual(args.jobs, 4)
+        self.assertTrue(args.keep_going)
+
+    def test_parse_lint(self):
+        _, args = dockermake.cli.parse(['--only-lint'])
+        self.assertTrue(args.only_lint)
+        self.assertIsNone(args.lint_files)
+
+        with patch.dict(os.environ, {"DOCKER_MAKE_ONLY_LINT": "true"}):
+            _, args = dockermake.cli.parse([])
+        self.assertTrue(args.only_lint)
+        self.assertIsNone(args.lint_files)
+
+        _, args = dockermake.cli.parse(['--lint-files', 'Dockerfile', 'services/*'])
+        self.assertFalse(args.only_lint)
+        self.assertEqual(args.lint_files, ['Dockerfile', 'services/*'])
+
+    def test_startup_imports(self):
+        imports = self.import_times("dockermake.cli")
+
+        for heavy_module in ["dockermake.make", "pyparsing", "jsonschema", "tabulate", "yaml", "mock", "termcolor",
+                             "distutils", "http.client"]:
+            self.assertNotIn(heavy_module, imports)
+        self.assertLess(imports["dockermake.cli"], self.STARTUP_BUDGET_US)
+
+    def test_make_imports(self):
+        imports = self.import_times("dockermake.make")
+
+        for heavy_module in ["jsonschema", "tabulate", "yaml", "mock", "distutils", "http.client", "tarfile"]:
+            self.assertNotIn(heavy_module, imports)
+
+    @staticmethod
+    def import_times(module):
+        """returns the cumulative import times of all modules imported by the module in microseconds"""
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        process = subprocess.run([sys.executable, "-X", "importtime", "-c", "import " + module], cwd=root,
+                                 stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True, check=True)
+        imports = dict()
+        for line in process.stderr.splitlines():
+            if not line.startswith("import time:") or "|" not in line:
+                continue
+            _, cumulative, name = line[len("import time:"):].split("|")
+            if cumulative.strip().isdigit():
+                imports[name.strip()] = int(cumulative)
+        return imports
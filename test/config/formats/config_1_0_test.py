@@ -176,6 +176,22 @@ class Config10Test(unittest.TestCase):
         self.assertTrue(isinstance(build_tags, list))
         self.assertEqual(len(build_tags), 0)
 
+    def test_get_build_target(self):
+        config_wrapper = Config10(dict())
+
+        self.assertEqual(config_wrapper.get_build_target({"target": "debug"}), "debug")
+        self.assertIsNone(config_wrapper.get_build_target(dict()))
+
+    def test_get_build_cache(self):
+        build = {"cache-from": "app:latest", "cache-to": ["type=local,dest=/cache"]}
+
+        config_wrapper = Config10(dict())
+
+        self.assertEqual(config_wrapper.get_build_cache_from(build), ["app:latest"])
+        self.assertEqual(config_wrapper.get_build_cache_to(build), ["type=local,dest=/cache"])
+        self.assertEqual(config_wrapper.get_build_cache_from(dict()), [])
+        self.assertEqual(config_wrapper.get_build_cache_to(dict()), [])
+
     def test_get_merged_build_args(self):
         build = {"build-args": ["C=44", "D=45", "E=46"]}
         config = {
@@ -1,5 +1,6 @@
 import unittest
 import os
+import time
 from dockermake.config.interpolation import PosixStyleExpander
 
 
@@ -84,3 +85,65 @@ class InterpolationTest(unittest.TestCase):
         result = PosixStyleExpander.expand(template_string, replacement_dict)
 
         self.assertEqual(result, "Hi!\nMy name is..\nWhat?\nMy name is..\nWho?\nMy name is..\nchi i chi i Slim Shady")
+
+    def test_render_distinguishes_empty_and_unset_variables(self):
+        replacement_dict = dict(EMPTY="")
+
+        self.assertEqual(PosixStyleExpander.expand("${EMPTY-default}", replacement_dict), "")
+        self.assertEqual(PosixStyleExpander.expand("${EMPTY:-default}", replacement_dict), "default")
+        self.assertEqual(PosixStyleExpander.expand("${UNSET-default}", replacement_dict), "default")
+        self.assertEqual(PosixStyleExpander.expand("${EMPTY+alternative}", replacement_dict), "alternative")
+        self.assertEqual(PosixStyleExpander.expand("${EMPTY:+alternative}", replacement_dict), "")
+        self.assertEqual(PosixStyleExpander.expand("${EMPTY?}", replacement_dict), "")
+        with self.assertRaisesRegex(Exception, "Environment variable 'EMPTY' was required but had no value. not empty"):
+            PosixStyleExpander.expand("${EMPTY:?not empty}", replacement_dict)
+
+    def test_render_assigns_default_values_for_the_rest_of_the_expansion(self):
+        replacement_dict = dict()
+
+        result = PosixStyleExpander.expand(["${VERSION:=1.0}", "v$VERSION", {"${VERSION}": "${VERSION=2.0}"}],
+                                           replacement_dict)
+
+        self.assertEqual(result, ["1.0", "v1.0", {"1.0": "1.0"}])
+        self.assertEqual(replacement_dict, dict())
+
+    def test_render_expands_nested_default_values(self):
+        replacement_dict = dict(FALLBACK="fallback")
+
+        self.assertEqual(PosixStyleExpander.expand("${UNSET:-${FALLBACK}-$FALLBACK}", replacement_dict),
+                         "fallback-fallback")
+        self.assertEqual(PosixStyleExpander.expand("${UNSET:-${ALSO_UNSET:-last}}", replacement_dict), "last")
+
+    def test_render_keeps_literal_dollars_and_unterminated_references(self):
+        self.assertEqual(PosixStyleExpander.expand("costs 5$ or ${ or ${A:-b", dict(A="a")), "costs 5$ or ${ or ${A:-b")
+
+    def test_render_keeps_values_with_json_special_characters(self):
+        replacement_dict = dict(QUOTED='say "hi"\\n', MULTI_LINE="a\nb")
+
+        result = PosixStyleExpander.expand({"a": "$QUOTED", "b": "${MULTI_LINE}", "c": 42, "d": None, "e": True},
+                                           replacement_dict)
+
+        self.assertEqual(result, {"a": 'say "hi"\\n', "b": "a\nb", "c": 42, "d": None, "e": True})
+
+    def test_render_does_not_change_the_config(self):
+        config = {"builds": [{"name": "$NAME", "build-args": ["A=$A"]}]}
+
+        result = PosixStyleExpander.expand(config, dict(NAME="name", A="a"))
+
+        self.assertEqual(result, {"builds": [{"name": "name", "build-args": ["A=a"]}]})
+        self.assertEqual(config, {"builds": [{"name": "$NAME", "build-args": ["A=$A"]}]})
+
+    def test_render_large_configs_fast(self):
+        builds = [{"name": "build-%d" % index,
+                   "build-args": ["ARG_%d=${VERSION:-1.0}-$SUFFIX-%d" % (arg, index) for arg in range(20)],
+                   "tags": ["${VERSION}-${SUFFIX:+$SUFFIX}-%d" % index, "latest"]} for index in range(200)]
+        replacement_dict = dict(VERSION="2.0", SUFFIX="alpine")
+
+        start = time.perf_counter()
+        for _ in range(5):
+            result = PosixStyleExpander.expand({"builds": builds}, replacement_dict)
+        duration = (time.perf_counter() - start) / 5
+
+        self.assertEqual(result["builds"][199]["build-args"][19], "ARG_19=2.0-alpine-199")
+        self.assertEqual(result["builds"][199]["tags"][0], "2.0-alpine-199")
+        self.assertLess(duration, 0.5)
@@ -461,6 +461,16 @@ class Config10ValidatorTest(unittest.TestCase):
         self.assertIn("The docker-make.yaml schema is invalid: 'something' is not of type 'object'",
                       validator.errors[0])
 
+    def test_targets_in_dockerfile(self):
+        config = {'builds': [{'name': "runtime", 'target': "runtime"}, {'name': "debug", 'target': "debug"},
+                             {'name': "default"}]}
+        validator = self.get_validator_from_config(config)
+        dockerfile = Dockerfile._parse("FROM golang AS builder\nFROM alpine AS runtime\n")
+
+        validator.targets_in_dockerfile(dockerfile)
+
+        self.assertEqual(validator.errors, ['target debug of build "debug" is not a stage of the Dockerfile'])
+
     @staticmethod
     def get_validator_from_config(config):
         config_wrapper = Config10(config)
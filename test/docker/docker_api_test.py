@@ -0,0 +1,326 @@
+import base64
+import io
+import json
+import os
+import shutil
+import tarfile
+import tempfile
+import unittest
+
+from mock import patch
+
+from dockermake.docker.docker_api import DockerApi
+from dockermake.docker.docker_cli_1_12 import DockerCli112
+from dockermake.docker.docker_cli_factory import DockerCliFactory
+from dockermake.utils.helpers import OutputOptions
+from test.docker.fake_docker_daemon import FakeDockerDaemon
+from test.helpers import captured_output
+
+
+class DockerApiTest(unittest.TestCase):
+    def setUp(self):
+        self.daemon = FakeDockerDaemon().start()
+        self.daemon.respond("GET", "/version", body={"Version": "19.03.5-ce"})
+        self.docker_config = tempfile.mkdtemp()
+        self.config_patch = patch("dockermake.constants.Constants.DOCKER_CONFIG", self.docker_config)
+        self.config_patch.start()
+        DockerApi.reset()
+        DockerApi.socket_path = self.daemon.socket_path
+
+    def tearDown(self):
+        DockerApi.reset()
+        DockerApi.socket_path = None
+        self.config_patch.stop()
+        self.daemon.stop()
+        shutil.rmtree(self.docker_config)
+
+    def test_version(self):
+        self.assertEqual(DockerApi.version(), ("19.03.5", "ce"))
+
+    def test_build_sends_context_and_parameters(self):
+        context = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, context)
+        self.write(context, "Dockerfile", "FROM centos:7\nCOPY app.py /\n")
+        self.write(context, "app.py", "print(42)\n")
+        self.write(context, "secret.txt", "do not send\n")
+        self.write(context, ".dockerignore", "secret.txt\n")
+        self.daemon.respond("POST", "/build", messages=[{"stream": "Step 1/2 : FROM centos:7\n"},
+                                                        {"stream": "Successfully built 123456789abc\n"}])
+
+        with captured_output() as (out, _):
+            output, err, rc = DockerApi.build(context, tags=["a:1", "a:latest"], build_args=["VERSION=1.0"],
+                                              labels=["ci.url=http://ci"], pull=True, no_cache=True, target="app",
+                                              output=OutputOptions(continuous=True))
+
+        self.assertEqual(rc, 0)
+        self.assertEqual(err, "")
+        self.assertEqual(output, "Step 1/2 : FROM centos:7\nSuccessfully built 123456789abc")
+        self.assertIn("Successfully built 123456789abc", out.getvalue())
+
+        request = self.daemon.requests_to("POST", "/build")[0]
+        self.assertEqual(request["query"]["t"], ["a:1", "a:latest"])
+        self.assertEqual(json.loads(request["query"]["buildargs"][0]), {"VERSION": "1.0"})
+        self.assertEqual(json.loads(request["query"]["labels"][0]), {"ci.url": "http://ci"})
+        self.assertEqual(request["query"]["pull"], ["1"])
+        self.assertEqual(request["query"]["nocache"], ["1"])
+        self.assertEqual(request["query"]["target"], ["app"])
+        self.assertEqual(request["query"]["dockerfile"], ["Dockerfile"])
+        self.assertEqual(request["headers"]["Content-Type"], "application/x-tar")
+        self.assertEqual(self.tar_names(request["body"]), [".dockerignore", "Dockerfile", "app.py"])
+
+    def test_build_sends_dockerfile_outside_of_context(self):
+        context = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, context)
+        self.write(context, "context/app.py", "print(42)\n")
+        self.write(context, "Dockerfile.app", "FROM centos:7\n")
+        self.daemon.respond("POST", "/build", messages=[{"stream": "done\n"}])
+
+        DockerApi.build(os.path.join(context, "context"), file=os.path.join(context, "Dockerfile.app"))
+
+        request = self.daemon.requests_to("POST", "/build")[0]
+        dockerfile_name = request["query"]["dockerfile"][0]
+        self.assertTrue(dockerfile_name.startswith(".dockerfile."))
+        with tarfile.open(fileobj=io.BytesIO(request["body"])) as tar:
+            self.assertEqual(tar.extractfile(dockerfile_name).read(), b"FROM centos:7\n")
+            self.assertIn("app.py", tar.getnames())
+
+    def test_build_sends_cache_sources(self):
+        context = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, context)
+        self.write(context, "Dockerfile", "FROM centos:7\n")
+        self.daemon.respond("POST", "/build", messages=[{"stream": "done\n"}])
+
+        DockerApi.build(context, cache_from=["a:1", "a:latest"])
+
+        request = self.daemon.requests_to("POST", "/build")[0]
+        self.assertEqual(json.loads(request["query"]["cachefrom"][0]), ["a:1", "a:latest"])
+
+    def test_build_sends_dockerfile_and_dockerignore_excluded_by_allow_list(self):
+        context = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, context)
+        self.write(context, "docker/Dockerfile", "FROM centos:7\nCOPY app /app\n")
+        self.write(context, "app/app.py", "print(42)\n")
+        self.write(context, "secret.txt", "do not send\n")
+        self.write(context, ".dockerignore", "*\n!app\n")
+        self.daemon.respond("POST", "/build", messages=[{"stream": "done\n"}])
+
+        DockerApi.build(context, file=os.path.join(context, "docker", "Dockerfile"))
+
+        request = self.daemon.requests_to("POST", "/build")[0]
+        self.assertEqual(request["query"]["dockerfile"], ["docker/Dockerfile"])
+        self.assertEqual(self.tar_names(request["body"]), [".dockerignore", "app", "app/app.py", "docker/Dockerfile"])
+
+    def test_build_that_needs_buildkit_uses_cli(self):
+        builds = [dict(cache_to=["type=local,dest=/cache"]), dict(build_args=["BUILDKIT_INLINE_CACHE=1"])]
+        for kwargs in builds:
+            with patch("dockermake.docker.docker_api.DockerCli112.build", return_value=("", "", 0)) as cli_build:
+                DockerApi.build("/context", tags=["a:1"], **kwargs)
+            cli_build.assert_called_once_with("/context", tags=["a:1"], **kwargs)
+
+        with patch.dict(os.environ, {"DOCKER_BUILDKIT": "1"}):
+            with patch("dockermake.docker.docker_api.DockerCli112.build", return_value=("", "", 0)) as cli_build:
+                DockerApi.build("/context")
+            cli_build.assert_called_once_with("/context")
+        self.assertEqual(self.daemon.requests_to("POST", "/build"), [])
+
+    def test_build_error_raises(self):
+        context = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, context)
+        self.write(context, "Dockerfile", "FROM centos:7\nRUN false\n")
+        self.daemon.respond("POST", "/build", messages=[{"stream": "Step 2/2 : RUN false\n"},
+                                                        {"error": "The command '/bin/sh -c false' returned a non-zero "
+                                                                  "code: 1"}])
+
+        with self.assertRaises(Exception) as context_manager:
+            DockerApi.build(context)
+        self.assertIn("returned a non-zero code: 1", str(context_manager.exception))
+
+        output, err, rc = DockerApi.build(context, fail_on_bad_return_code=False)
+        self.assertEqual(rc, 1)
+        self.assertEqual(output, "Step 2/2 : RUN false")
+        self.assertIn("returned a non-zero code: 1", err)
+
+    def test_build_dry_run(self):
+        with captured_output() as (out, _):
+            output, err, rc = DockerApi.build("/not/existing", tags=["a:1"], dry_run=True)
+        self.assertEqual((output, err, rc), ("", "", 0))
+        self.assertIn("[DRY] Would request docker API: POST /build", out.getvalue())
+        self.assertEqual(self.daemon.requests_to("POST", "/build"), [])
+
+    def test_inspect_with_format(self):
+        self.daemon.respond("GET", "/images/centos:7/json",
+                            body={"Id": "sha256:1234", "RepoDigests": ["centos@sha256:abcd"],
+                                  "Config": {"Labels": {"b": "2", "a": "1"}}})
+
+        self.assertEqual(DockerApi.inspect("centos:7", output_format="{{.Id}}"), ("sha256:1234", "", 0))
+        self.assertEqual(DockerApi.inspect("centos:7", output_format="{{ json .RepoDigests }}")[0],
+                         '["centos@sha256:abcd"]')
+        self.assertEqual(DockerApi.inspect("centos:7", output_format="{{.Config.Labels}}")[0], "map[a:1 b:2]")
+        self.assertEqual(DockerApi.inspect("centos:7", output_format="{{.Config.Missing}}")[0], "<no value>")
+
+    def test_inspect_not_existing_image(self):
+        self.daemon.respond("GET", "/images/unknown:1/json", status=404,
+                            body={"message": "No such image: unknown:1"})
+
+        output, err, rc = DockerApi.inspect("unknown:1", fail_on_bad_return_code=False)
+
+        self.assertEqual((output, rc), ("[]", 1))
+        self.assertEqual(err, "Error: No such image: unknown:1")
+
+    def test_inspect_several_images(self):
+        self.daemon.respond("GET", "/images/a:1/json", body={"Id": "sha256:1"})
+        self.daemon.respond("GET", "/images/b:1/json", body={"Id": "sha256:2"})
+
+        output, err, rc = DockerApi.inspect(["a:1", "unknown:1", "b:1"], output_format="{{.Id}}",
+                                            fail_on_bad_return_code=False)
+
+        self.assertEqual((output, rc), ("sha256:1\nsha256:2", 1))
+        self.assertEqual(err, "Error: No such image: unknown:1")
+
+    def test_requests_reuse_one_connection(self):
+        self.daemon.respond("GET", "/images/centos:7/json", body={"Id": "sha256:1234"})
+
+        for _ in range(5):
+            DockerApi.inspect("centos:7", output_format="{{.Id}}")
+
+        self.assertEqual(len(self.daemon.requests_to("GET", "/images/centos:7/json")), 5)
+        self.assertEqual(self.daemon.connections, 1)
+
+    def test_images_quiet(self):
+        self.daemon.respond("GET", "/images/json", body=[{"Id": "sha256:1234567890abcdef", "RepoTags": ["a:1"]},
+                                                         {"Id": "sha256:fedcba0987654321", "RepoTags": ["a:2"]}])
+
+        images = DockerApi.images(image="a", quiet=True)
+
+        self.assertEqual(sorted(images), ["1234567890ab", "fedcba098765"])
+        request = self.daemon.requests_to("GET", "/images/json")[0]
+        self.assertEqual(json.loads(request["query"]["filters"][0]), {"reference": ["a"]})
+
+    def test_push_sends_credentials_of_login(self):
+        self.daemon.respond("POST", "/auth", body={"Status": "Login Succeeded"})
+        self.daemon.respond("POST", "/images/registry.example.com/a/push",
+                            messages=[{"status": "The push refers to repository [registry.example.com/a]"},
+                                      {"status": "Pushing", "progressDetail": {"current": 1, "total": 2},
+                                       "id": "abcd"},
+                                      {"status": "1: digest: sha256:1234 size: 527"}])
+
+        DockerApi.login("registry.example.com", user="user", password="secret")
+        output, _, rc = DockerApi.push("registry.example.com/a:1")
+
+        self.assertEqual(rc, 0)
+        self.assertEqual(output, "The push refers to repository [registry.example.com/a]\n"
+                                 "1: digest: sha256:1234 size: 527")
+        request = self.daemon.requests_to("POST", "/images/registry.example.com/a/push")[0]
+        self.assertEqual(request["query"]["tag"], ["1"])
+        auth = json.loads(base64.urlsafe_b64decode(request["headers"]["X-Registry-Auth"]))
+        self.assertEqual(auth["username"], "user")
+        self.assertEqual(auth["password"], "secret")
+        self.assertEqual(auth["serveraddress"], "registry.example.com")
+
+    def test_push_sends_credentials_of_docker_config(self):
+        with open(os.path.join(self.docker_config, "config.json"), "w") as config:
+            json.dump({"auths": {"registry.example.com": {"auth": base64.b64encode(b"user:secret").decode()}}},
+                      config)
+        self.daemon.respond("POST", "/images/registry.example.com/a/push", messages=[])
+
+        DockerApi.push("registry.example.com/a:1")
+
+        request = self.daemon.requests_to("POST", "/images/registry.example.com/a/push")[0]
+        auth = json.loads(base64.urlsafe_b64decode(request["headers"]["X-Registry-Auth"]))
+        self.assertEqual((auth["username"], auth["password"]), ("user", "secret"))
+
+    def test_build_sends_credentials_of_docker_hub(self):
+        context = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, context)
+        self.write(context, "Dockerfile", "FROM centos:7\n")
+        with open(os.path.join(self.docker_config, "config.json"), "w") as config:
+            json.dump({"auths": {"https://index.docker.io/v1/": {"auth": base64.b64encode(b"user:secret").decode()},
+                                 "registry.example.com": {"auth": base64.b64encode(b"other:word").decode()}}},
+                      config)
+        self.daemon.respond("POST", "/build", messages=[{"stream": "done\n"}])
+
+        DockerApi.build(context)
+
+        request = self.daemon.requests_to("POST", "/build")[0]
+        config = json.loads(base64.urlsafe_b64decode(request["headers"]["X-Registry-Config"]))
+        self.assertEqual(config, {"https://index.docker.io/v1/": {"username": "user", "password": "secret"},
+                                  "registry.example.com": {"username": "other", "password": "word"}})
+
+    def test_tag(self):
+        self.daemon.respond("POST", "/images/a:1/tag", status=201)
+
+        self.assertEqual(DockerApi.tag("a:1", "registry.example.com:5000/b:2"), ("", "", 0))
+
+        request = self.daemon.requests_to("POST", "/images/a:1/tag")[0]
+        self.assertEqual(request["query"]["repo"], ["registry.example.com:5000/b"])
+        self.assertEqual(request["query"]["tag"], ["2"])
+
+    def test_remove_images(self):
+        self.daemon.respond("DELETE", "/images/1234", body=[{"Untagged": "a:1"}, {"Deleted": "sha256:1234"}])
+        self.daemon.respond("DELETE", "/images/5678", body=[{"Deleted": "sha256:5678"}])
+
+        output, _, rc = DockerApi.remove_images(["1234", "5678"], force=True)
+
+        self.assertEqual(rc, 0)
+        self.assertEqual(output, "Untagged: a:1\nDeleted: sha256:1234\nDeleted: sha256:5678")
+        self.assertEqual(self.daemon.requests_to("DELETE", "/images/1234")[0]["query"]["force"], ["1"])
+
+    def test_pull(self):
+        self.daemon.respond("POST", "/images/create", messages=[{"status": "Pulling from library/centos",
+                                                                 "id": "7"},
+                                                                {"status": "Downloaded newer image for centos:7"}])
+
+        output, _, rc = DockerApi.pull("centos:7")
+
+        self.assertEqual(rc, 0)
+        self.assertEqual(output, "7: Pulling from library/centos\nDownloaded newer image for centos:7")
+        request = self.daemon.requests_to("POST", "/images/create")[0]
+        self.assertEqual(request["query"]["fromImage"], ["centos"])
+        self.assertEqual(request["query"]["tag"], ["7"])
+
+    def test_manifest_inspect(self):
+        self.daemon.respond("GET", "/distribution/a:1/json",
+                            body={"Descriptor": {"digest": "sha256:1234"}, "Platforms": []})
+
+        output, _, rc = DockerApi.manifest_inspect("a:1", verbose=True)
+
+        self.assertEqual(rc, 0)
+        self.assertEqual(json.loads(output)["Descriptor"]["digest"], "sha256:1234")
+
+    def test_factory_uses_api_if_socket_answers(self):
+        with patch("dockermake.constants.Constants.DOCKER_HOST", "unix://" + self.daemon.socket_path):
+            self.assertEqual(DockerCliFactory.create(backend="auto"), DockerApi)
+            self.assertEqual(DockerCliFactory.create(backend="api"), DockerApi)
+
+    def test_factory_falls_back_to_cli(self):
+        with patch("dockermake.constants.Constants.DOCKER_HOST", "unix:///not/existing.sock"):
+            self.assertEqual(DockerCliFactory.create(docker_version="19.03.5", backend="auto"), DockerCli112)
+            with self.assertRaises(Exception):
+                DockerCliFactory.create(backend="api")
+        with patch("dockermake.constants.Constants.DOCKER_HOST", "tcp://127.0.0.1:2375"):
+            self.assertEqual(DockerCliFactory.create(docker_version="19.03.5", backend="auto"), DockerCli112)
+
+    def test_factory_uses_cli_by_default(self):
+        with patch("dockermake.constants.Constants.DOCKER_HOST", "unix://" + self.daemon.socket_path):
+            self.assertEqual(DockerCliFactory.create(docker_version="19.03.5"), DockerCli112)
+        self.assertEqual(self.daemon.requests, [])
+
+    def test_factory_uses_cli_if_requested(self):
+        with patch("dockermake.constants.Constants.DOCKER_HOST", "unix://" + self.daemon.socket_path):
+            self.assertEqual(DockerCliFactory.create(docker_version="19.03.5", backend="cli"), DockerCli112)
+            with patch("dockermake.docker.docker_cli_factory.get_docker_version") as get_docker_version:
+                self.assertEqual(DockerCliFactory.create(backend="cli", dry_run=True), DockerCli112)
+            get_docker_version.assert_not_called()
+        self.assertEqual(self.daemon.requests, [])
+
+    @staticmethod
+    def write(directory, name, content):
+        path = os.path.join(directory, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as file:
+            file.write(content)
+
+    @staticmethod
+    def tar_names(body):
+        with tarfile.open(fileobj=io.BytesIO(body)) as tar:
+            return sorted(tar.getnames())
@@ -30,6 +30,20 @@ class DockerCli112Test(unittest.TestCase):
                                         ["--tag", "3"],
                                         "--quiet")
 
+    def test_build_command_with_cache(self):
+        self.command = DockerCli112.BuildCommand(".", cache_from=["app:1", "type=local,src=/cache"])
+
+        self.typical_command_assertions("build", ".", ["--cache-from", "app:1"],
+                                        ["--cache-from", "type=local,src=/cache"])
+        self.assertNotIn("--load", self.command)
+
+    def test_build_command_exporting_cache_uses_buildx(self):
+        self.command = DockerCli112.BuildCommand(".", cache_to=["type=registry,ref=app:cache,mode=max"])
+
+        self.typical_command_assertions("buildx", "build", ".",
+                                        ["--cache-to", "type=registry,ref=app:cache,mode=max"], "--load")
+        self.assertEqual(self.command[2], "build")
+
     def test_inspect_command(self):
         self.command = DockerCli112.InspectCommand("centos:7")
 
@@ -59,6 +73,11 @@ class DockerCli112Test(unittest.TestCase):
 
         self.typical_command_assertions("login", "registry.com", ["--username", "foo"], ["--password-stdin"])
 
+    def test_manifest_inspect_command(self):
+        self.command = DockerCli112.ManifestInspectCommand("my-image:latest", verbose=True, insecure=True)
+
+        self.typical_command_assertions("manifest", ["inspect", "--verbose", "--insecure", "my-image:latest"])
+
     def test_pull_command(self):
         self.command = DockerCli112.PullCommand("centos:7")
 
@@ -0,0 +1,75 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from mock import patch
+
+from dockermake.docker import get_docker_version
+
+
+class DockerVersionTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache_file = os.path.join(self.directory, "docker-version.json")
+        self.patches = [patch("dockermake.constants.Constants.DOCKER_VERSION_CACHE_FILE", self.cache_file),
+                        patch("dockermake.constants.Constants.DOCKER_HOST", "unix:///var/run/docker.sock"),
+                        patch("dockermake.constants.Constants.DOCKER_CONFIG", self.directory),
+                        patch.dict(os.environ, clear=False)]
+        for constant_patch in self.patches:
+            constant_patch.start()
+        os.environ.pop("DOCKER_CONTEXT", None)
+
+    def tearDown(self):
+        for constant_patch in self.patches:
+            constant_patch.stop()
+        shutil.rmtree(self.directory)
+
+    @patch("dockermake.utils.helpers.System.run_command", return_value=("19.03.5-ce", "", 0))
+    def test_version_is_cached_per_docker_host(self, run_command):
+        self.assertEqual(get_docker_version(), ("19.03.5", "ce"))
+        self.assertEqual(get_docker_version(), ("19.03.5", "ce"))
+        self.assertEqual(run_command.call_count, 1)
+
+        with patch("dockermake.constants.Constants.DOCKER_HOST", "tcp://remote:2375"):
+            self.assertEqual(get_docker_version(), ("19.03.5", "ce"))
+        self.assertEqual(run_command.call_count, 2)
+
+        with open(self.cache_file) as cache_file:
+            self.assertEqual(sorted(json.load(cache_file)), ["tcp://remote:2375", "unix:///var/run/docker.sock"])
+
+    @patch("dockermake.utils.helpers.System.run_command", return_value=("19.03.5-ce", "", 0))
+    def test_version_is_cached_per_docker_context(self, run_command):
+        self.assertEqual(get_docker_version(), ("19.03.5", "ce"))
+
+        with open(os.path.join(self.directory, "config.json"), "w") as config_file:
+            json.dump({"currentContext": "remote"}, config_file)
+        self.assertEqual(get_docker_version(), ("19.03.5", "ce"))
+        self.assertEqual(run_command.call_count, 2)
+
+        with patch.dict(os.environ, {"DOCKER_CONTEXT": "other"}):
+            self.assertEqual(get_docker_version(), ("19.03.5", "ce"))
+        self.assertEqual(get_docker_version(), ("19.03.5", "ce"))
+        self.assertEqual(run_command.call_count, 3)
+
+        with open(self.cache_file) as cache_file:
+            self.assertEqual(sorted(json.load(cache_file)), ["unix:///var/run/docker.sock",
+                                                             "unix:///var/run/docker.sock (context: other)",
+                                                             "unix:///var/run/docker.sock (context: remote)"])
+
+    @patch("dockermake.utils.helpers.System.run_command", return_value=("20.10.7", "", 0))
+    def test_expired_version_is_probed_again(self, run_command):
+        with open(self.cache_file, "w") as cache_file:
+            json.dump({"unix:///var/run/docker.sock": dict(version="19.03.5", suffix=None,
+                                                           time=time.time() - 2 * 24 * 60 * 60)}, cache_file)
+
+        self.assertEqual(get_docker_version(), ("20.10.7", None))
+        self.assertEqual(run_command.call_count, 1)
+
+    @patch("dockermake.utils.helpers.System.run_command", return_value=("", "Cannot connect", 1))
+    def test_failed_probe_is_not_cached(self, _):
+        with self.assertRaises(Exception):
+            get_docker_version()
+        self.assertFalse(os.path.exists(self.cache_file))
@@ -0,0 +1,97 @@
+from http.server import BaseHTTPRequestHandler
+import json
+import os
+import shutil
+import socketserver
+import tempfile
+import threading
+import urllib.parse
+
+
+class FakeDockerDaemon:
+    """
+    Serves HTTP/1.1 on a unix socket and answers requests with the responses registered per method and path.
+    Every request is recorded along with its decoded query and body.
+    """
+
+    def __init__(self):
+        self.directory = tempfile.mkdtemp()
+        self.socket_path = os.path.join(self.directory, "docker.sock")
+        self.responses = dict()
+        self.requests = list()
+        self.connections = 0
+        self.lock = threading.Lock()
+        self.server = None
+        self.thread = None
+
+    def respond(self, method, path, status=200, body=None, messages=None):
+        """answers with the JSON body or with a stream of JSON messages"""
+        if messages is not None:
+            payload = "".join(json.dumps(message) + "\r\n" for message in messages)
+        else:
+            payload = json.dumps(body if body is not None else dict())
+        self.responses[(method, path)] = (status, payload.encode("UTF-8"))
+
+    def requests_to(self, method, path):
+        return [request for request in self.requests if request["method"] == method and request["path"] == path]
+
+    def start(self):
+        daemon = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super(Handler, self).setup()
+                with daemon.lock:
+                    daemon.connections += 1
+
+            def do_GET(self):
+                self._answer()
+
+            def do_POST(self):
+                self._answer()
+
+            def do_DELETE(self):
+                self._answer()
+
+            def log_message(self, *_):
+                pass
+
+            def _answer(self):
+                url = urllib.parse.urlsplit(self.path)
+                body = self._read_body()
+                with daemon.lock:
+                    daemon.requests.append(dict(method=self.command, path=url.path,
+                                                query=urllib.parse.parse_qs(url.query), headers=dict(self.headers),
+                                                body=body))
+                status, payload = daemon.responses.get((self.command, url.path),
+                                                       (404, b'{"message": "page not found"}'))
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _read_body(self):
+                if self.headers.get("Transfer-Encoding") == "chunked":
+                    body = b""
+                    while True:
+                        size = int(self.rfile.readline().strip(), 16)
+                        chunk = self.rfile.read(size)
+                        self.rfile.readline()
+                        if not size:
+                            return body
+                        body += chunk
+                return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        self.server = socketserver.ThreadingUnixStreamServer(self.socket_path, Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.directory)
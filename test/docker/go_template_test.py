@@ -0,0 +1,32 @@
+import unittest
+
+from dockermake.docker.go_template import GoTemplate
+
+
+class GoTemplateTest(unittest.TestCase):
+    DATA = {"Id": "sha256:1234", "Size": 42, "Config": {"Labels": {"b": "2", "a": "1"}, "Env": ["A=1", "B=2"],
+                                                         "Healthcheck": None, "ArgsEscaped": True}}
+
+    def test_field(self):
+        self.assertEqual(GoTemplate.render("{{.Id}}", self.DATA), "sha256:1234")
+        self.assertEqual(GoTemplate.render("{{ .Size }}", self.DATA), "42")
+        self.assertEqual(GoTemplate.render("id={{.Id}} size={{.Size}}", self.DATA), "id=sha256:1234 size=42")
+
+    def test_nested_fields_formatted_like_go(self):
+        self.assertEqual(GoTemplate.render("{{.Config.Labels}}", self.DATA), "map[a:1 b:2]")
+        self.assertEqual(GoTemplate.render("{{.Config.Env}}", self.DATA), "[A=1 B=2]")
+        self.assertEqual(GoTemplate.render("{{.Config.ArgsEscaped}}", self.DATA), "true")
+
+    def test_missing_fields(self):
+        self.assertEqual(GoTemplate.render("{{.Config.Healthcheck}}", self.DATA), "<no value>")
+        self.assertEqual(GoTemplate.render("{{.Missing.Field}}", self.DATA), "<no value>")
+        self.assertEqual(GoTemplate.render("{{json .Missing}}", self.DATA), "null")
+
+    def test_json(self):
+        self.assertEqual(GoTemplate.render("{{json .Config.Env}}", self.DATA), '["A=1","B=2"]')
+        self.assertEqual(GoTemplate.render("{{ json . }}", {"a": 1}), '{"a":1}')
+
+    def test_unsupported_expression(self):
+        with self.assertRaises(Exception) as context:
+            GoTemplate.render("{{ index .Config.Env 0 }}", self.DATA)
+        self.assertEqual(str(context.exception), "Unsupported format expression: {{ index .Config.Env 0 }}")
@@ -0,0 +1,70 @@
+import json
+import unittest
+
+from mock import MagicMock
+
+from dockermake.docker.image_inspector import ImageInspector
+
+
+class ImageInspectorTest(unittest.TestCase):
+    IMAGES = {"centos:7": {"Id": "sha256:centos"}, "alpine": {"Id": "sha256:alpine"},
+              "alpine:latest": {"Id": "sha256:alpine"}}
+
+    def setUp(self):
+        self.docker_cli = MagicMock()
+        self.docker_cli.inspect.side_effect = self.inspect
+        self.inspector = ImageInspector(self.docker_cli)
+
+    def inspect(self, images, **_):
+        found = [json.dumps(self.IMAGES[image]) for image in images if image in self.IMAGES]
+        missing = ["Error: No such image: %s" % image for image in images if image not in self.IMAGES]
+        return "\n".join(found), "\n".join(missing), 1 if missing else 0
+
+    def test_inspects_all_images_at_once(self):
+        results = self.inspector.inspect(["centos:7", "unknown:1", "alpine"])
+
+        self.assertEqual(results, {"centos:7": {"Id": "sha256:centos"}, "unknown:1": None,
+                                   "alpine": {"Id": "sha256:alpine"}})
+        self.docker_cli.inspect.assert_called_once()
+        self.assertEqual(self.docker_cli.inspect.call_args[0][0], ["centos:7", "unknown:1", "alpine"])
+
+    def test_caches_images(self):
+        for _ in range(12):
+            self.assertEqual(self.inspector.get("centos:7"), {"Id": "sha256:centos"})
+        self.inspector.inspect(["centos:7", "alpine:latest"])
+
+        self.assertEqual(self.docker_cli.inspect.call_count, 2)
+        self.assertEqual(self.docker_cli.inspect.call_args[0][0], ["alpine:latest"])
+        self.assertEqual(self.inspector.images, {"sha256:centos": {"Id": "sha256:centos"},
+                                                 "sha256:alpine": {"Id": "sha256:alpine"}})
+
+    def test_does_not_cache_missing_images(self):
+        self.assertIsNone(self.inspector.get("unknown:1"))
+        self.IMAGES["unknown:1"] = {"Id": "sha256:pulled"}
+        self.addCleanup(self.IMAGES.pop, "unknown:1")
+
+        self.assertEqual(self.inspector.get("unknown:1"), {"Id": "sha256:pulled"})
+
+    def test_forget(self):
+        self.inspector.get("centos:7")
+        self.inspector.forget(["centos:7"])
+        self.inspector.get("centos:7")
+
+        self.assertEqual(self.docker_cli.inspect.call_count, 2)
+
+    def test_falls_back_to_inspect_images_one_by_one(self):
+        self.docker_cli.inspect.side_effect = lambda images, **_: (
+            "\n".join(json.dumps(self.IMAGES[image]) for image in images if image in self.IMAGES),
+            "unexpected error", 1)
+
+        results = self.inspector.inspect(["centos:7", "unknown:1"])
+
+        self.assertEqual(results, {"centos:7": {"Id": "sha256:centos"}, "unknown:1": None})
+        self.assertEqual(self.docker_cli.inspect.call_count, 3)
+
+    def test_dry_run(self):
+        self.docker_cli.inspect.side_effect = None
+        self.docker_cli.inspect.return_value = ("", "", 0)
+
+        self.assertEqual(self.inspector.inspect(["centos:7"]), {"centos:7": {}})
+        self.assertEqual(self.inspector.references, {})
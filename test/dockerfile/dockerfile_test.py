@@ -81,3 +81,63 @@ class DockerfileTest(unittest.TestCase):
         self.assertEqual(instructions[4].arguments, ['apk install some packages_${GIT_HASH}'])
         self.assertEqual(instructions[5].ports, ['42'])
         self.assertEqual(instructions[6].arguments, ['/usr/bin/some-server'])
+
+    def test_index_by_stage_and_type(self):
+        context = """
+        ARG VERSION
+        FROM golang AS build
+        RUN make
+        RUN make install
+        FROM alpine
+        COPY --from=build /app /app
+        CMD ["/app"]
+        ENTRYPOINT ["/app"]
+        CMD ["/app", "--help"]
+        """
+
+        df = Dockerfile._parse(context)
+        self.assertEqual(df.stages, [-1, "build", 1])
+        self.assertEqual(df.get_instruction_count(), 9)
+        self.assertEqual(df.get_instruction_count(stage=-1), 1)
+        self.assertEqual([i.argument for i in df.get_instructions(stage="build")],
+                         ["golang AS build", "make", "make install"])
+        self.assertEqual([i.argument for i in df.get_instructions_of_type(Keywords.RUN)], ["make", "make install"])
+        self.assertEqual(df.get_instructions_of_type(Keywords.RUN, stage=1), [])
+        self.assertEqual(df.get_first_instruction_of_type(Keywords.FROM, stage=1).argument, "alpine")
+        self.assertIsNone(df.get_first_instruction_of_type(Keywords.USER))
+        self.assertEqual(df.get_last_index_of(Keywords.CMD, stage=1), 8)
+        self.assertEqual(df.get_last_index_of(Keywords.ENTRYPOINT), 7)
+        self.assertEqual(df.get_last_index_of(Keywords.RUN, stage=1), -1)
+
+    def test_index_lists_are_shared(self):
+        df = Dockerfile._parse("FROM alpine\nRUN a\nRUN b\n")
+
+        self.assertIs(df.get_instructions_of_type(Keywords.RUN), df.get_instructions_of_type(Keywords.RUN))
+        self.assertIs(df.get_instructions(), df.get_instructions())
+
+    def test_stage_dependencies(self):
+        df = Dockerfile._parse("FROM golang AS builder\nRUN make\nFROM builder AS tested\nRUN make test\n"
+                               "FROM alpine AS runtime\nCOPY --from=builder /app /\n"
+                               "FROM runtime AS debug\nCOPY --from=0 /src /src\n"
+                               "FROM scratch\nCOPY --from=tested /a /\n")
+
+        self.assertEqual(df.get_stage_dependencies(), {"builder": [], "tested": ["builder"], "runtime": ["builder"],
+                                                       "debug": ["runtime", "builder"], 4: ["tested"]})
+        self.assertEqual(df.get_required_stages("debug"), ["builder", "runtime", "debug"])
+        self.assertEqual(df.get_required_stages(), ["builder", "tested", 4])
+        with self.assertRaises(Exception):
+            df.get_required_stages("release")
+
+    def test_stage_dependencies_by_number_with_arg_before_first_stage(self):
+        df = Dockerfile._parse("ARG BASE=alpine\nFROM $BASE AS builder\nRUN make\n"
+                               "FROM alpine\nCOPY --from=0 /app /\n")
+
+        self.assertEqual(df.stages, [-1, "builder", 1])
+        self.assertEqual(df.get_stage_dependencies(), {-1: [], "builder": [], 1: ["builder"]})
+        self.assertEqual(df.get_required_stages(), ["builder", 1])
+
+    def test_stage_dependencies_ignore_images_and_later_stages(self):
+        df = Dockerfile._parse("FROM runtime AS builder\nCOPY --from=nginx:1 /etc/nginx /etc/nginx\n"
+                               "FROM alpine AS runtime\n")
+
+        self.assertEqual(df.get_stage_dependencies(), {"builder": [], "runtime": []})
@@ -1,5 +1,11 @@
+import time
+
+from mock import patch
+
 from dockermake.dockerfile.instructions.instruction_base import InstructionBase
+from dockermake.dockerfile.instructions import run
 from test.dockerfile.instructions import InstructionTest
+from test.instructions import *
 
 
 class InstructionBaseTest(InstructionTest):
@@ -30,3 +36,43 @@ class InstructionBaseTest(InstructionTest):
         result = path.parseString("/")
 
         self.assertEqual(result.get("path"), "/")
+
+    def test_grammar_is_built_once_per_class(self):
+        InstructionBase.clear_grammar_cache()
+        with patch.object(run.Run, "build_grammar", wraps=run.Run.build_grammar, autospec=True) as build_grammar:
+            instructions = [Run("echo %d" % i) for i in range(100)]
+
+        self.assertEqual(build_grammar.call_count, 1)
+        self.assertEqual(instructions[99].arguments, ["echo 99"])
+        self.assertIs(instructions[0].grammar, instructions[99].grammar)
+
+    def test_onbuild_grammar_is_cached_per_triggered_instruction(self):
+        run = OnBuild("RUN echo")
+        copy = OnBuild("COPY a b")
+
+        self.assertIs(OnBuild("RUN echo again").grammar, run.grammar)
+        self.assertIsNot(copy.grammar, run.grammar)
+        self.assertEqual(copy.dest, "b")
+        self.assertFalse(hasattr(OnBuild("RUN echo again"), "dest"))
+
+    def test_construction_benchmark(self):
+        """guards against rebuilding the grammars for every instruction"""
+        def construct(i):
+            From("registry.acme.com/group/image:1.%d AS build" % i)
+            Env("VERSION=1.%d" % i)
+            Healthcheck("--interval=5s CMD curl http://localhost:%d" % i)
+            Run("apt-get install -y package%d" % i)
+
+        InstructionBase.clear_grammar_cache()
+        start = time.perf_counter()
+        for i in range(50):
+            InstructionBase.clear_grammar_cache()
+            construct(i)
+        uncached = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for i in range(50):
+            construct(i)
+        cached = time.perf_counter() - start
+
+        self.assertGreater(uncached / cached, 1.5, "cached: %.3f s, uncached: %.3f s" % (cached, uncached))
@@ -0,0 +1,26 @@
+import importlib
+from inspect import isabstract, isclass
+import pkgutil
+import unittest
+
+from dockermake.dockerfile import instructions
+from dockermake.dockerfile.instructions import INSTRUCTIONS, Keywords, MODULE_PREFIX
+from dockermake.dockerfile.instructions.instruction_base import InstructionBase
+
+
+class RegistryTest(unittest.TestCase):
+    def test_registry_contains_all_instructions_of_the_package(self):
+        found = list()
+        for _, module_name, _ in pkgutil.iter_modules(instructions.__path__):
+            module = importlib.import_module(MODULE_PREFIX + module_name)
+            for name, value in vars(module).items():
+                if isclass(value) and issubclass(value, InstructionBase) and not isabstract(value) \
+                        and value.__module__ == module.__name__:
+                    found.append((module_name, name))
+
+        self.assertEqual(sorted(found), sorted(INSTRUCTIONS))
+
+    def test_keywords(self):
+        self.assertEqual(len(Keywords.list), len(INSTRUCTIONS))
+        self.assertEqual(Keywords.mapping["ONBUILD"].__name__, "OnBuild")
+        self.assertEqual(Keywords.reverse_mapping[Keywords.STOPSIGNAL], "STOPSIGNAL")
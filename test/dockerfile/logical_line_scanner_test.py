@@ -0,0 +1,116 @@
+import os
+import time
+import unittest
+
+from dockermake.dockerfile.logical_line_extractor import LogicalLineExtractor
+from dockermake.dockerfile.logical_line_scanner import LogicalLineScanner
+from test.helpers import get_mock_dir
+
+
+DIFFERENTIAL_CORPUS = [
+    "FROM alpine\n",
+    "FROM alpine",
+    "\n\n  FROM alpine  \n\n",
+    "# comment\nFROM alpine # trailing comment\n",
+    "FROM alpine\r\nRUN echo\r\n",
+    "RUN echo \\\n  hello \\\n  world\n",
+    "RUN echo \\\n\n  # comment \\\n  # comment\n  hello\n",
+    "RUN echo \\  \n  hello\n",
+    "RUN echo \\ # comment after continuation\n  hello\n",
+    "RUN echo \\# not a comment\n",
+    "RUN echo \\\\\nRUN echo\n",
+    "RUN a\\ bug and \\escapes\n",
+    "RUN echo 'single # quoted' # comment\n",
+    "RUN echo \"double # quoted\" # comment\n",
+    "RUN echo \"escaped \\\" quote # inside\" after\n",
+    "RUN echo 'unterminated # quote\n",
+    "RUN echo it's # a comment\n",
+    "RUN x\"y # z\"\n",
+    "RUN echo\t\ttabs\tinside # and\tcomment\n",
+    "\tRUN echo \\\n\tindented with tabs\n",
+    "RUN sed -i 's##' somescript.sh \\\n && echo\n",
+    "RUN \"echo \\\n hello\"\n",
+    "LABEL a=b \\\n      c=d \\\n      e=\"f g\"\n",
+    "COPY --from=build /a /b\nENTRYPOINT [\"/bin/sh\", \"-c\", \"echo $HOME\"]\n",
+    "ONBUILD RUN echo \\\n  onbuild\n",
+    "  # indented comment\n  RUN echo\n",
+    "RUN echo #\n#\nRUN echo\n",
+]
+
+
+class LogicalLineScannerTest(unittest.TestCase):
+    def assert_same_as_pyparsing(self, context):
+        expected = LogicalLineExtractor.parse_dockerfile(context, backend=LogicalLineExtractor.PYPARSING_BACKEND)
+        actual = LogicalLineExtractor.parse_dockerfile(context, backend=LogicalLineExtractor.SCANNER_BACKEND)
+        self.assertEqual(actual, expected, "differs for %r" % context)
+
+    def test_differential_corpus(self):
+        for context in DIFFERENTIAL_CORPUS:
+            with self.subTest(context=context):
+                self.assert_same_as_pyparsing(context)
+
+    def test_differential_mock_dockerfiles(self):
+        for name in sorted(os.listdir(get_mock_dir())):
+            if not name.startswith("Dockerfile"):
+                continue
+            with open(os.path.join(get_mock_dir(), name), "r", encoding="UTF-8") as dockerfile:
+                context = dockerfile.read()
+            with self.subTest(dockerfile=name):
+                self.assert_same_as_pyparsing(context)
+
+    def test_differential_generated_dockerfile(self):
+        self.assert_same_as_pyparsing(generate_dockerfile(stages=5))
+
+    def test_lenient_on_non_ascii_and_trailing_continuation(self):
+        self.assertEqual(LogicalLineScanner.parse_dockerfile("LABEL maintainer=jürgen\n"),
+                         [("LABEL maintainer=jürgen", 1)])
+        self.assertEqual(LogicalLineScanner.parse_dockerfile("RUN echo \\\n  hello \\\n"),
+                         [("RUN echo hello", 1)])
+
+    def test_unknown_backend(self):
+        with self.assertRaisesRegex(Exception, "Unknown parser backend: other"):
+            LogicalLineExtractor.parse_dockerfile("FROM alpine\n", backend="other")
+
+    def test_default_backend_is_used(self):
+        default = LogicalLineExtractor.backend
+        self.addCleanup(setattr, LogicalLineExtractor, "backend", default)
+
+        LogicalLineExtractor.backend = LogicalLineExtractor.SCANNER_BACKEND
+        self.assertEqual(LogicalLineExtractor.parse_dockerfile("FROM ubuntu:18.04 # jürgen\n"),
+                         [("FROM ubuntu:18.04", 1)])
+
+    def test_scanner_is_faster_than_pyparsing(self):
+        context = generate_dockerfile(stages=15)
+
+        durations = dict()
+        for backend in LogicalLineExtractor.BACKENDS:
+            start = time.perf_counter()
+            LogicalLineExtractor.parse_dockerfile(context, backend=backend)
+            durations[backend] = time.perf_counter() - start
+
+        speedup = durations[LogicalLineExtractor.PYPARSING_BACKEND] / durations[LogicalLineExtractor.SCANNER_BACKEND]
+        self.assertGreater(speedup, 5, "scanner is only %.1f times faster: %s" % (speedup, durations))
+
+
+def generate_dockerfile(stages):
+    lines = list()
+    for stage in range(stages):
+        lines.extend([
+            "# stage %d" % stage,
+            "FROM golang:1.12 AS build%d" % stage,
+            "ARG VERSION=1.0.%d" % stage,
+            "LABEL maintainer=\"acme <ci@acme.com>\" \\",
+            "      version=$VERSION # the version",
+            "",
+            "RUN apt-get update \\",
+            "  # install the dependencies",
+            "  && apt-get install -y \\",
+            "     curl \\",
+            "     git \\",
+            "  && rm -rf /var/lib/apt/lists/*",
+            "COPY --from=build%d /go/bin/app /app" % max(stage - 1, 0),
+            "RUN echo 'a # quoted hash' \\# escaped \\\\",
+            "ENTRYPOINT [\"/app\", \"--verbose\"]",
+            "",
+        ])
+    return "\n".join(lines) + "\n"
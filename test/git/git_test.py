@@ -1,7 +1,12 @@
+import os
+import shutil
+import tempfile
 import unittest
 import subprocess
 
-from dockermake.git.git import get_gitsha1_hash_of_head
+from mock import patch
+
+from dockermake.git.git import get_changed_files, get_gitsha1_hash_of_head, GitMetadata
 
 
 class GitTest(unittest.TestCase):
@@ -12,3 +17,147 @@ class GitTest(unittest.TestCase):
         sha1Hash = get_gitsha1_hash_of_head()
 
         self.assertEqual(output.strip(), sha1Hash)
+
+
+class GitMetadataTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.repository = os.path.join(self.directory, "repository")
+        os.mkdir(self.repository)
+        self.git("init", "-q")
+        self.git("config", "user.email", "test@acme.com")
+        self.git("config", "user.name", "test")
+        self.git("remote", "add", "origin", "https://github.com/fi-ts/docker-make.git")
+        self.commit("first")
+
+    def git(self, *args, cwd=None):
+        return subprocess.check_output(["git"] + list(args), cwd=cwd or self.repository, encoding="UTF-8").strip()
+
+    def commit(self, message):
+        self.git("commit", "-q", "--allow-empty", "-m", message)
+
+    def metadata(self, directory=None):
+        return GitMetadata(directory or self.repository)
+
+    def assert_no_fork(self):
+        patcher = patch("dockermake.utils.helpers.System.run_command", side_effect=AssertionError("git was forked"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_resolves_loose_ref(self):
+        expected = self.git("rev-parse", "--short=8", "HEAD")
+        self.assert_no_fork()
+
+        self.assertEqual(self.metadata().get_gitsha1_hash_of_head(), expected)
+
+    def test_resolves_packed_ref(self):
+        self.git("pack-refs", "--all")
+        expected = self.git("rev-parse", "--short=8", "HEAD")
+        self.assert_no_fork()
+
+        self.assertEqual(self.metadata().get_gitsha1_hash_of_head(), expected)
+
+    def test_resolves_detached_head(self):
+        self.commit("second")
+        self.git("checkout", "-q", "HEAD~1")
+        expected = self.git("rev-parse", "--short=8", "HEAD")
+        self.assert_no_fork()
+
+        self.assertEqual(self.metadata().get_gitsha1_hash_of_head(), expected)
+
+    def test_resolves_from_sub_directory(self):
+        sub_directory = os.path.join(self.repository, "a", "b")
+        os.makedirs(sub_directory)
+        expected = self.git("rev-parse", "--short=8", "HEAD")
+        self.assert_no_fork()
+
+        self.assertEqual(self.metadata(sub_directory).get_gitsha1_hash_of_head(), expected)
+
+    def test_resolves_worktree(self):
+        worktree = os.path.join(self.directory, "worktree")
+        self.git("worktree", "add", "-q", "-b", "other", worktree)
+        self.commit("second")
+        self.git("commit", "-q", "--allow-empty", "-m", "third", cwd=worktree)
+        expected = self.git("rev-parse", "--short=8", "HEAD", cwd=worktree)
+        self.assert_no_fork()
+
+        metadata = self.metadata(worktree)
+        self.assertEqual(metadata.get_gitsha1_hash_of_head(), expected)
+        self.assertEqual(metadata.get_git_remote_origin_url(), "https://github.com/fi-ts/docker-make.git")
+
+    def test_resolves_remote_url_and_repository(self):
+        self.assert_no_fork()
+
+        metadata = self.metadata()
+        self.assertEqual(metadata.get_git_remote_origin_url(), "https://github.com/fi-ts/docker-make.git")
+        self.assertEqual(metadata.get_git_repository(), "github.com/fi-ts")
+
+    def test_no_remote_url(self):
+        self.git("remote", "remove", "origin")
+        self.assert_no_fork()
+
+        self.assertEqual(self.metadata().get_git_remote_origin_url(), "")
+
+    def test_outside_of_repository(self):
+        outside = os.path.join(self.directory, "outside")
+        os.mkdir(outside)
+        self.assert_no_fork()
+
+        self.assertEqual(self.metadata(outside).get_gitsha1_hash_of_head(), "")
+
+    def test_falls_back_to_git_for_includes(self):
+        self.git("config", "include.path", "other.config")
+        with patch("dockermake.utils.helpers.System.run_command", return_value=("url", "", 0)) as mock:
+            self.assertEqual(self.metadata().get_git_remote_origin_url(), "url")
+        mock.assert_called_once()
+
+    def test_falls_back_to_git_for_unborn_branch(self):
+        self.git("checkout", "-q", "--orphan", "unborn")
+        with patch("dockermake.utils.helpers.System.run_command", return_value=("HEAD", "", 128)) as mock:
+            self.metadata().get_gitsha1_hash_of_head()
+        mock.assert_called_once()
+
+    def test_cache_is_only_invalidated_if_head_changed(self):
+        metadata = self.metadata()
+        first = metadata.get_gitsha1_hash_of_head()
+
+        metadata.refresh_if_head_changed()
+        with patch("dockermake.git.git.GitMetadata._resolve_gitsha1_hash_of_head") as mock:
+            self.assertEqual(metadata.get_gitsha1_hash_of_head(), first)
+        mock.assert_not_called()
+
+        self.commit("second")
+        metadata.refresh_if_head_changed()
+        self.assertEqual(metadata.get_gitsha1_hash_of_head(), self.git("rev-parse", "--short=8", "HEAD"))
+
+
+class ChangedFilesTest(unittest.TestCase):
+    def setUp(self):
+        self.repository = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.repository)
+        self.git("init", "-q")
+        self.git("config", "user.email", "test@acme.com")
+        self.git("config", "user.name", "test")
+        for path in ["a/Dockerfile", "b/Dockerfile", "b/c/Dockerfile"]:
+            self.write(path)
+        self.git("add", ".")
+        self.git("commit", "-q", "-m", "first")
+
+    def git(self, *args):
+        return subprocess.check_output(["git"] + list(args), cwd=self.repository, encoding="UTF-8").strip()
+
+    def write(self, path, content="FROM scratch\n"):
+        path = os.path.join(self.repository, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="UTF-8") as changed_file:
+            changed_file.write(content)
+
+    def test_changed_files_since_ref(self):
+        self.write("a/Dockerfile", "FROM alpine\n")
+        self.git("commit", "-q", "-am", "second")
+        self.write("b/c/Dockerfile", "FROM debian\n")
+        self.write("b/new.txt")
+
+        self.assertEqual(["a/Dockerfile", "b/c/Dockerfile", "b/new.txt"], get_changed_files("HEAD~1", self.repository))
+        self.assertEqual(["c/Dockerfile", "new.txt"], get_changed_files("HEAD", os.path.join(self.repository, "b")))
@@ -0,0 +1,68 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from dockermake.lint.batch_lint import BatchLint
+from dockermake.lint.linting_exception import LintingException
+
+from test.helpers import captured_output
+from test.helpers import mock_registries
+
+VALID_DOCKERFILE = "FROM registry.a.com/acme/alpine:3.12\nLABEL maintainer=\"Team <team@example.com>\"\nUSER nobody\n"
+INVALID_DOCKERFILE = "FROM alpine:3.12\nMAINTAINER team\n"
+
+
+class BatchLintTest(unittest.TestCase):
+    def setUp(self):
+        mock_registries()
+        self.work_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.work_dir)
+
+    def write(self, path, content=VALID_DOCKERFILE):
+        path = os.path.join(self.work_dir, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="UTF-8") as dockerfile:
+            dockerfile.write(content)
+        return path
+
+    def test_find_dockerfiles(self):
+        first = self.write("services/a/Dockerfile")
+        second = self.write("services/b/Dockerfile")
+        nested = self.write("tools/c/d/Dockerfile.build")
+        self.write("docs/README.md", "")
+
+        self.assertEqual([first, second], BatchLint.find_dockerfiles(self.work_dir, ["services/*"], "Dockerfile"))
+        self.assertEqual([nested, first], BatchLint.find_dockerfiles(
+            self.work_dir, ["**/Dockerfile.build", "services/a/Dockerfile", "services/a"], "Dockerfile"))
+
+    def test_find_dockerfiles_without_match(self):
+        with self.assertRaises(Exception) as context:
+            BatchLint.find_dockerfiles(self.work_dir, ["services/*"], "Dockerfile")
+        self.assertIn("No Dockerfile found at services/*", str(context.exception))
+
+    def test_lint(self):
+        paths = [self.write("a/Dockerfile"), self.write("b/Dockerfile")]
+
+        with captured_output() as (out, _):
+            BatchLint(jobs=1).lint(paths)
+        output = out.getvalue()
+
+        self.assertIn("Step 0 : Linting \"%s\"" % paths[0], output)
+        self.assertIn("Step 0 : Linting \"%s\"" % paths[1], output)
+        self.assertIn("Linted 2 Dockerfiles: 0 failed", output)
+
+    def test_lint_in_processes_reports_failures_in_order(self):
+        paths = [self.write("%d/Dockerfile" % index, INVALID_DOCKERFILE if index % 2 else VALID_DOCKERFILE)
+                 for index in range(6)]
+        paths.append(self.write("broken/Dockerfile", "FROM\n"))
+
+        with captured_output() as (out, _):
+            with self.assertRaises(LintingException) as context:
+                BatchLint(jobs=3).lint(paths)
+        output = out.getvalue()
+
+        self.assertEqual("Linting failed for 4 of 7 Dockerfiles", str(context.exception))
+        steps = [line for line in output.splitlines() if line.startswith("Step 0")]
+        self.assertEqual(["Step 0 : Linting \"%s\"" % path for path in paths], steps)
+        self.assertEqual(4, output.count("---> FAILED"))
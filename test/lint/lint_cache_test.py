@@ -0,0 +1,111 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from mock import patch
+
+from dockermake.dockerfile.dockerfile import Dockerfile
+from dockermake.lint.lint_cache import LintCache
+from dockermake.lint.linter import DockerfileLint
+from dockermake.lint.linting_exception import LintingException
+
+from test.helpers import captured_output
+from test.helpers import get_mock_dir
+
+
+class LintCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def entries(self, cache):
+        return sorted(name for name in os.listdir(cache.directory) if name.endswith(".json"))
+
+    def test_put_and_get(self):
+        cache = LintCache(directory=self.directory)
+        key = LintCache.key("FROM alpine", ["rule1"], [], "1.0", [False, []])
+
+        self.assertIsNone(cache.get(key))
+        cache.put(key, ["an error"], ["a warning"])
+
+        self.assertEqual(cache.get(key), (["an error"], ["a warning"]))
+
+    def test_key_depends_on_all_inputs(self):
+        base = ("FROM alpine", ["rule1", "rule2"], ["rule3"], "1.0", [False, []])
+        variations = [
+            ("FROM centos", ["rule1", "rule2"], ["rule3"], "1.0", [False, []]),
+            ("FROM alpine", ["rule1"], ["rule3"], "1.0", [False, []]),
+            ("FROM alpine", ["rule1", "rule2"], [], "1.0", [False, []]),
+            ("FROM alpine", ["rule1", "rule2"], ["rule3"], "1.1", [False, []]),
+            ("FROM alpine", ["rule1", "rule2"], ["rule3"], "1.0", [True, ["registry.acme.com"]]),
+        ]
+
+        keys = set(LintCache.key(*variation) for variation in variations)
+
+        self.assertEqual(len(keys), len(variations))
+        self.assertNotIn(LintCache.key(*base), keys)
+        self.assertEqual(LintCache.key(*base), LintCache.key("FROM alpine", ["rule2", "rule1"], ["rule3"], "1.0",
+                                                             [False, []]))
+
+    def test_evicts_least_recently_used(self):
+        cache = LintCache(directory=self.directory, max_size=400)
+        for index, key in enumerate(["a", "b", "c"]):
+            cache.put(key, ["error %s" % ("x" * 80)], [])
+            os.utime(os.path.join(cache.directory, key + ".json"), (index, index))
+        self.assertEqual(self.entries(cache), ["a.json", "b.json", "c.json"])
+
+        # a hit makes "a" the most recently used entry
+        cache.get("a")
+        cache.put("d", ["error %s" % ("x" * 80)], [])
+
+        self.assertEqual(self.entries(cache), ["a.json", "c.json", "d.json"])
+
+    def test_unwritable_cache_is_not_fatal(self):
+        cache = LintCache(directory=os.path.join(self.directory, "file"))
+        with open(os.path.join(self.directory, "file"), "w") as file:
+            file.write("not a directory")
+
+        cache.put("a", [], [])
+
+        self.assertIsNone(cache.get("a"))
+
+    def test_linter_replays_cached_result(self):
+        cache = LintCache(directory=self.directory)
+        dockerfile = Dockerfile.load_from_file_path(os.path.join(get_mock_dir(), "Dockerfile.complete"))
+
+        with captured_output() as (first_out, _):
+            DockerfileLint(dockerfile, exit_on_errors=False, cache=cache).lint()
+        with patch("dockermake.lint.linter.DockerfileLint.validate_rules") as validate_rules:
+            with captured_output() as (second_out, _):
+                DockerfileLint(dockerfile, exit_on_errors=False, cache=cache).lint()
+
+        validate_rules.assert_not_called()
+        self.assertEqual(first_out.getvalue(), second_out.getvalue())
+        self.assertIn("---> FAILED", second_out.getvalue())
+        self.assertEqual(len(self.entries(cache)), 1)
+
+        with captured_output():
+            with self.assertRaises(LintingException):
+                DockerfileLint(dockerfile, exit_on_errors=True, cache=cache).lint()
+
+    def test_linter_does_not_replay_result_of_other_exclusions(self):
+        cache = LintCache(directory=self.directory)
+        dockerfile = Dockerfile.load_from_file_path(os.path.join(get_mock_dir(), "Dockerfile.complete"))
+
+        with captured_output():
+            DockerfileLint(dockerfile, exit_on_errors=False, cache=cache).lint()
+            DockerfileLint(dockerfile, exit_on_errors=False, exclude=["rule1"], cache=cache).lint()
+
+        self.assertEqual(len(self.entries(cache)), 2)
+
+    def test_linter_does_not_replay_result_of_changed_rules(self):
+        cache = LintCache(directory=self.directory)
+        dockerfile = Dockerfile.load_from_file_path(os.path.join(get_mock_dir(), "Dockerfile.complete"))
+
+        with captured_output():
+            DockerfileLint(dockerfile, exit_on_errors=False, cache=cache).lint()
+            with patch("dockermake.lint.linter.DockerfileLint._rules_digest", return_value="changed"):
+                DockerfileLint(dockerfile, exit_on_errors=False, cache=cache).lint()
+
+        self.assertEqual(len(self.entries(cache)), 2)
@@ -1,4 +1,7 @@
+import json
 import os
+import shutil
+import tempfile
 import unittest
 
 from mock import patch
@@ -9,13 +12,26 @@ from test.helpers import mock_registries
 from test.helpers import captured_output
 
 from dockermake.dockerfile.dockerfile import Dockerfile
+from dockermake.git.git import GitMetadata
+from dockermake.lint.linting_exception import LintingException
 from dockermake.make import Make
 from dockermake.cli import parse as parse_arguments
 from dockermake.config.config_factory import ConfigFactory
+from dockermake.utils.profiler import Profiler
+from dockermake.utils import display
 from dockermake.utils.yaml_loader import YamlLoader
 
 
 class TestMake(unittest.TestCase):
+    def setUp(self):
+        # the git commands used to be mocked along with the docker commands, now the git metadata is read from the
+        # files of this repository, which must not end up in the expected commands
+        GitMetadata.clear()
+        patcher = patch("dockermake.git.git.GitMetadata._find_git_dirs", return_value=(None, None))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(GitMetadata.clear)
+
     def test_run_with_dry(self):
         args = ["--dry-run", "--no-lint", "-w", get_mock_dir()]
         make = self.create_make(args=args)
@@ -29,6 +45,27 @@ class TestMake(unittest.TestCase):
         self.assertNotIn("Markdown Summary", output)
         self.assertNotIn("Step", output)
 
+    def test_run_with_profile(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        profile_path = os.path.join(directory, "profile.json")
+        self.addCleanup(Profiler.reset)
+        make = self.create_make(args=["--dry-run", "--no-lint", "-w", get_mock_dir(), "--profile-out", profile_path])
+
+        with captured_output():
+            make.run()
+        with open(profile_path, "r", encoding="UTF-8") as profile_file:
+            profile = json.load(profile_file)
+
+        phases = [phase["name"] for phase in profile["phases"]]
+        for phase in ["config.load", "config.expand", "config.validate", "before-commands", "registry-auth",
+                      "after-commands"]:
+            self.assertIn(phase, phases)
+        build_phases = profile["builds"]["Latest Stable"]
+        for phase in ["build", "before-build-commands", "build-inputs", "docker-build", "docker-push",
+                      "docker-inspect", "after-build-commands"]:
+            self.assertIn(phase, build_phases)
+
     def test_create_docker_build_and_push_commands_without_buildargs(self):
         config = {
             'name': "a-image-name",
@@ -276,6 +313,197 @@ class TestMake(unittest.TestCase):
         base_image = make._get_base_image(builds[1]['build-args'])
         self.assertEqual("centos:8", base_image)
 
+    def test_get_base_image_leaves_unknown_variables(self):
+        self.assertEqual(Make._expand_variables("${REGISTRY}/centos:${release}", {"release": "8"}),
+                         "${REGISTRY}/centos:8")
+        self.assertEqual(Make._expand_variables("$REGISTRY/centos:$release", {"REGISTRY": "r.io"}),
+                         "r.io/centos:$release")
+
+    def test_make_with_jobs_keeps_summary_order(self):
+        config_file = os.path.join(get_mock_dir(), "docker-make-test2.yaml")
+        config = YamlLoader.safe_load_yaml(config_file)
+        with patch.dict(os.environ, dict(TAG_SUFFIX="-dev", ANSIBLE_TOKEN="acme")):
+            make = self.create_make(
+                args=["--no-push", "--jobs", "2", "--build-arg", "ansible_components_version=1.3",
+                      "--build-arg", "USERNAME=acme"],
+                dockerfile="Dockerfile.args", config=config
+            )
+
+        with patch("dockermake.utils.helpers.System._run_command", return_value=("", "", 0)) as mock:
+            with patch("dockermake.utils.summary_printer.SummaryPrinter.print_tag_list") as print_tag_list:
+                with captured_output():
+                    make._make()
+
+        build_commands = [call[0][0] for call in mock.call_args_list if call[0][0][1] == "build"]
+        self.assertEqual(len(build_commands), 2)
+        build_summary = print_tag_list.call_args[0][0]
+        self.assertEqual([build["name"] for build in build_summary], [b["name"] for b in make.config.get_builds()])
+
+    def test_make_keep_going_runs_remaining_builds(self):
+        config_file = os.path.join(get_mock_dir(), "docker-make-test2.yaml")
+        config = YamlLoader.safe_load_yaml(config_file)
+        with patch.dict(os.environ, dict(TAG_SUFFIX="-dev", ANSIBLE_TOKEN="acme")):
+            make = self.create_make(
+                args=["--no-push", "--keep-going", "--build-arg", "ansible_components_version=1.3",
+                      "--build-arg", "USERNAME=acme"],
+                dockerfile="Dockerfile.args", config=config
+            )
+
+        with patch("dockermake.utils.helpers.System._run_command", return_value=("", "", 1)) as mock:
+            with captured_output():
+                with self.assertRaisesRegex(Exception, "2 build\\(s\\) failed"):
+                    make._make()
+
+        build_commands = [call[0][0] for call in mock.call_args_list if call[0][0][1] == "build"]
+        self.assertEqual(len(build_commands), 2)
+
+    def test_make_with_pipeline_push(self):
+        config_file = os.path.join(get_mock_dir(), "docker-make-test2.yaml")
+        config = YamlLoader.safe_load_yaml(config_file)
+        config["after"] = "echo after"
+        for build in config["builds"]:
+            build["before"] = "echo before " + build["name"]
+            build["after"] = "echo after " + build["name"]
+        with patch.dict(os.environ, dict(TAG_SUFFIX="-dev", ANSIBLE_TOKEN="acme")):
+            make = self.create_make(
+                args=["--pipeline-push", "--skip-registry-auth", "--build-arg", "ansible_components_version=1.3",
+                      "--build-arg", "USERNAME=acme"],
+                dockerfile="Dockerfile.args", config=config
+            )
+
+        with patch("dockermake.utils.helpers.System._run_command", return_value=("", "", 0)) as mock:
+            with captured_output():
+                make._make()
+
+        commands = [call[0][0] if isinstance(call[0][0], str) else " ".join(call[0][0][:2])
+                    for call in mock.call_args_list]
+        self.assertEqual(commands.count("docker build"), 2)
+        self.assertEqual(commands.count("docker push"), 6)
+        # the after build commands do not run concurrently with the before build commands of the next build, they
+        # run behind the barrier in the order of the builds, followed by the after commands
+        hooks = [command for command in commands if command.startswith("echo")]
+        self.assertEqual(hooks, ["echo before Ansible 2.4.0.0", "echo before Ansible 2.3.2.0",
+                                 "echo after Ansible 2.4.0.0", "echo after Ansible 2.3.2.0", "echo after"])
+        self.assertEqual(commands.index("echo after Ansible 2.4.0.0"), len(commands) - 3)
+        self.assertIsNone(make.plan.push_pipeline)
+
+    def test_create_docker_push_commands_with_push_jobs(self):
+        config_file = os.path.join(get_mock_dir(), "docker-make-test.yaml")
+        config = YamlLoader.safe_load_yaml(config_file)
+        make = self.create_make(args=["--no-pull", "--push-jobs", "3", "--build-arg", "FIRST_VERSION=0.1"],
+                                dockerfile="Dockerfile.noargs", config=config)
+        build = make.config.get_builds()[0]
+
+        with patch("dockermake.utils.helpers.System._run_command", return_value=("", "", 0)) as mock:
+            summary_part = make._run_docker_build_and_push_commands(build)
+
+        push_commands = [" ".join(call[0][0]) for call in mock.call_args_list if call[0][0][1] == "push"]
+        # the first tag uploads the layers and is always pushed first
+        self.assertEqual(push_commands[0], "docker push registry.a.com/a-namespace/a-image-name")
+        self.assertEqual(len(push_commands), 6)
+        self.assertEqual([tag for tag, _ in summary_part["push-durations"]], summary_part["build-tags"])
+
+    def test_concurrent_pulls_keep_the_prefix_of_the_build(self):
+        make = self.create_make(args=["--no-push"])
+
+        with patch("dockermake.utils.helpers.System._run_command", return_value=("", "", 0)):
+            with captured_output() as (out, _):
+                with display.prefixed("[app] "):
+                    make._pull_images(["alpine:3.12", "debian:10"])
+
+        self.assertEqual(sorted(out.getvalue().splitlines()),
+                         ["[app] Pulled image alpine:3.12", "[app] Pulled image debian:10"])
+
+    def test_make_skips_unchanged_builds(self):
+        work_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, work_dir)
+        with open(os.path.join(work_dir, "Dockerfile"), "w") as dockerfile:
+            dockerfile.write("FROM alpine:3.9 AS build\nRUN make\nFROM build\nCOPY app /app\n")
+        with open(os.path.join(work_dir, "app"), "w") as app:
+            app.write("version 1")
+        state_file = os.path.join(tempfile.mkdtemp(), "state.json")
+        self.addCleanup(shutil.rmtree, os.path.dirname(state_file))
+
+        config = YamlLoader.safe_load_yaml(os.path.join(get_mock_dir(), "docker-make-test.yaml"))
+        make = self.create_make(args=["--no-pull", "--skip-unchanged", "--build-state-file", state_file,
+                                      "--skip-registry-auth", "-w", work_dir, "--build-arg", "FIRST_VERSION=0.1"],
+                                config=config)
+        make.dockerfile = Dockerfile.load_from_file_path(os.path.join(work_dir, "Dockerfile"))
+        remote_digest = ["sha256:pushed"]
+
+        def run_command(cmd, *_):
+            if cmd[1] == "inspect":
+                return json.dumps(dict(Id="sha256:alpine",
+                                       RepoDigests=["registry.a.com/a-namespace/a-image-name@sha256:pushed"])), "", 0
+            if cmd[1] == "manifest":
+                return json.dumps(dict(Descriptor=dict(digest=remote_digest[0]))), "", 0
+            return "", "", 0
+
+        def run_make():
+            with patch("dockermake.utils.helpers.System._run_command", side_effect=run_command) as mock:
+                with captured_output():
+                    make._make()
+            return [call[0][0][1] for call in mock.call_args_list]
+
+        commands = run_make()
+        self.assertEqual(commands.count("build"), 1)
+        self.assertEqual(commands.count("push"), 6)
+
+        commands = run_make()
+        self.assertEqual(commands.count("build"), 0)
+        self.assertEqual(commands.count("push"), 0)
+        self.assertEqual(commands.count("manifest"), 6)
+
+        # a tag that was moved in the registry
+        remote_digest[0] = "sha256:other"
+        self.assertEqual(run_make().count("build"), 1)
+        remote_digest[0] = "sha256:pushed"
+        self.assertEqual(run_make().count("build"), 0)
+
+        with open(os.path.join(work_dir, "app"), "w") as app:
+            app.write("version 2")
+        self.assertEqual(run_make().count("build"), 1)
+
+    def test_push_inspects_the_pushed_image_again(self):
+        config = {'name': "a-image-name", 'username': "a-namespace", 'registry-host': "registry.a.com",
+                  'default-build-name': "a-build", 'builds': [{'name': "a-build"}]}
+        make = self.create_make(args=["--skip-registry-auth"], config=config)
+        tag = "registry.a.com/a-namespace/a-image-name:latest"
+        pushed = list()
+
+        def run_command(cmd, *_):
+            if cmd[1] == "push":
+                pushed.append(cmd[-1])
+            if cmd[1] == "inspect":
+                digests = ["registry.a.com/a-namespace/a-image-name@sha256:pushed"] if pushed else []
+                return json.dumps(dict(Id="sha256:image", RepoDigests=digests)), "", 0
+            return "", "", 0
+
+        summary_part = {"build-tags": [tag]}
+        with patch("dockermake.utils.helpers.System._run_command", side_effect=run_command) as mock:
+            with captured_output():
+                self.assertEqual(make.inspect_image(tag, output_format="{{ json . }}")["RepoDigests"], [])
+                make._run_docker_push_commands(summary_part)
+
+        self.assertEqual([call[0][0][1] for call in mock.call_args_list], ["inspect", "push", "inspect"])
+        self.assertEqual(summary_part["digest"], "sha256:pushed")
+
+    def test_skip_unchanged_requires_push(self):
+        make = self.create_make(args=["--skip-unchanged", "--no-push"])
+        self.assertIsNone(make._load_build_state())
+
+    def test_get_external_base_images(self):
+        make = self.create_make()
+        make.dockerfile = Dockerfile._parse(
+            "ARG VERSION=3.8\nFROM alpine:${VERSION} AS build\nFROM build\nFROM scratch\nFROM golang AS go\n"
+            "FROM alpine:3.9\n")
+
+        self.assertEqual(make._get_external_base_images(["VERSION=3.9"]), ["alpine:3.9", "golang"])
+
+    def test_lint_cache(self):
+        self.assertIsNotNone(self.create_make()._lint_cache())
+        self.assertIsNone(self.create_make(args=["--no-lint-cache"])._lint_cache())
+
     @patch("dockermake.constants.Constants.CI_BUILD_URL", "http://ci-job/1234")
     @patch("dockermake.make.Make.inspect_image", return_value={"ci.parent_build_urls": '["http://ci-job/1233"]'})
     def test_create_parent_label(self, _):
@@ -294,14 +522,272 @@ class TestMake(unittest.TestCase):
         expected = ['ci.parent_build_urls=["http://ci-job/1233", "http://ci-job/1234"]']
         self.assertEqual(labels, expected)
 
+    @patch("dockermake.constants.Constants.CI_BUILD_URL", "http://ci-job/1234")
+    def test_create_parent_label_inspects_base_image_once(self):
+        make = self.create_make()
+        inspect_output = dict(Id="sha256:centos",
+                              ContainerConfig=dict(Labels={"ci.parent_build_urls": '["http://ci-job/1233"]'}))
+
+        with patch("dockermake.utils.helpers.System._run_command",
+                   return_value=(json.dumps(inspect_output), "", 0)) as mock:
+            for _ in range(12):
+                labels = make.create_parent_label("centos:7")
+
+        self.assertEqual(labels, ['ci.parent_build_urls=["http://ci-job/1233", "http://ci-job/1234"]'])
+        self.assertEqual(mock.call_count, 1)
+
+    def test_inspect_images_batches_images(self):
+        make = self.create_make()
+
+        def run_command(cmd, *_):
+            return "\n".join(json.dumps(dict(Id="sha256:" + image)) for image in cmd[4:]), "", 0
+
+        with patch("dockermake.utils.helpers.System._run_command", side_effect=run_command) as mock:
+            image_ids = make.inspect_images(["centos", "alpine", "centos"], output_format="{{ json .Id }}")
+
+        self.assertEqual(image_ids, {"centos": "sha256:centos", "alpine": "sha256:alpine"})
+        self.assertEqual(mock.call_count, 1)
+        self.assertEqual(" ".join(mock.call_args[0][0]), "docker inspect --format {{ json . }} centos alpine")
+
+    def test_prefetch_base_images(self):
+        builds = [{'name': "centos-7", 'build-args': ['release=7']},
+                  {'name': "centos-8", 'build-args': ['release=8']},
+                  {'name': "alpine", 'build-args': ['os=alpine', 'release=3.9']},
+                  {'name': "centos-8-again", 'build-args': ['release=8']}]
+        config = {'name': "a-image-name", 'default-build-name': "centos-7", 'builds': builds}
+        make = self.create_make(args=["--create-parent-label"], dockerfile="Dockerfile.args_before_from",
+                                config=config)
+        local_images = {"centos:7"}
+
+        def run_command(cmd, *_):
+            if cmd[1] == "pull":
+                local_images.add(cmd[2])
+                return "", "", 0
+            images = cmd[4:]
+            return ("\n".join(json.dumps(dict(Id="sha256:" + image)) for image in images if image in local_images),
+                    "\n".join("Error: No such image: " + image for image in images if image not in local_images),
+                    0 if local_images.issuperset(images) else 1)
+
+        with patch("dockermake.utils.helpers.System._run_command", side_effect=run_command) as mock:
+            make._prefetch_base_images(make.config.get_builds())
+            commands = [" ".join(call[0][0]) for call in mock.call_args_list]
+            make.inspect_image("alpine:3.9", output_format="{{ json .Id }}")
+
+        self.assertEqual(commands[0], "docker inspect --format {{ json . }} centos:7 centos:8 alpine:3.9")
+        self.assertEqual(sorted(commands[1:3]), ["docker pull alpine:3.9", "docker pull centos:8"])
+        self.assertEqual(commands[3:], ["docker inspect --format {{ json . }} centos:8 alpine:3.9"])
+        self.assertEqual(mock.call_count, 4)
+
+    def test_prepull_base_images(self):
+        builds = [{'name': "build-%d" % index, 'build-args': ['VERSION=%d' % (index % 3)]} for index in range(10)]
+        config = {'name': "a-image-name", 'default-build-name': "build-0", 'builds': builds}
+        make = self.create_make(args=["--prepull"], config=config)
+        make.dockerfile = Dockerfile._parse(
+            "ARG VERSION\nFROM golang:1.${VERSION} AS build\nFROM build AS test\nFROM alpine:3.${VERSION}\n"
+            "FROM scratch\n")
+
+        with patch("dockermake.utils.helpers.System._run_command", return_value=("", "", 0)) as mock:
+            with captured_output():
+                make._prepull_base_images(make.config.get_builds())
+                make._run_docker_build_command(make.config.get_builds()[0])
+        commands = [" ".join(call[0][0]) for call in mock.call_args_list]
+
+        self.assertEqual(sorted(commands[:-1]), ["docker pull alpine:3.0", "docker pull alpine:3.1",
+                                                 "docker pull alpine:3.2", "docker pull golang:1.0",
+                                                 "docker pull golang:1.1", "docker pull golang:1.2"])
+        self.assertIn("docker build", commands[-1])
+        self.assertNotIn("--pull", commands[-1])
+
+    def test_prepull_base_images_failure(self):
+        make = self.create_make(args=["--prepull"], dockerfile="Dockerfile.args_before_from",
+                                config={'name': "a-image-name", 'default-build-name': "a-build",
+                                        'builds': [{'name': "a-build"}]})
+
+        with patch("dockermake.utils.helpers.System._run_command", return_value=("", "not found", 1)):
+            with self.assertRaises(Exception) as context:
+                make._prepull_base_images(make.config.get_builds())
+        self.assertIn("Pulling base images failed: centos:7", str(context.exception))
+
+    def test_only_lint_many_dockerfiles(self):
+        mock_registries()
+        _, parsed_args = parse_arguments(["--lint-files", "Dockerfile", "Dockerfile.no*", "--no-lint-cache",
+                                          "-w", get_mock_dir()])
+        make = Make(parsed_args)
+
+        with captured_output() as (out, _):
+            with self.assertRaises(LintingException) as context:
+                make.run()
+        output = out.getvalue()
+
+        self.assertIn("Step 0 : Linting \"%s\"" % os.path.join(get_mock_dir(), "Dockerfile"), output)
+        self.assertIn("Step 0 : Linting \"%s\"" % os.path.join(get_mock_dir(), "Dockerfile.noargs"), output)
+        self.assertIn("Linting failed for 2 of 2 Dockerfiles", str(context.exception))
+
+    def test_builds_depending_on_other_builds(self):
+        config = {'name': "app", 'username': "acme", 'registry-host': "registry.a.com",
+                  'default-build-name': "service",
+                  'builds': [{'name': "service", 'build-args': ["BASE=registry.a.com/acme/app:runtime"]},
+                             {'name': "runtime", 'tags': ["runtime"], 'build-args': ["BASE=debian:10"]},
+                             {'name': "tools", 'tags': ["tools"], 'build-args': ["BASE=debian:10"]}]}
+        make = self.create_make(args=["--prepull", "--no-push", "--no-deduplicate-builds"], config=config)
+        make.dockerfile = Dockerfile._parse("ARG BASE\nFROM alpine:3.12 AS build\nFROM ${BASE}\n")
+
+        self.assertEqual(make._get_build_dependencies(make.config.get_builds()), [{1}, set(), set()])
+        self.assertEqual(make.plan.build_dependencies, {"service": ["runtime"]})
+
+        with patch("dockermake.utils.helpers.System._run_command", return_value=("", "", 0)) as mock:
+            with captured_output():
+                make._make()
+        commands = [" ".join(call[0][0]) for call in mock.call_args_list]
+        pulls = [command for command in commands if command.startswith("docker pull")]
+        builds = [command for command in commands if command.startswith("docker build")]
+
+        self.assertEqual(sorted(pulls), ["docker pull alpine:3.12", "docker pull debian:10"])
+        self.assertEqual(len(builds), 3)
+        self.assertIn("registry.a.com/acme/app:runtime", builds[0])
+        self.assertIn("registry.a.com/acme/app:runtime", builds[2])
+        self.assertIn("BASE=registry.a.com/acme/app:runtime", builds[2])
+
+        # the image of a build is not pulled by the builds depending on it
+        make.args.prepull = False
+        with patch("dockermake.utils.helpers.System._run_command", return_value=("", "", 0)) as mock:
+            with captured_output():
+                for build in make.config.get_builds()[:2]:
+                    make._run_docker_build_command(build)
+        service_build, runtime_build = [" ".join(call[0][0]) for call in mock.call_args_list]
+        self.assertNotIn("--pull", service_build)
+        self.assertIn("--pull", runtime_build)
+
+    def test_registry_cache(self):
+        config = {'name': "app", 'username': "acme", 'registry-host': "registry.a.com",
+                  'default-build-name': "service",
+                  'builds': [{'name': "service", 'tags': ["latest"]},
+                             {'name': "tools", 'tags': ["tools"], 'cache-from': "registry.a.com/acme/app:latest",
+                              'cache-to': ["type=local,dest=/cache/tools"]}]}
+        make = self.create_make(args=["--no-pull", "--registry-cache", "--cache-from", "type=local,src=/cache"],
+                                dockerfile="Dockerfile.noargs", config=config)
+
+        with patch("dockermake.utils.helpers.System._run_command", return_value=("", "", 0)) as mock:
+            with captured_output():
+                for build in make.config.get_builds():
+                    make._run_docker_build_command(build)
+        service_build, tools_build = [" ".join(call[0][0]) for call in mock.call_args_list]
+
+        self.assertTrue(service_build.startswith("docker build --build-arg BUILDKIT_INLINE_CACHE=1 "))
+        # the tag of the git sha1 is new for every commit and no cache source
+        self.assertIn("--cache-from type=local,src=/cache --cache-from registry.a.com/acme/app:latest .",
+                      service_build)
+        self.assertNotIn("--cache-to", service_build)
+        self.assertTrue(tools_build.startswith("docker buildx build "))
+        self.assertIn("--cache-from registry.a.com/acme/app:latest --cache-from type=local,src=/cache "
+                      "--cache-from registry.a.com/acme/app:tools --cache-to type=local,dest=/cache/tools --load .",
+                      tools_build)
+
+    def test_no_registry_cache_by_default(self):
+        config = {'name': "app", 'username': "acme", 'registry-host': "registry.a.com",
+                  'builds': [{'name': "tools", 'tags': ["tools"]}]}
+        make = self.create_make(args=["--no-pull"], dockerfile="Dockerfile.noargs", config=config)
+
+        summary_part = make._gather_build_inputs(make.config.get_builds()[0])
+        self.assertEqual(summary_part["cache-from"], [])
+        self.assertEqual(summary_part["cache-to"], [])
+
+    def test_duplicate_builds_are_tagged(self):
+        config = {'name': "app", 'username': "acme", 'registry-host': "registry.a.com",
+                  'default-build-args': ["VERSION=1.4.2"],
+                  'builds': [{'name': "latest", 'tags': ["latest"]},
+                             {'name': "minor", 'tags': ["1", "1.4"]},
+                             {'name': "debug", 'tags': ["debug"], 'build-args': ["DEBUG=1"]},
+                             {'name': "patch", 'tags': ["1.4.2"], 'before': "make assets"}]}
+        make = self.create_make(args=["--no-pull", "--jobs", "2"], dockerfile="Dockerfile.noargs", config=config)
+
+        with patch("dockermake.utils.helpers.System._run_command", return_value=("", "", 0)) as mock:
+            with captured_output():
+                make._make()
+        commands = [" ".join(call[0][0]) for call in mock.call_args_list]
+        builds = [command for command in commands if command.startswith("docker build")]
+        tags = [command for command in commands if command.startswith("docker tag")]
+        pushes = [command for command in commands if command.startswith("docker push")]
+
+        self.assertEqual(make.plan.duplicate_builds, {"minor": "latest"})
+        # the build with before build commands is built, the commands may change the build context
+        self.assertEqual(len(builds), 3)
+        self.assertEqual(tags, ["docker tag registry.a.com/acme/app:latest registry.a.com/acme/app:1",
+                                "docker tag registry.a.com/acme/app:latest registry.a.com/acme/app:1.4"])
+        self.assertEqual(len(pushes), 5)
+
+    def test_duplicate_build_is_built_if_first_build_is_not(self):
+        config = {'name': "app", 'username': "acme", 'registry-host': "registry.a.com",
+                  'builds': [{'name': "latest", 'tags': ["latest"]}, {'name': "minor", 'tags': ["1"]}]}
+        make = self.create_make(args=["--no-pull", "--no-push"], dockerfile="Dockerfile.noargs", config=config)
+        make._get_duplicate_builds(make.config.get_builds(), [set(), set()])
+
+        with patch("dockermake.utils.helpers.System._run_command", return_value=("", "", 0)) as mock:
+            with captured_output():
+                summary_part = make._run_docker_build_command(make.config.get_builds()[1])
+        command, = [" ".join(call[0][0]) for call in mock.call_args_list]
+        self.assertTrue(command.startswith("docker build"))
+        self.assertNotIn("tagged-from", summary_part)
+
+    def test_builds_with_targets_prebuild_shared_stages(self):
+        config = {'name': "app", 'username': "acme", 'registry-host': "registry.a.com",
+                  'builds': [{'name': "runtime", 'tags': ["latest"], 'target': "runtime"},
+                             {'name': "debug", 'tags': ["debug"], 'target': "debug"},
+                             {'name': "tests", 'tags': ["tests"], 'target': "tested"}]}
+        make = self.create_make(args=["--no-pull", "--no-push", "--jobs", "3"], dockerfile="Dockerfile.noargs",
+                                config=config)
+        make.dockerfile = Dockerfile._parse("FROM golang AS builder\nRUN make\nFROM builder AS tested\n"
+                                            "RUN make test\nFROM alpine AS runtime\nCOPY --from=builder /app /\n"
+                                            "FROM runtime AS debug\nRUN apk add gdb\n")
+
+        self.assertEqual(make._get_shared_stages(make.config.get_builds()), [("builder", [], []), ("runtime", [], [])])
+        with patch("dockermake.utils.helpers.System._run_command", return_value=("", "", 0)) as mock:
+            with captured_output():
+                make._make()
+        commands = [" ".join(call[0][0]) for call in mock.call_args_list]
+        builds = [command for command in commands if command.startswith("docker build")]
+
+        self.assertEqual(len(builds), 5)
+        self.assertTrue(builds[0].endswith("--target builder ."))
+        self.assertTrue(builds[1].endswith("--target runtime ."))
+        self.assertNotIn("--tag", builds[0])
+        self.assertEqual(sorted(build.split("--target ")[1] for build in builds[2:]),
+                         ["debug .", "runtime .", "tested ."])
+
+    def test_no_prebuild_of_shared_stages(self):
+        config = {'name': "app", 'username': "acme", 'registry-host': "registry.a.com",
+                  'builds': [{'name': "runtime", 'tags': ["latest"], 'target': "runtime"},
+                             {'name': "debug", 'tags': ["debug"], 'target': "debug", 'before': "make assets"}]}
+        make = self.create_make(args=["--no-pull", "--no-push", "--target", "runtime"],
+                                dockerfile="Dockerfile.noargs", config=config)
+        make.dockerfile = Dockerfile._parse("FROM golang AS builder\nFROM alpine AS runtime\n"
+                                            "COPY --from=builder /app /\nFROM runtime AS debug\n")
+
+        # the before build commands may change the build context
+        self.assertEqual(make._get_shared_stages(make.config.get_builds()), [])
+        self.assertEqual(make._gather_build_inputs({'name': "other", 'tags': ["other"]})["target"], "runtime")
+        self.assertEqual(make._get_base_image([], "debug"), "runtime")
+
+    def test_docker_backend_is_resolved_on_first_use(self):
+        mock_registries()
+        _, parsed_args = parse_arguments(["--only-lint"])
+        with patch("dockermake.docker.docker_cli_factory.DockerCliFactory.create", return_value=DockerCli112) as mock:
+            make = Make(parsed_args)
+            mock.assert_not_called()
+
+            self.assertEqual(make.docker_cli, DockerCli112)
+            self.assertEqual(make.image_inspector.docker_cli, DockerCli112)
+            self.assertEqual(make.docker_cli, DockerCli112)
+        mock.assert_called_once_with(backend="cli", dry_run=False)
+
     @staticmethod
     def create_make(args=None, dockerfile="Dockerfile", config=None):
         args = args or []
         config = config or {}
         mock_registries()
         _, parsed_args = parse_arguments(args)
-        with patch("dockermake.docker.docker_cli_factory.DockerCliFactory.create", return_value=DockerCli112):
-            make = Make(parsed_args)
+        make = Make(parsed_args)
+        make.docker_cli = DockerCli112
         dockerfile_path = os.path.join(get_mock_dir(), dockerfile)
         make.dockerfile = Dockerfile.load_from_file_path(dockerfile_path)
         make.config = ConfigFactory.create_by_version("1", config, make.args.docker_build_args)
@@ -0,0 +1,202 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from mock import patch
+
+from dockermake.cli import parse as parse_arguments
+from dockermake.docker.docker_cli_1_12 import DockerCli112
+from dockermake.git.git import GitMetadata
+from dockermake.lint.linting_exception import LintingException
+from dockermake.monorepo import Monorepo
+from dockermake.utils.profiler import Profiler
+from test.helpers import captured_output
+from test.helpers import mock_registries
+
+CONFIG = """version: "1"
+name: {name}
+username: acme
+registry-host: registry.a.com
+default-build-name: Latest
+builds:
+  - name: Latest
+    tags:
+      - latest
+"""
+
+
+class MonorepoTest(unittest.TestCase):
+    def setUp(self):
+        GitMetadata.clear()
+        patcher = patch("dockermake.git.git.GitMetadata._find_git_dirs", return_value=(None, None))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(GitMetadata.clear)
+        patcher = patch("dockermake.docker.docker_cli_factory.DockerCliFactory.create", return_value=DockerCli112)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        mock_registries()
+
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        # app depends on base, tools/cli on app, other on nothing
+        self.add_project("base", "FROM alpine:3.12\n")
+        self.add_project("services/app", "FROM registry.a.com/acme/base:1.0 AS build\nFROM scratch\n")
+        self.add_project("tools/cli", "FROM registry.a.com/acme/app\n")
+        self.add_project("other", "FROM debian:10\n")
+        self.add_project(".hidden", "FROM debian:10\n")
+
+    def add_project(self, path, dockerfile, config=None):
+        directory = os.path.join(self.root, path)
+        os.makedirs(directory)
+        with open(os.path.join(directory, "docker-make.yml"), "w", encoding="UTF-8") as config_file:
+            config_file.write(config or CONFIG.format(name=os.path.basename(path)))
+        with open(os.path.join(directory, "Dockerfile"), "w", encoding="UTF-8") as dockerfile_file:
+            dockerfile_file.write(dockerfile)
+
+    def create_monorepo(self, args=None):
+        _, parsed_args = parse_arguments(["--monorepo", "--no-lint", "-w", self.root] + (args or []))
+        return Monorepo(parsed_args)
+
+    def load(self, monorepo):
+        with captured_output():
+            return monorepo.load(monorepo.discover())
+
+    def test_discover(self):
+        monorepo = self.create_monorepo()
+        self.assertEqual([os.path.join(self.root, path) for path in ["base", "other", "services/app", "tools/cli"]],
+                         monorepo.discover())
+
+    def test_discover_without_projects(self):
+        os.makedirs(os.path.join(self.root, "empty", ".hidden"))
+        _, parsed_args = parse_arguments(["--monorepo", "-w", os.path.join(self.root, "empty")])
+        with self.assertRaises(Exception) as context:
+            Monorepo(parsed_args).discover()
+        self.assertIn("No docker-make.yml found below", str(context.exception))
+
+    def test_get_dependencies(self):
+        projects = self.load(self.create_monorepo())
+
+        self.assertEqual(["base", "other", "services/app", "tools/cli"], [project.name for project in projects])
+        self.assertEqual([set(), set(), {0}, {2}], Monorepo.get_dependencies(projects))
+
+    def test_get_affected(self):
+        projects = self.load(self.create_monorepo())
+        dependencies = Monorepo.get_dependencies(projects)
+
+        self.assertEqual([2, 3], Monorepo.get_affected(projects, dependencies, ["services/app/Dockerfile"]))
+        self.assertEqual([0, 2, 3], Monorepo.get_affected(projects, dependencies, ["base/files/a", "README.md"]))
+        self.assertEqual([], Monorepo.get_affected(projects, dependencies, ["services/README.md"]))
+
+    def test_run_builds_projects_in_waves(self):
+        monorepo = self.create_monorepo(["--dry-run", "--jobs", "2"])
+
+        with captured_output() as (out, _):
+            monorepo.run()
+        builds = [line for line in out.getvalue().splitlines() if "Would execute command: docker build" in line]
+
+        self.assertEqual(4, len(builds))
+        self.assertTrue(builds[-2].startswith("[services/app] "))
+        self.assertTrue(builds[-1].startswith("[tools/cli] "))
+        self.assertIn("registry.a.com/acme/cli:latest", builds[-1])
+        # the images of upstream projects are not pulled
+        self.assertIn("--pull", builds[0])
+        self.assertNotIn("--pull", builds[-2])
+        self.assertNotIn("--pull", builds[-1])
+
+    def test_run_changed_since(self):
+        monorepo = self.create_monorepo(["--dry-run", "--changed-since", "origin/main"])
+
+        with patch("dockermake.monorepo.get_changed_files", return_value=["services/app/main.go"]) as mock:
+            with captured_output() as (out, _):
+                monorepo.run()
+        output = out.getvalue()
+        builds = [line for line in output.splitlines() if "Would execute command: docker build" in line]
+
+        mock.assert_called_once_with("origin/main", self.root)
+        self.assertIn("2 of 4 projects are affected by the changes since origin/main", output)
+        self.assertEqual(2, len(builds))
+        self.assertIn("registry.a.com/acme/app:latest", builds[0])
+        self.assertIn("registry.a.com/acme/cli:latest", builds[1])
+
+    def test_show_builds_prints_waves(self):
+        monorepo = self.create_monorepo(["--show-builds"])
+
+        with captured_output() as (out, _):
+            monorepo.run()
+
+        self.assertIn("Wave 1: base, other\nWave 2: services/app\nWave 3: tools/cli", out.getvalue())
+
+    def test_only_lint_lints_every_project_without_building(self):
+        monorepo = self.create_monorepo(["--dry-run", "--only-lint", "--no-lint-cache", "--lint-jobs", "1"])
+
+        with patch("dockermake.monorepo.check_if_git_is_installed") as check_git:
+            with captured_output() as (out, _):
+                with self.assertRaises(LintingException) as context:
+                    monorepo.run()
+        output = out.getvalue()
+
+        check_git.assert_not_called()
+        for path in ["base", "other", "services/app", "tools/cli"]:
+            self.assertIn("Step 0 : Linting \"%s\"" % os.path.join(self.root, path, "Dockerfile"), output)
+        self.assertIn("Linting failed for 4 of 4 Dockerfiles", str(context.exception))
+        self.assertNotIn("Would execute command: docker", output)
+
+    def test_lint_files_lints_only_the_given_dockerfiles(self):
+        monorepo = self.create_monorepo(["--dry-run", "--lint-files", "tools/*", "--no-lint-cache"])
+
+        with captured_output() as (out, _):
+            with self.assertRaises(LintingException):
+                monorepo.run()
+        output = out.getvalue()
+
+        self.assertIn("Step 0 : Linting \"%s\"" % os.path.join(self.root, "tools", "cli", "Dockerfile"), output)
+        self.assertEqual(1, output.count("Step 0 : Linting"))
+        self.assertNotIn("Would execute command: docker", output)
+
+    def test_show_linting_rules(self):
+        monorepo = self.create_monorepo(["--dry-run", "--show-linting-rules"])
+
+        with captured_output() as (out, _):
+            monorepo.run()
+
+        self.assertIn("rule0_1_3", out.getvalue())
+        self.assertNotIn("Would execute command: docker", out.getvalue())
+
+    def test_build_only_narrows_down_the_builds_of_every_project(self):
+        self.add_project("extra", "FROM debian:10\n",
+                         config=CONFIG.format(name="extra") + "  - name: Other\n    tags:\n      - other\n")
+        monorepo = self.create_monorepo(["--dry-run", "-b", "Latest"])
+
+        with captured_output() as (out, _):
+            monorepo.run()
+        builds = [line for line in out.getvalue().splitlines() if "Would execute command: docker build" in line]
+
+        self.assertEqual(5, len(builds))
+        self.assertFalse(any("registry.a.com/acme/extra:other" in build for build in builds))
+
+    def test_build_only_fails_for_unknown_build(self):
+        monorepo = self.create_monorepo(["--dry-run", "-b", "nonexistent-build"])
+
+        with captured_output() as (out, _):
+            with self.assertRaises(Exception) as context:
+                monorepo.run()
+
+        self.assertIn("only-build-name not found in config: nonexistent-build", str(context.exception))
+        self.assertNotIn("Would execute command: docker", out.getvalue())
+
+    def test_run_with_profile(self):
+        profile_path = os.path.join(self.root, "profile.json")
+        self.addCleanup(Profiler.reset)
+        monorepo = self.create_monorepo(["--dry-run", "--profile-out", profile_path])
+
+        with captured_output():
+            monorepo.run()
+        with open(profile_path, "r", encoding="UTF-8") as profile_file:
+            profile = json.load(profile_file)
+
+        phases = [phase["name"] for phase in profile["phases"]]
+        self.assertEqual(4, phases.count("config.load"))
+        self.assertEqual(4, phases.count("docker-build"))
@@ -81,3 +81,21 @@ class RegistriesTest(unittest.TestCase):
         with self.assertRaisesRegex(Exception, "Not allowed to push to registry\.a: Repository .* "
                                                 "not defined in registries\.yaml"):
             self.registries.check_allowed_to_push("registry.a")
+
+    def test_push_limiter_without_limit(self):
+        limiter = self.registries.get_push_limiter("registry.b")
+        with limiter:
+            with limiter:
+                pass
+
+    def test_push_limiter_is_shared_per_registry(self):
+        self.registries.registries['registry.b']['max-concurrent-pushes'] = 2
+        limiter = self.registries.get_push_limiter("registry.b")
+
+        self.assertIs(limiter, self.registries.get_push_limiter("registry.b"))
+        self.assertTrue(limiter.acquire(blocking=False))
+        self.assertTrue(limiter.acquire(blocking=False))
+        self.assertFalse(limiter.acquire(blocking=False))
+        limiter.release()
+        limiter.release()
+        self.registries.push_limiters.clear()
@@ -0,0 +1,39 @@
+import threading
+import unittest
+
+from dockermake.utils import display
+from test.helpers import captured_output
+
+
+class DisplayTest(unittest.TestCase):
+    def test_prefixes_are_joined(self):
+        with captured_output() as (out, _):
+            with display.prefixed("[project] "), display.prefixed("[build] "):
+                display.info("one\ntwo")
+        self.assertEqual(out.getvalue(), "[project] [build] one\n[project] [build] two\n")
+
+    def test_captured_output_is_printed_at_the_end(self):
+        with captured_output() as (out, _):
+            with display.captured():
+                display.info("one")
+                self.assertEqual(out.getvalue(), "")
+                with display.captured():
+                    display.warn("two")
+                self.assertEqual(out.getvalue(), "")
+        self.assertEqual(out.getvalue().splitlines(), ["one", "two"])
+
+    def test_inherited_output_of_other_thread(self):
+        with captured_output() as (out, _):
+            with display.captured(), display.prefixed("[a] "):
+                context = display.current_context()
+
+                def work():
+                    with display.inherited(context):
+                        display.info("from worker")
+
+                worker = threading.Thread(target=work)
+                worker.start()
+                worker.join()
+                self.assertEqual(out.getvalue(), "")
+            display.info("after")
+        self.assertEqual(out.getvalue(), "[a] from worker\nafter\n")
@@ -0,0 +1,77 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from dockermake.utils.docker_ignore import DockerIgnore
+
+
+class DockerIgnoreTest(unittest.TestCase):
+    def test_simple_patterns(self):
+        dockerignore = DockerIgnore(["# comment", "", "*.md", "/build", "temp?"])
+
+        self.assertTrue(dockerignore.is_excluded("README.md"))
+        self.assertFalse(dockerignore.is_excluded("docs/README.md"))
+        self.assertTrue(dockerignore.is_excluded("build"))
+        self.assertTrue(dockerignore.is_excluded("build/output/app"))
+        self.assertTrue(dockerignore.is_excluded("temp1"))
+        self.assertFalse(dockerignore.is_excluded("temp12"))
+        self.assertFalse(dockerignore.is_excluded("src/main.py"))
+
+    def test_double_star(self):
+        dockerignore = DockerIgnore(["**/*.pyc", "docs/**"])
+
+        self.assertTrue(dockerignore.is_excluded("a.pyc"))
+        self.assertTrue(dockerignore.is_excluded("a/b/c.pyc"))
+        self.assertTrue(dockerignore.is_excluded("docs/a/b"))
+        self.assertFalse(dockerignore.is_excluded("src/a.py"))
+
+    def test_exceptions_and_last_match_wins(self):
+        dockerignore = DockerIgnore(["*.md", "!README*.md", "README-secret.md"])
+
+        self.assertTrue(dockerignore.is_excluded("CHANGELOG.md"))
+        self.assertFalse(dockerignore.is_excluded("README.md"))
+        self.assertTrue(dockerignore.is_excluded("README-secret.md"))
+        self.assertTrue(dockerignore.has_exceptions)
+        self.assertFalse(DockerIgnore(["*.md"]).has_exceptions)
+
+    def test_character_classes_and_escapes(self):
+        dockerignore = DockerIgnore(["file[0-9]", "other[!a]", "literal\\*"])
+
+        self.assertTrue(dockerignore.is_excluded("file1"))
+        self.assertFalse(dockerignore.is_excluded("filea"))
+        self.assertTrue(dockerignore.is_excluded("otherb"))
+        self.assertFalse(dockerignore.is_excluded("othera"))
+        self.assertTrue(dockerignore.is_excluded("literal*"))
+        self.assertFalse(dockerignore.is_excluded("literals"))
+
+    def test_load_prefers_dockerfile_specific_file(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        with open(os.path.join(directory, ".dockerignore"), "w") as dockerignore_file:
+            dockerignore_file.write("a\n")
+
+        dockerignore, path = DockerIgnore.load(directory, os.path.join(directory, "Dockerfile"))
+        self.assertEqual(path, os.path.join(directory, ".dockerignore"))
+        self.assertTrue(dockerignore.is_excluded("a"))
+
+        with open(os.path.join(directory, "Dockerfile.dockerignore"), "w") as dockerignore_file:
+            dockerignore_file.write("b\n")
+
+        dockerignore, path = DockerIgnore.load(directory, os.path.join(directory, "Dockerfile"))
+        self.assertEqual(path, os.path.join(directory, "Dockerfile.dockerignore"))
+        self.assertFalse(dockerignore.is_excluded("a"))
+        self.assertTrue(dockerignore.is_excluded("b"))
+
+    def test_walk_never_excludes_included_paths(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        for name in ("docker/Dockerfile", "docker/other", "src/main.py", ".dockerignore"):
+            os.makedirs(os.path.dirname(os.path.join(directory, name)), exist_ok=True)
+            with open(os.path.join(directory, name), "w") as file:
+                file.write(name)
+
+        dockerignore = DockerIgnore(["docker", ".dockerignore"])
+        walked = [path for path, _ in dockerignore.walk(directory, included=["docker/Dockerfile", ".dockerignore"])]
+
+        self.assertEqual(walked, [".dockerignore", "src", "docker/Dockerfile", "src/main.py"])
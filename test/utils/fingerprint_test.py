@@ -0,0 +1,90 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from mock import patch
+
+from dockermake.utils.fingerprint import BuildFingerprint, BuildState
+
+
+class BuildFingerprintTest(unittest.TestCase):
+    def setUp(self):
+        self.context = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.context)
+        self.write("Dockerfile", "FROM alpine\nCOPY . /app\n")
+        self.write("src/main.py", "print('hello')\n")
+        self.write("build/output.bin", "binary")
+        self.write(".dockerignore", "build\n")
+
+    def write(self, name, content):
+        path = os.path.join(self.context, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as file:
+            file.write(content)
+
+    def fingerprint(self, inputs=None):
+        return BuildFingerprint.compute(self.context, os.path.join(self.context, "Dockerfile"),
+                                        inputs or dict(build_args=["A=1"]))
+
+    def test_stable(self):
+        self.assertEqual(self.fingerprint(), self.fingerprint())
+
+    def test_changes_with_context_files(self):
+        first = self.fingerprint()
+        self.write("src/main.py", "print('changed')\n")
+        self.assertNotEqual(self.fingerprint(), first)
+
+    def test_changes_with_new_file_and_file_mode(self):
+        first = self.fingerprint()
+        self.write("src/other.py", "")
+        second = self.fingerprint()
+        self.assertNotEqual(second, first)
+
+        os.chmod(os.path.join(self.context, "src", "other.py"), 0o755)
+        self.assertNotEqual(self.fingerprint(), second)
+
+    def test_changes_with_dockerfile_and_inputs(self):
+        first = self.fingerprint()
+        self.assertNotEqual(self.fingerprint(dict(build_args=["A=2"])), first)
+        self.write("Dockerfile", "FROM alpine\n")
+        self.assertNotEqual(self.fingerprint(), first)
+
+    def test_ignores_excluded_files(self):
+        first = self.fingerprint()
+        self.write("build/output.bin", "other binary")
+        self.write("build/more/files", "")
+        self.assertEqual(self.fingerprint(), first)
+
+        self.write(".dockerignore", "build\n!build/output.bin\n")
+        second = self.fingerprint()
+        self.assertNotEqual(second, first)
+        self.write("build/more/files", "changed")
+        self.assertEqual(self.fingerprint(), second)
+        self.write("build/output.bin", "yet another binary")
+        self.assertNotEqual(self.fingerprint(), second)
+
+
+class BuildStateTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, "state", "build-state.json")
+
+    def test_put_and_get(self):
+        BuildState(self.path).put("fingerprint", "sha256:a", ["image:1"])
+
+        entry = BuildState(self.path).get("fingerprint")
+        self.assertEqual(entry["digest"], "sha256:a")
+        self.assertEqual(entry["tags"], ["image:1"])
+        self.assertIsNone(BuildState(self.path).get("other"))
+
+    def test_keeps_newest_entries(self):
+        state = BuildState(self.path)
+        with patch.object(BuildState, "MAX_ENTRIES", 2):
+            for index in range(3):
+                with patch("dockermake.utils.fingerprint.time.time", return_value=index):
+                    state.put("fingerprint%d" % index, "sha256:%d" % index, [])
+
+        self.assertIsNone(state.get("fingerprint0"))
+        self.assertEqual(state.get("fingerprint2")["digest"], "sha256:2")
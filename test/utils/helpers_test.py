@@ -1,6 +1,12 @@
+import os
+import shutil
+import tempfile
 import unittest
 
-from dockermake.utils.helpers import System
+from mock import patch
+
+from dockermake.utils import display
+from dockermake.utils.helpers import System, OutputStream, OutputOptions
 from test.helpers import captured_output
 
 
@@ -34,14 +40,61 @@ class SystemTest(unittest.TestCase):
 
     def test_run_command_with_continuous_output(self):
         with captured_output():
-            out, err, rc = System.run_command(["echo", "-n", "42"], with_continuous_output=True)
+            out, err, rc = System.run_command(["echo", "-n", "42"], output=OutputOptions(continuous=True))
         self.assertEqual(out, "42")
         self.assertEqual(err, "")
         self.assertEqual(rc, 0)
 
     def test_run_command_with_continuous_output_through_shell(self):
         with captured_output():
-            out, err, rc = System.run_command(["echo -n 42"], with_continuous_output=True, shell=True)
+            out, err, rc = System.run_command(["echo -n 42"], output=OutputOptions(continuous=True), shell=True)
         self.assertEqual(out, "42")
         self.assertEqual(err, "")
         self.assertEqual(rc, 0)
+
+    def test_run_command_with_continuous_output_captures_stderr(self):
+        with captured_output() as (console_out, console_err):
+            out, err, rc = System.run_command(["sh", "-c", "echo out; echo err >&2"],
+                                              output=OutputOptions(continuous=True))
+        self.assertEqual(out, "out")
+        self.assertEqual(err, "err")
+        self.assertEqual(rc, 0)
+        self.assertIn("out", console_out.getvalue())
+        self.assertNotIn("err", console_out.getvalue())
+        self.assertIn("err", console_err.getvalue())
+
+    def test_run_command_with_continuous_output_keeps_only_the_tail(self):
+        cmd = ["sh", "-c", "seq 1 %d" % (OutputStream.TAIL_LINES * 3)]
+        with captured_output() as (console_out, _):
+            out, _, _ = System.run_command(cmd, output=OutputOptions(continuous=True))
+            captured, _, _ = System.run_command(cmd, output=OutputOptions(continuous=True, capture=True))
+
+        self.assertEqual(out.splitlines(), [str(i) for i in range(OutputStream.TAIL_LINES * 2 + 1,
+                                                                  OutputStream.TAIL_LINES * 3 + 1)])
+        self.assertEqual(len(captured.splitlines()), OutputStream.TAIL_LINES * 3)
+        self.assertIn("\n1\n", console_out.getvalue())
+
+    def test_run_command_with_continuous_output_raises_with_stderr_tail(self):
+        with captured_output():
+            with self.assertRaisesRegex(Exception, "exit code 3: .*stderr: broken"):
+                System.run_command(["sh", "-c", "echo broken >&2; exit 3"], output=OutputOptions(continuous=True))
+
+    def test_run_command_with_continuous_output_keeps_prefix_and_partial_lines(self):
+        with captured_output() as (console_out, _):
+            with display.prefixed("[a] "):
+                out, _, _ = System.run_command(["printf", "one\\ntwo"], output=OutputOptions(continuous=True))
+        self.assertEqual(out, "one\ntwo")
+        self.assertIn("[a] one\n[a] two", console_out.getvalue())
+
+    def test_run_command_with_continuous_output_tees_to_log_file(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        log_file = os.path.join(directory, "output.log")
+
+        with patch.object(System, "output_log_file", log_file):
+            with captured_output():
+                with display.prefixed("[a] "):
+                    System.run_command(["sh", "-c", "echo out; echo err >&2"], output=OutputOptions(continuous=True))
+
+        with open(log_file) as log:
+            self.assertEqual(sorted(log.read().splitlines()), ["[a] err", "[a] out"])
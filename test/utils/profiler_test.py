@@ -0,0 +1,103 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from dockermake.utils.profiler import Profiler
+
+
+class ProfilerTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        Profiler.reset(enabled=True)
+
+    def tearDown(self):
+        Profiler.reset()
+        shutil.rmtree(self.directory)
+
+    def test_phase_is_not_recorded_when_disabled(self):
+        Profiler.reset()
+        with Profiler.phase("lint"):
+            pass
+        self.assertEqual([], Profiler.events())
+
+    def test_phase_is_recorded_for_the_current_build(self):
+        with Profiler.phase("config.load"):
+            pass
+        with Profiler.build(" app "):
+            with Profiler.phase("docker-build"):
+                pass
+        events = Profiler.events()
+        self.assertEqual(["config.load", "docker-build"], [event["name"] for event in events])
+        self.assertEqual([None, "app"], [event["build"] for event in events])
+        self.assertIsNone(Profiler.current_build())
+
+    def test_failed_phase_is_recorded(self):
+        with self.assertRaises(ValueError):
+            with Profiler.phase("docker-push", tag="app:1"):
+                raise ValueError()
+        event, = Profiler.events()
+        self.assertTrue(event["failed"])
+        self.assertEqual(dict(tag="app:1"), event["details"])
+
+    def test_profiled_function(self):
+        @Profiler.profiled("git.sha1")
+        def probe():
+            return "abc"
+
+        self.assertEqual("abc", probe())
+        self.assertEqual(["git.sha1"], [event["name"] for event in Profiler.events()])
+
+    def test_build_is_thread_local(self):
+        def run_build(name):
+            with Profiler.build(name), Profiler.phase("build"):
+                pass
+
+        threads = [threading.Thread(target=run_build, args=(name,)) for name in ["a", "b"]]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual({"a", "b"}, {event["build"] for event in Profiler.events()})
+        self.assertEqual({1, 2}, {event["thread"] for event in Profiler.events()})
+
+    def test_report_sums_durations_per_build_and_phase(self):
+        for _ in range(2):
+            with Profiler.build("app"), Profiler.phase("docker-push"):
+                pass
+        report = Profiler.report()
+        self.assertEqual(2, len(report["phases"]))
+        self.assertEqual(["docker-push"], list(report["builds"]["app"]))
+        self.assertAlmostEqual(sum(event["duration"] for event in report["phases"]), report["totals"]["docker-push"],
+                               places=5)
+
+    def test_write_json(self):
+        with Profiler.phase("lint"):
+            pass
+        path = os.path.join(self.directory, "profiles", "profile.json")
+        Profiler.write(path)
+        with open(path, "r", encoding="UTF-8") as profile_file:
+            profile = json.load(profile_file)
+        self.assertEqual(["lint"], [phase["name"] for phase in profile["phases"]])
+        self.assertIn("duration", profile)
+
+    def test_write_chrome_trace(self):
+        with Profiler.build("app"), Profiler.phase("docker-build"):
+            pass
+        path = os.path.join(self.directory, "profile.trace.json")
+        Profiler.write(path, Profiler.CHROME_FORMAT)
+        with open(path, "r", encoding="UTF-8") as profile_file:
+            trace_events = json.load(profile_file)["traceEvents"]
+        metadata, event = trace_events
+        self.assertEqual("M", metadata["ph"])
+        self.assertEqual("thread_name", metadata["name"])
+        self.assertEqual("X", event["ph"])
+        self.assertEqual("app", event["cat"])
+        self.assertEqual(dict(build="app"), event["args"])
+        self.assertEqual(metadata["tid"], event["tid"])
+
+    def test_write_unknown_format(self):
+        with self.assertRaises(Exception):
+            Profiler.write(os.path.join(self.directory, "profile"), "xml")
@@ -0,0 +1,256 @@
+import threading
+import time
+import unittest
+
+from dockermake.utils.scheduler import BuildScheduler, BuildFailedException, PushFailedException, PushPipeline
+from test.helpers import captured_output
+
+
+class BuildSchedulerTest(unittest.TestCase):
+    BUILDS = [{"name": "a"}, {"name": "b"}, {"name": "c"}, {"name": "d"}]
+
+    def test_results_keep_build_order(self):
+        def run(build):
+            # the first builds finish last
+            time.sleep(0.01 * (len(self.BUILDS) - self.BUILDS.index(build)))
+            return build["name"]
+
+        with captured_output():
+            results = BuildScheduler(jobs=4).run(self.BUILDS, run)
+
+        self.assertEqual(results, ["a", "b", "c", "d"])
+
+    def test_jobs_bound_concurrency(self):
+        lock = threading.Lock()
+        running = [0]
+        peak = [0]
+
+        def run(build):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.02)
+            with lock:
+                running[0] -= 1
+            return build["name"]
+
+        with captured_output():
+            BuildScheduler(jobs=2).run(self.BUILDS, run)
+
+        self.assertEqual(peak[0], 2)
+
+    def test_output_is_prefixed_with_build_name(self):
+        from dockermake.utils import display
+
+        with captured_output() as (out, _):
+            BuildScheduler(jobs=2).run(self.BUILDS[:2], lambda build: display.info("hello"))
+
+        self.assertIn("[a] hello", out.getvalue())
+        self.assertIn("[b] hello", out.getvalue())
+
+    def test_output_of_concurrent_builds_is_not_interleaved(self):
+        from dockermake.utils import display
+        barrier = threading.Barrier(2)
+
+        def run(build):
+            display.info("first")
+            # both builds have printed their first line before any of them prints its second line
+            barrier.wait(timeout=5)
+            display.info("second")
+
+        with captured_output() as (out, _):
+            BuildScheduler(jobs=2).run(self.BUILDS[:2], run)
+
+        lines = out.getvalue().splitlines()
+        self.assertEqual(sorted(lines), ["[a] first", "[a] second", "[b] first", "[b] second"])
+        self.assertEqual(lines[0][:4], lines[1][:4])
+        self.assertEqual(lines[2][:4], lines[3][:4])
+
+    def test_fail_fast_raises_first_failure(self):
+        def run(build):
+            if build["name"] == "b":
+                raise Exception("b broke")
+            return build["name"]
+
+        with captured_output():
+            with self.assertRaisesRegex(Exception, "b broke"):
+                BuildScheduler(jobs=1).run(self.BUILDS, run)
+            with self.assertRaisesRegex(Exception, "b broke"):
+                BuildScheduler(jobs=2).run(self.BUILDS, run)
+
+    def test_fail_fast_does_not_start_remaining_builds(self):
+        started = list()
+
+        def run(build):
+            started.append(build["name"])
+            if build["name"] == "a":
+                raise Exception("a broke")
+            return build["name"]
+
+        with captured_output():
+            with self.assertRaisesRegex(Exception, "a broke"):
+                BuildScheduler(jobs=1).run(self.BUILDS, run)
+
+        self.assertEqual(started, ["a"])
+
+    def test_keep_going_runs_all_builds(self):
+        started = list()
+
+        def run(build):
+            started.append(build["name"])
+            if build["name"] in ("a", "c"):
+                raise Exception("%s broke" % build["name"])
+            return build["name"]
+
+        for jobs in (1, 3):
+            del started[:]
+            with captured_output():
+                with self.assertRaises(BuildFailedException) as context:
+                    BuildScheduler(jobs=jobs, fail_fast=False).run(self.BUILDS, run)
+
+            self.assertEqual(sorted(started), ["a", "b", "c", "d"])
+            self.assertEqual([name for name, _ in context.exception.failures], ["a", "c"])
+            self.assertIn("2 build(s) failed: a, c", str(context.exception))
+
+    def test_waves(self):
+        # d depends on a and c, c on b
+        dependencies = [set(), set(), {1}, {0, 2}]
+        self.assertEqual(BuildScheduler.waves(self.BUILDS, dependencies), [[0, 1], [2], [3]])
+
+    def test_waves_with_cyclic_dependencies(self):
+        with self.assertRaises(Exception) as context:
+            BuildScheduler.waves(self.BUILDS, [set(), {2}, {1}, set()])
+        self.assertIn("Builds depend on each other: b, c", str(context.exception))
+
+    def test_dependent_builds_start_after_their_dependencies(self):
+        lock = threading.Lock()
+        finished = list()
+
+        def run(build):
+            # the builds without dependencies take longest
+            time.sleep(0.03 if build["name"] in ("a", "b") else 0.01)
+            with lock:
+                finished.append(build["name"])
+            return list(finished)
+
+        with captured_output():
+            results = BuildScheduler(jobs=4).run(self.BUILDS, run, dependencies=[set(), set(), {1}, {0, 2}])
+
+        self.assertEqual(sorted(finished[:2]), ["a", "b"])
+        self.assertEqual(finished[2:], ["c", "d"])
+        self.assertIn("b", results[2])
+        self.assertEqual(["a", "b", "c", "d"], sorted(results[3]))
+
+    def test_keep_going_skips_builds_depending_on_failed_builds(self):
+        started = list()
+
+        def run(build):
+            started.append(build["name"])
+            if build["name"] == "b":
+                raise Exception("b broke")
+            return build["name"]
+
+        with captured_output() as (out, _):
+            with self.assertRaises(BuildFailedException) as context:
+                BuildScheduler(jobs=2, fail_fast=False).run(self.BUILDS, run, dependencies=[set(), set(), {1}, {2}])
+
+        self.assertEqual(sorted(started), ["a", "b"])
+        self.assertEqual([name for name, _ in context.exception.failures], ["b", "c", "d"])
+        self.assertIn("Skipped, depends on the failed build(s) b", out.getvalue())
+
+    def test_fail_fast_does_not_start_dependent_builds(self):
+        started = list()
+
+        def run(build):
+            started.append(build["name"])
+            if build["name"] == "a":
+                raise Exception("a broke")
+            return build["name"]
+
+        with captured_output():
+            with self.assertRaises(Exception) as context:
+                BuildScheduler(jobs=2).run(self.BUILDS, run, dependencies=[set(), set(), {0}, set()])
+
+        self.assertEqual(str(context.exception), "a broke")
+        self.assertNotIn("c", started)
+
+
+class PushPipelineTest(unittest.TestCase):
+    def test_pushes_run_in_background_in_submit_order(self):
+        pushed = list()
+        release = threading.Event()
+
+        def push(name):
+            release.wait(1)
+            pushed.append(name)
+
+        pipeline = PushPipeline()
+        with captured_output():
+            pipeline.submit("a", push, "a")
+            pipeline.submit("b", push, "b")
+            # submitting does not block on the pushes
+            self.assertEqual(pushed, [])
+            release.set()
+            pipeline.wait()
+
+        self.assertEqual(pushed, ["a", "b"])
+
+    def test_wait_raises_push_failure(self):
+        def push():
+            raise Exception("push broke")
+
+        pipeline = PushPipeline()
+        with captured_output():
+            pipeline.submit("a", push)
+            with self.assertRaisesRegex(Exception, "push broke"):
+                pipeline.wait()
+
+    def test_fail_fast_rejects_new_pushes_after_failure(self):
+        def push():
+            raise Exception("push broke")
+
+        pipeline = PushPipeline()
+        with captured_output():
+            pipeline.submit("a", push)
+            pipeline.executor.shutdown(wait=True)
+            with self.assertRaisesRegex(PushFailedException, "Pushing build \"a\" failed: push broke"):
+                pipeline.submit("b", push)
+
+    def test_after_functions_run_on_the_waiting_thread_in_order(self):
+        calls = list()
+        release = threading.Event()
+
+        def push(name, fail=False):
+            release.wait(1)
+            calls.append("push " + name)
+            if fail:
+                raise Exception("push broke")
+
+        def after(name):
+            calls.append("after %s on %s" % (name, threading.current_thread().name))
+
+        pipeline = PushPipeline(fail_fast=False)
+        with captured_output():
+            for name, fail in (("a", False), ("b", True), ("c", False)):
+                pipeline.submit(name, push, name, fail, after=lambda name=name: after(name))
+            release.set()
+            with self.assertRaises(BuildFailedException):
+                pipeline.wait()
+
+        thread = threading.current_thread().name
+        self.assertEqual(calls, ["push a", "push b", "push c", "after a on " + thread, "after c on " + thread])
+
+    def test_keep_going_collects_push_failures(self):
+        def push(fail):
+            if fail:
+                raise Exception("push broke")
+
+        pipeline = PushPipeline(fail_fast=False)
+        with captured_output():
+            pipeline.submit("a", push, True)
+            pipeline.submit("b", push, False)
+            pipeline.submit("c", push, True)
+            with self.assertRaises(BuildFailedException) as context:
+                pipeline.wait()
+
+        self.assertEqual([name for name, _ in context.exception.failures], ["a", "c"])
@@ -12,6 +12,7 @@ class SummaryPrinterTest(unittest.TestCase):
         build_detail['build-args'] = ['A=a']
         build_detail['build-tags'] = ['1.0']
         build_detail['build-labels'] = ['build_a_label']
+        build_detail['push-durations'] = [['registry/image:1.0', '1.50 s']]
         summary.append(build_detail)
 
         with captured_output() as (out, err):
@@ -22,6 +23,8 @@ class SummaryPrinterTest(unittest.TestCase):
         self.assertIn("| A", output)
         self.assertIn("- build_a_label", output)
         self.assertIn("- 1.0", output)
+        self.assertIn("### Push Durations", output)
+        self.assertIn("| registry/image:1.0 | 1.50 s", output)
 
     def test_print_tag_list(self):
         summary = list()